@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+"""Import time of the structurebot modules
+
+Each measurement imports the modules in a fresh interpreter without any
+Neucore configuration, so nothing but the import itself is timed. Run from
+the repository root:
+
+    python benchmarks/bench_import.py --repeat 10
+"""
+from __future__ import absolute_import
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULES = ['structurebot.util', 'structurebot.universe', 'structurebot.assets', 'structurebot.citadels',
+           'structurebot.pos']
+
+
+def environment():
+    env = dict(os.environ)
+    for key in list(env):
+        if key.startswith('NEUCORE_'):
+            del env[key]
+    env['PYTHONPATH'] = ROOT
+    return env
+
+
+def wall_time(statement, env):
+    started = time.perf_counter()
+    subprocess.run([sys.executable, '-c', statement], env=env, check=True)
+    return time.perf_counter() - started
+
+
+def self_times(module, env):
+    """Runs python -X importtime and returns the cumulative microseconds per structurebot module"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import ' + module],
+                            env=env, check=True, stderr=subprocess.PIPE, universal_newlines=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if 'structurebot' not in line:
+            continue
+        self_us, cumulative_us, name = [part.strip() for part in line.split(':', 1)[1].split('|')]
+        times[name] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=10, help='fresh interpreters per measurement')
+    args = parser.parse_args()
+    env = environment()
+
+    baseline = statistics.median(wall_time('pass', env) for i in range(args.repeat))
+    print('{:<24} {:8.1f} ms'.format('interpreter startup', baseline * 1000))
+    for module in MODULES:
+        median = statistics.median(wall_time('import ' + module, env) for i in range(args.repeat))
+        print('{:<24} {:8.1f} ms'.format(module, (median - baseline) * 1000))
+
+    print('\nself / cumulative import time of structurebot.citadels and its structurebot imports:')
+    for name, (self_us, cumulative_us) in sorted(self_times('structurebot.citadels', env).items(),
+                                                 key=lambda item: -item[1][1]):
+        print('{:<34} {:7.1f} ms {:7.1f} ms'.format(name, self_us / 1000, cumulative_us / 1000))
+
+
+if __name__ == '__main__':
+    main()
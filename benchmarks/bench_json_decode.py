@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+"""Decode cost of one ESI asset page, before and after decoding responses once
+
+Before, NCR called resp.json() once to log the payload at debug level and
+once more to return it. Now the body is decoded once with the configured
+JSON backend. Run from the repository root:
+
+    python benchmarks/bench_json_decode.py --items 1000 --repeat 50
+"""
+from __future__ import absolute_import
+import argparse
+import datetime
+import json
+import os
+import random
+import sys
+import timeit
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from structurebot import json_backend  # noqa: E402
+
+
+def asset_page(items):
+    """Builds a body shaped like a page of /corporations/{corporation_id}/assets/"""
+    rng = random.Random(0)
+    flags = ['Hangar', 'CorpSAG1', 'StructureFuel', 'ServiceSlot0', 'MedSlot1', 'AutoFit']
+    return json.dumps([{
+        'is_blueprint_copy': False,
+        'is_singleton': rng.random() < 0.2,
+        'item_id': 1000000000000 + i,
+        'location_flag': rng.choice(flags),
+        'location_id': rng.randrange(60000000, 1050000000000),
+        'location_type': 'item',
+        'quantity': rng.randrange(1, 100000),
+        'type_id': rng.randrange(18, 60000),
+    } for i in range(items)]).encode()
+
+
+def response(content):
+    resp = requests.Response()
+    resp.status_code = 200
+    resp._content = content
+    resp.encoding = 'utf-8'
+    resp.elapsed = datetime.timedelta(0)
+    return resp
+
+
+def before(content):
+    resp = response(content)
+    resp.json()  # passed to logger.debug
+    return resp.json()
+
+
+def after(content):
+    return json_backend.loads(response(content).content)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--items', type=int, default=1000, help='assets per page, ESI returns up to 1000')
+    parser.add_argument('--repeat', type=int, default=50, help='pages decoded per measurement')
+    args = parser.parse_args()
+
+    content = asset_page(args.items)
+    print('page: {} items, {:.1f} KiB'.format(args.items, len(content) / 1024))
+
+    def measure(fn):
+        return min(timeit.repeat(lambda: fn(content), number=args.repeat, repeat=5)) / args.repeat * 1000
+
+    baseline = measure(before)
+    print('{:<28} {:8.3f} ms/page'.format('before (resp.json() twice)', baseline))
+    for name in json_backend.BACKENDS:
+        if json_backend.set_backend(name) != name:
+            print('{:<28} not installed'.format('after (' + name + ')'))
+            continue
+        cost = measure(after)
+        print('{:<28} {:8.3f} ms/page  {:5.1f}x'.format('after (' + name + ')', cost, baseline / cost))
+    json_backend.set_backend('json')
+
+
+if __name__ == '__main__':
+    main()
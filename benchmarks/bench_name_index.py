@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+"""Cache lookups of names_to_ids, nested category scan versus NameIndex
+
+Before, names_to_ids scanned every category bucket for every requested
+name. NameIndex answers each name with one dict lookup and splits the
+request into hits and misses in one pass. Run from the repository root:
+
+    python benchmarks/bench_name_index.py --names 50000
+"""
+from __future__ import absolute_import
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from structurebot.name_index import NameIndex  # noqa: E402
+
+CATEGORIES = ['agents', 'alliances', 'characters', 'constellations', 'corporations',
+              'factions', 'inventory_types', 'regions', 'stations', 'systems']
+
+
+def entries(count):
+    return [(i, 'name {}'.format(i), CATEGORIES[i % len(CATEGORIES)]) for i in range(count)]
+
+
+def before(cat_name_id, lookup_names):
+    names = []
+    r_val_cat_name_id = {}
+    for n in lookup_names:
+        found = False
+        for c in cat_name_id.keys():
+            if n in cat_name_id[c].keys():
+                found = True
+                if c in r_val_cat_name_id.keys():
+                    r_val_cat_name_id[c][n] = cat_name_id[c][n]
+                else:
+                    r_val_cat_name_id[c] = {n: cat_name_id[c][n]}
+        if not found:
+            names.append(n)
+    return r_val_cat_name_id, names
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--names', type=int, default=50000, help='names in the index')
+    parser.add_argument('--miss-rate', type=float, default=0.1, help='share of requested names not in the index')
+    args = parser.parse_args()
+
+    known = entries(args.names)
+    cat_name_id = {}
+    for entry_id, name, category in known:
+        cat_name_id.setdefault(category, {})[name] = entry_id
+    index = NameIndex()
+    index.add_many(known)
+    misses = int(args.names * args.miss_rate)
+    lookup = [name for entry_id, name, category in known[misses:]] + ['unknown {}'.format(i) for i in range(misses)]
+
+    assert before(cat_name_id, lookup) == index.lookup_names(lookup)
+    print('{} names in the cache, looking up {} of them ({} misses)'.format(args.names, len(lookup), misses))
+    old = min(timeit.repeat(lambda: before(cat_name_id, lookup), number=1, repeat=5)) * 1000
+    new = min(timeit.repeat(lambda: index.lookup_names(lookup), number=1, repeat=5)) * 1000
+    print('{:<24} {:9.2f} ms'.format('before (nested scan)', old))
+    print('{:<24} {:9.2f} ms  {:5.1f}x'.format('after (NameIndex)', new, old / new))
+
+    ids = [entry_id for entry_id, name, category in known]
+    print('{:<24} {:9.2f} ms'.format('NameIndex.lookup_ids',
+                                     min(timeit.repeat(lambda: index.lookup_ids(ids), number=1, repeat=5)) * 1000))
+
+
+if __name__ == '__main__':
+    main()
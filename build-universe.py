@@ -0,0 +1,19 @@
+#!/usr/bin/env python
+"""Builds the static universe dataset from the Fuzzwork CSV dump of the SDE"""
+
+from __future__ import absolute_import
+from __future__ import print_function
+import argparse
+
+from structurebot.static_universe import DEFAULT_PATH, build
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('sde', help='Directory with mapRegions.csv, mapConstellations.csv and mapSolarSystems.csv')
+    parser.add_argument('-o', '--output', default=DEFAULT_PATH, help='Dataset file to write')
+    args = parser.parse_args()
+
+    counts = build(args.sde, args.output)
+    print('Wrote {regions} regions, {constellations} constellations and {systems} systems to'.format(**counts),
+          args.output)
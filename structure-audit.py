@@ -10,6 +10,7 @@ import sys
 from structurebot.citadels import Structure
 from structurebot.config import CONFIG
 from structurebot.logger import setup_logger
+from structurebot.util import warm_name_cache
 
 
 if __name__ == '__main__':
@@ -28,6 +29,7 @@ if __name__ == '__main__':
 
     pyswagger_logger = logging.getLogger('pyswagger')
     pyswagger_logger.setLevel(logging.ERROR)
+    warm_name_cache()
     structures = Structure.from_corporation(CONFIG['CORPORATION_NAME'])
     total_fuel = 0
     writer = csv.writer(sys.stdout)
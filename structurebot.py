@@ -4,12 +4,16 @@ from __future__ import absolute_import
 import logging
 import argparse
 
+from structurebot.alerts import open_alert_ledger
 from structurebot.config import CONFIG
-from structurebot.util import notify_slack, name_to_id
+from structurebot.deadline import Deadline, DeadlineExceeded
+from structurebot.util import ncr, notify, get_notifier, name_to_id, warm_name_cache, name_cache_stats, chunk_dispatcher, \
+    id_name_loader, type_id_loader
 from structurebot.citadels import Structure
 from structurebot.assets import Asset
 from structurebot.pos import check_pos
-from structurebot.logger import setup_logger
+from structurebot.universe import universe_stats
+from structurebot.logger import logger, setup_logger
 
 parser = argparse.ArgumentParser()
 parser.add_argument('--suppress-upcoming-detonations', dest='upcoming_detonations', action='store_false')
@@ -30,8 +34,13 @@ if debug:
 setup_logger(level=level)
 
 
+ncr.deadline = Deadline(CONFIG['RUN_DEADLINE'])
+warm_name_cache()
+
+ledger = open_alert_ledger(CONFIG['ALERT_LEDGER_PATH'], CONFIG['ALERT_COOLDOWN'])
 messages = []
 errors = []
+complete = False
 corp_name = CONFIG['CORPORATION_NAME']
 try:
     CONFIG['CORP_ID'] = name_to_id(corp_name, 'corporation')
@@ -39,7 +48,10 @@ try:
     assetsError = False
     assets = None
     try:
-        assets = Asset.from_entity_name(corp_name)
+        # only fittings, fuel and POS mods are checked, skip everything else while streaming
+        assets = Asset.from_entity_name(corp_name, location_filter=Asset.in_space_or_fitted)
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         assetsError = True
         errors.append(str(e))
@@ -49,42 +61,92 @@ try:
 
     structures = Structure.from_corporation(corp_name, assets)
     for structure in structures:
-        message = []
+        def send(kind, fingerprint=''):
+            # alerts already sent are repeated after ALERT_COOLDOWN or when their details change
+            return ledger is None or ledger.check(structure.structure_id, kind, fingerprint)
+
         if not structure.accessible:
             msg = 'Found an inaccessible citadel ({}) in {}'.format(structure.structure_id, structure.system_id)
-            messages.append(msg)
+            if send('inaccessible'):
+                messages.append(msg)
             continue
+        # (kind, fingerprint, lines), the ledger is only asked once the whole message could be built
+        alerts = []
         if args.unscheduled_detonations and structure.needs_detonation:
-            message.append('Needs to have an extraction scheduled')
+            alerts.append(('extraction', '', ['Needs to have an extraction scheduled']))
         if args.upcoming_detonations and structure.detonates_soon:
-            message.append('Ready to detonate {}'.format(structure.detonation))
+            alerts.append(('detonation', structure.detonation, ['Ready to detonate {}'.format(structure.detonation)]))
         if args.ansiblex_ozone and structure.needs_ozone and not assetsError:
-            message.append('Low on Liquid Ozone: {}'.format(structure.jump_fuel))
+            alerts.append(('ozone', '', ['Low on Liquid Ozone: {}'.format(structure.jump_fuel)]))
         if args.fuel_warning and structure.needs_fuel:
-            message.append('Runs out of fuel on {}'.format(structure.fuel_expires))
+            lines = ['Runs out of fuel on {}'.format(structure.fuel_expires)]
             if args.service_state:
                 if structure.online_services:
-                    message.append('Online Services: {}'.format(', '.join(structure.online_services)))
+                    lines.append('Online Services: {}'.format(', '.join(structure.online_services)))
                 if structure.offline_services:
-                    message.append('Offline Services: {}'.format(', '.join(structure.offline_services)))
+                    lines.append('Offline Services: {}'.format(', '.join(structure.offline_services)))
+            alerts.append(('fuel', structure.fuel_expires, lines))
         if args.service_state and structure.offline_services:
-            message.append('Offline services: {}'.format(', '.join(structure.offline_services)))
+            alerts.append(('services', ','.join(sorted(structure.offline_services)),
+                           ['Offline services: {}'.format(', '.join(structure.offline_services))]))
         if args.structure_state and (structure.vulnerable or structure.reinforced):
             state = structure.state.replace('_', ' ').title()
-            message.append('{} until {}'.format(state, structure.state_timer_end))
+            alerts.append(('state', '{} {}'.format(structure.state, structure.state_timer_end),
+                           ['{} until {}'.format(state, structure.state_timer_end)]))
         if args.core_state and structure.needs_core and not assetsError:
-            message.append('No core installed')
+            alerts.append(('core', '', ['No core installed']))
+        message = [line for kind, fingerprint, lines in alerts if send(kind, fingerprint) for line in lines]
         if message:
             messages.append(u'\n'.join([u'{}'.format(structure.name)] + message))
-    messages += check_pos(corp_name, assets)
+    # one by one, the alerts found before a DeadlineExceeded are already recorded in the ledger
+    for message in check_pos(corp_name, assets, ledger=ledger):
+        messages.append(message)
+    complete = not assetsError
+except DeadlineExceeded as e:
+    # report what was checked before the deadline instead of nothing
+    errors.append('{}, the results below are incomplete.'.format(e))
 except Exception as e:
     if debug:
         raise
     else:
         messages = [str(e)]
+        # the alerts found so far are replaced by the error, don't remember them as sent
+        ledger = None
 
-if messages:
+# errors are sent on their own too, a run cut short by the deadline may not have found anything yet
+if messages or errors:
     messages = sorted(messages)
     messages.insert(0, 'Upcoming {} Structure Maintenance Tasks'.format(corp_name))
     messages = errors + messages
-    notify_slack(messages)
+    notify(messages)
+
+logger.info("Request statistics", extra=ncr.singleflight.stats())
+for upstream, stats in ncr.transport_stats().items():
+    logger.info("Connection statistics", extra={"upstream": upstream, **stats})
+for upstream, governor in ncr.governors.items():
+    logger.info("Error limit statistics", extra={"upstream": upstream, **governor.stats()})
+for breaker in ncr.breakers.values():
+    logger.info("Circuit breaker statistics", extra=breaker.stats())
+logger.info("Retry statistics", extra=ncr.retry.budget.stats())
+logger.info("Scheduler statistics", extra=ncr.scheduler.stats())
+for datasource, stats in ncr.datasources.stats().items():
+    logger.info("Datasource statistics", extra={"datasource": datasource, **stats})
+logger.info("Cache statistics", extra=ncr.memory_cache.stats())
+logger.info("Name cache statistics", extra=name_cache_stats())
+logger.info("Chunk statistics", extra=chunk_dispatcher.stats())
+for loader in (id_name_loader, type_id_loader):
+    logger.info("Batch statistics", extra=loader.stats())
+for stats in universe_stats():
+    logger.info("Universe statistics", extra=stats)
+if ncr.cache_backend is not None:
+    logger.info("Cache statistics", extra=ncr.cache_backend.stats())
+if get_notifier().flush(timeout=CONFIG['NOTIFY_FLUSH_TIMEOUT']):
+    if ledger is not None:
+        # alerts of an incomplete run may just not have been checked, keep them
+        ledger.commit(clear=complete)
+else:
+    logger.error("Not all notifications were delivered, they are sent again next run")
+if ledger is not None:
+    logger.info("Alert statistics", extra=ledger.stats())
+for sink, stats in get_notifier().stats().items():
+    logger.info("Notification statistics", extra={"sink": sink, **stats})
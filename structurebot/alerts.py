@@ -0,0 +1,129 @@
+import sqlite3
+import threading
+import time
+
+from structurebot.logger import logger
+
+NEW = 'new'
+CHANGED = 'changed'
+REMINDER = 'reminder'
+
+
+class AlertLedger(object):
+    """Remembers the alerts sent by earlier runs
+
+    Alerts are keyed by the structure or POS ID and the kind of alert. An
+    alert is sent when it is new, when its fingerprint changed (e.g. the
+    fuel runs out on a different date or the structure is in a new state)
+    and as a reminder once cooldown seconds passed since it was last sent.
+    All alerts are read into a dict when the ledger is opened, so every
+    check is a dict lookup.
+
+    Alerts not raised again in a complete run are forgotten, they count as
+    new if they come back.
+
+    Args:
+        path (str): database file
+        cooldown (int, optional): seconds before an unchanged alert is sent again
+        timeout (float, optional): seconds to wait for a lock held by another writer
+
+    >>> ledger = AlertLedger(':memory:', cooldown=3600)
+    >>> ledger.check(1035466617946, 'fuel', '2024-01-05 11:00', now=0)
+    'new'
+    >>> ledger.check(1035466617946, 'fuel', '2024-01-05 11:00', now=60)
+    >>> ledger.check(1035466617946, 'fuel', '2024-01-07 11:00', now=120)
+    'changed'
+    >>> ledger.check(1035466617946, 'fuel', '2024-01-07 11:00', now=3720)
+    'reminder'
+    """
+
+    def __init__(self, path, cooldown=24 * 3600, timeout=30.0):
+        self.path = path
+        self.cooldown = cooldown
+        self._connection = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('CREATE TABLE IF NOT EXISTS alerts ('
+                                 'entity TEXT, kind TEXT, fingerprint TEXT, sent REAL, PRIMARY KEY (entity, kind))')
+        rows = self._connection.execute('SELECT entity, kind, fingerprint, sent FROM alerts').fetchall()
+        self._alerts = {(entity, kind): (fingerprint, sent) for entity, kind, fingerprint, sent in rows}
+        self._seen = set()
+        self._sent = {}
+        self.counts = {NEW: 0, CHANGED: 0, REMINDER: 0, 'suppressed': 0, 'cleared': 0}
+        self._lock = threading.Lock()
+
+    def check(self, entity, kind, fingerprint='', now=None):
+        """Decides whether an alert raised in this run is sent
+
+        Args:
+            entity (int): structure or POS ID
+            kind (str): kind of alert, e.g. 'fuel'
+            fingerprint (str, optional): the alert's details that make a change worth sending
+            now (float, optional): unix timestamp, defaults to time.time()
+
+        Returns:
+            str: why the alert is sent, NEW, CHANGED or REMINDER, or None to leave it out
+        """
+        key = (str(entity), kind)
+        fingerprint = str(fingerprint)
+        now = time.time() if now is None else now
+        with self._lock:
+            self._seen.add(key)
+            previous = self._alerts.get(key)
+            if previous is None:
+                reason = NEW
+            elif previous[0] != fingerprint:
+                reason = CHANGED
+            elif now - previous[1] >= self.cooldown:
+                reason = REMINDER
+            else:
+                self.counts['suppressed'] += 1
+                return None
+            self._alerts[key] = self._sent[key] = (fingerprint, now)
+            self.counts[reason] += 1
+            return reason
+
+    def commit(self, clear=True):
+        """Stores the alerts sent in this run
+
+        Call it once the alerts were delivered, otherwise they are sent again
+        by the next run.
+
+        Args:
+            clear (bool, optional): forget the alerts not raised in this run,
+                only pass True if the run checked everything
+        """
+        with self._lock:
+            sent = [(entity, kind, fingerprint, stamp) for (entity, kind), (fingerprint, stamp) in self._sent.items()]
+            cleared = [key for key in self._alerts if key not in self._seen] if clear else []
+            for key in cleared:
+                del self._alerts[key]
+            self.counts['cleared'] += len(cleared)
+            self._sent = {}
+        with self._connection:
+            self._connection.execute('BEGIN')
+            self._connection.executemany(
+                'INSERT OR REPLACE INTO alerts (entity, kind, fingerprint, sent) VALUES (?, ?, ?, ?)', sent)
+            self._connection.executemany('DELETE FROM alerts WHERE entity = ? AND kind = ?', cleared)
+        logger.info("Alert ledger saved", extra={"sent": len(sent), "cleared": len(cleared)})
+
+    def stats(self):
+        with self._lock:
+            return {'alerts': len(self._alerts), **self.counts}
+
+    def close(self):
+        self._connection.close()
+
+
+def open_alert_ledger(path, cooldown):
+    """Opens the alert ledger configured in ALERT_LEDGER_PATH and ALERT_COOLDOWN
+
+    Args:
+        path (str): database file
+        cooldown (int): seconds before an unchanged alert is sent again
+
+    Returns:
+        AlertLedger: the ledger or None if every alert is to be sent every run
+    """
+    if not path or cooldown <= 0:
+        return None
+    return AlertLedger(path, cooldown=cooldown)
@@ -5,7 +5,7 @@ from collections import Counter
 
 from methodtools import lru_cache
 
-from .util import ncr, name_to_id, names_to_ids, HTTPError  # esi_client, esi_pub, esi_auth, esi_datasource
+from .util import ncr, name_to_id, names_to_ids, type_id_loader, HTTPError  # esi_client, esi_pub, esi_auth, esi_datasource
 
 
 def is_system_id(location_id):
@@ -250,8 +250,14 @@ class BaseType(object):
 
         Returns:
             Type: Type matching name
+
+        Names registered with type_id_loader.load() beforehand are resolved
+        together with this one in a single request.
         """
-        eve_id = name_to_id(name, 'inventory_type')
+        try:
+            eve_id = type_id_loader.load(name).result()
+        except KeyError:
+            eve_id = None
         return cls.from_id(eve_id)
 
     @classmethod
@@ -320,39 +326,46 @@ class Asset(BaseType):
         return asset
 
     @classmethod
-    def from_entity_id(cls, id, id_type):
+    def from_entity_id(cls, id, id_type, location_filter=None):
         """Returns Assets owned by id of id_type
 
+        Asset pages are processed as they arrive, so only the current page of
+        raw ESI data is held in memory.
+
         Args:
             id (int): Asset owner id
             id_type (TYPE): Type of Asset owner (characters or corporations)
+            location_filter (callable, optional): only keep raw ESI assets for which this returns True
 
         Returns:
             list: Assets owned by id
         """
-        #####
         assets = []
         if id_type == 'characters':
-            assets_response, assets_response_data = ncr.get_characters_character_id_assets(id)
+            pages = ncr.iter_characters_character_id_assets(id)
         elif id_type == 'corporations':
-            assets_response, assets_response_data = ncr.get_corporations_corporation_id_assets(id)
+            pages = ncr.iter_corporations_corporation_id_assets(id)
         else:
             return assets
-        if assets_response.status_code != 200:
-            raise HTTPError(request=assets_response.request, response=assets_response)
-        for asset in assets_response_data:
-            asset_type = Type.from_id(asset['type_id'])
-            type_dict = asset_type.__dict__
-            asset.update(type_dict)
-            assets.append(cls(**asset))
+        for assets_response, assets_response_data in pages:
+            if assets_response.status_code != 200:
+                raise HTTPError(request=assets_response.request, response=assets_response)
+            for asset in assets_response_data:
+                if location_filter and not location_filter(asset):
+                    continue
+                asset_type = Type.from_id(asset['type_id'])
+                type_dict = asset_type.__dict__
+                asset.update(type_dict)
+                assets.append(cls(**asset))
         return assets
 
     @classmethod
-    def from_entity_name(cls, name):
+    def from_entity_name(cls, name, location_filter=None):
         """Return Assets owned by owner name
 
         Args:
             name (string): Character or Corporation name
+            location_filter (callable, optional): only keep raw ESI assets for which this returns True
 
         Returns:
             list: List of Assets
@@ -367,7 +380,28 @@ class Asset(BaseType):
         else:
             return None
         eve_id = id_results[id_type][name]
-        return cls.from_entity_id(eve_id, id_type)
+        return cls.from_entity_id(eve_id, id_type, location_filter=location_filter)
+
+    @staticmethod
+    def in_space_or_fitted(asset):
+        """Location filter for assets anchored in space or fitted to a structure
+
+        Args:
+            asset (dict): raw ESI asset
+
+        Returns:
+            boolean: asset is in space or in a fitting slot
+
+        >>> Asset.in_space_or_fitted({'location_type': 'solar_system', 'location_flag': 'AutoFit'})
+        True
+        >>> Asset.in_space_or_fitted({'location_type': 'item', 'location_flag': 'ServiceSlot0'})
+        True
+        >>> Asset.in_space_or_fitted({'location_type': 'item', 'location_flag': 'CorpSAG1'})
+        False
+        """
+        if asset.get('location_type') == 'solar_system':
+            return True
+        return asset.get('location_flag', '').startswith(tuple(Fitting.slots))
 
 
 class Fitting(object):
@@ -0,0 +1,77 @@
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from structurebot.logger import logger
+from structurebot.neucore_requester import NCR
+
+ENDPOINT_PREFIXES = ('get_', 'post_', 'nc_', 'esi_')
+
+
+class AsyncNCR(object):
+    """asyncio client with the same endpoint methods as NCR
+
+    Every call runs the matching NCR method, so pagination, caching and
+    logging behave exactly the same. At most concurrency calls are in flight,
+    the rest wait on a semaphore. The connection pools of the client are
+    grown to concurrency if they are smaller, so concurrent calls reuse
+    connections. The worker threads are started on the first call, close()
+    or leaving the async with block stops them.
+
+    >>> async def structures(client, corporation_id, structure_ids):
+    ...     return await asyncio.gather(*[client.get_universe_structures_structure_id(structure_id=s)
+    ...                                   for s in structure_ids])
+
+    Args:
+        ncr (NCR): client the requests are made with
+        concurrency (int, optional): maximum number of requests in flight
+    """
+
+    def __init__(self, ncr: NCR, concurrency: int = 20) -> None:
+        self.ncr = ncr
+        self.concurrency = max(1, int(concurrency))
+        self.ncr.set_pool_size(self.concurrency)
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._executor = None
+        self._lock = threading.Lock()
+
+        logger.debug("Class init", extra={"concurrency": self.concurrency})
+
+    @property
+    def executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="async-ncr")
+            return self._executor
+
+    async def _run(self, method, *args, **kwargs):
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, functools.partial(method, *args, **kwargs))
+
+    def close(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def _mirror(name):
+    async def method(self, *args, **kwargs):
+        return await self._run(getattr(self.ncr, name), *args, **kwargs)
+    method.__name__ = name
+    method.__qualname__ = 'AsyncNCR.' + name
+    method.__doc__ = getattr(NCR, name).__doc__
+    return method
+
+
+for _name in dir(NCR):
+    if _name.startswith(ENDPOINT_PREFIXES) and callable(getattr(NCR, _name)):
+        setattr(AsyncNCR, _name, _mirror(_name))
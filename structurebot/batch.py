@@ -0,0 +1,118 @@
+import threading
+
+from structurebot.logger import logger
+
+
+class BatchFuture(object):
+    """Result of a lookup registered with a BatchLoader
+
+    Asking for the result sends the loader's pending batch if it hasn't been
+    sent yet, so every lookup registered before the first result() shares
+    one bulk request.
+    """
+
+    def __init__(self, loader, key):
+        self.loader = loader
+        self.key = key
+        self.done = False
+        self._value = None
+        self._error = None
+
+    def _resolve(self, value=None, error=None):
+        self._value = value
+        self._error = error
+        self.done = True
+
+    def result(self):
+        """Returns the looked up value
+
+        Raises:
+            KeyError: the batch function returned nothing for the key
+        """
+        if not self.done:
+            self.loader.dispatch()
+        if self._error is not None:
+            raise self._error
+        return self._value
+
+
+class BatchLoader(object):
+    """Collects single lookups and sends them as one bulk request
+
+    Callers register keys with load() and get a BatchFuture back. The first
+    result() sends all pending keys to batch_fn at once and resolves every
+    future from its answer. Values are memoized, a key is only sent once.
+
+    Args:
+        batch_fn (callable): takes a list of keys, returns a dict of key: value
+        name (str, optional): name of the lookup, used for logging
+
+    >>> calls = []
+    >>> def double(keys):
+    ...     calls.append(keys)
+    ...     return {k: k * 2 for k in keys}
+    >>> loader = BatchLoader(double)
+    >>> futures = [loader.load(k) for k in [1, 2, 3, 2]]
+    >>> [f.result() for f in futures], calls
+    ([2, 4, 6, 4], [[1, 2, 3]])
+    """
+
+    def __init__(self, batch_fn, name='batch'):
+        self.batch_fn = batch_fn
+        self.name = name
+        self.batches = 0
+        self.loads = 0
+        self._futures = {}  # key: BatchFuture
+        self._pending = []
+        self._lock = threading.RLock()
+
+    def load(self, key):
+        """Registers a lookup
+
+        Args:
+            key: key to look up
+
+        Returns:
+            BatchFuture: future of the value
+        """
+        with self._lock:
+            self.loads += 1
+            future = self._futures.get(key)
+            if future is None:
+                future = self._futures[key] = BatchFuture(self, key)
+                self._pending.append(key)
+            return future
+
+    def load_many(self, keys):
+        return [self.load(key) for key in keys]
+
+    def dispatch(self):
+        """Sends all pending keys in one call of batch_fn and resolves their futures"""
+        with self._lock:
+            keys, self._pending = self._pending, []
+            if not keys:
+                return
+            self.batches += 1
+            logger.info("Dispatching batch", extra={"loader": self.name, "keys": len(keys)})
+            try:
+                values = self.batch_fn(keys)
+            except Exception as e:
+                for key in keys:
+                    # a failed batch is retried on the next load
+                    self._futures.pop(key)._resolve(error=e)
+                raise
+            for key in keys:
+                if key in values:
+                    self._futures[key]._resolve(value=values[key])
+                else:
+                    self._futures[key]._resolve(error=KeyError(key))
+
+    def clear(self):
+        """Forgets memoized values, pending lookups are kept"""
+        with self._lock:
+            self._futures = {key: self._futures[key] for key in self._pending}
+
+    def stats(self):
+        with self._lock:
+            return {'loader': self.name, 'loads': self.loads, 'batches': self.batches,
+                    'keys': len(self._futures)}
@@ -0,0 +1,128 @@
+import threading
+import time
+from collections import deque
+
+import requests
+from requests.exceptions import RequestException
+
+from structurebot.logger import logger
+
+
+class CircuitOpenError(RequestException):
+    """An upstream is failing and requests to it are refused without sending them"""
+
+
+class CircuitBreaker(object):
+    """Fails fast while an upstream is down
+
+    The breaker is closed while the upstream is healthy. Once at least
+    min_requests requests were made within window seconds and failure_rate of
+    them failed (5xx responses, connection errors or timeouts), it opens and
+    refuses requests with CircuitOpenError. After reset_timeout seconds it
+    half-opens and lets a single probe through: success closes it again,
+    failure opens it for another reset_timeout.
+
+    Args:
+        name (str): upstream name used in logs and errors
+        failure_rate (float, optional): share of failed requests that opens the breaker
+        min_requests (int, optional): requests within the window before the rate is judged
+        window (float, optional): seconds of outcomes taken into account
+        reset_timeout (float, optional): seconds until an open breaker lets a probe through
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name, failure_rate=0.5, min_requests=10, window=60.0, reset_timeout=30.0):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_requests = min_requests
+        self.window = window
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.opened_at = None
+        self.trips = 0
+        self.rejected = 0
+        self._outcomes = deque()  # (timestamp, failed)
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def before_request(self):
+        """Lets a request through or refuses it
+
+        Raises:
+            CircuitOpenError: the breaker is open or a half-open probe is already in flight
+        """
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                logger.info("Circuit half-open, probing", extra={"upstream": self.name})
+                self.state = self.HALF_OPEN
+                self._probing = False
+            if self.state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return
+            if self.state != self.CLOSED:
+                self.rejected += 1
+                raise CircuitOpenError('{} is failing, request refused by circuit breaker'.format(self.name))
+
+    def record(self, failed):
+        """Records the outcome of a request let through by before_request
+
+        Args:
+            failed (bool): the request failed
+        """
+        now = time.monotonic()
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._probing = False
+                if failed:
+                    self._open(now)
+                else:
+                    logger.warning("Circuit closed", extra={"upstream": self.name})
+                    self.state = self.CLOSED
+                    self._outcomes.clear()
+                return
+            self._outcomes.append((now, failed))
+            while self._outcomes and now - self._outcomes[0][0] > self.window:
+                self._outcomes.popleft()
+            failures = sum(1 for timestamp, f in self._outcomes if f)
+            if self.state == self.CLOSED and len(self._outcomes) >= self.min_requests and \
+                    failures / len(self._outcomes) >= self.failure_rate:
+                self._open(now)
+
+    def _open(self, now):
+        logger.critical("Circuit opened", extra={"upstream": self.name, "reset_timeout": self.reset_timeout})
+        self.state = self.OPEN
+        self.opened_at = now
+        self.trips += 1
+
+    def call(self, send):
+        """Sends a request through the breaker
+
+        Args:
+            send (callable): sends the request and returns a requests.Response
+
+        Returns:
+            requests.Response: the response
+
+        Raises:
+            CircuitOpenError: the breaker refused the request
+        """
+        self.before_request()
+        try:
+            response = send()
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            self.record(failed=True)
+            raise
+        except BaseException:
+            # not the upstream's fault, but a half-open probe must not stay in flight forever
+            with self._lock:
+                self._probing = False
+            raise
+        self.record(failed=response.status_code >= 500)
+        return response
+
+    def stats(self):
+        with self._lock:
+            return {'upstream': self.name, 'state': self.state, 'trips': self.trips, 'rejected': self.rejected}
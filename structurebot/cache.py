@@ -0,0 +1,492 @@
+import datetime
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlencode
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from structurebot.logger import logger
+
+
+def parse_http_date(value):
+    """Parses an HTTP date header into a unix timestamp
+
+    Args:
+        value (str): header value, e.g. 'Sat, 24 Dec 2023 12:00:00 GMT'
+
+    Returns:
+        float: unix timestamp or None if the value can't be parsed
+
+    >>> parse_http_date('Sat, 24 Dec 2023 12:00:00 GMT')
+    1703419200.0
+    >>> parse_http_date('garbage')
+    """
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def request_key(url, params=None):
+    """Builds a canonical cache key for a GET request
+
+    Parameters are sorted, so the key doesn't depend on dict insertion order.
+
+    Args:
+        url (str): request url
+        params (dict, optional): query parameters
+
+    Returns:
+        str: cache key
+
+    >>> request_key('https://esi.evetech.net/latest/universe/types/34/', {'page': 2, 'datasource': 'tranquility'})
+    'https://esi.evetech.net/latest/universe/types/34/?datasource=tranquility&page=2'
+    >>> request_key('https://esi.evetech.net/latest/universe/types/34/')
+    'https://esi.evetech.net/latest/universe/types/34/'
+    """
+    if not params:
+        return url
+    return url + '?' + urlencode(sorted(params.items()))
+
+
+def expires_at(headers, now=None):
+    """Calculates when a response stops being fresh
+
+    The lifetime is taken from Expires relative to the server's Date header,
+    so a skewed local clock doesn't shorten or stretch it.
+
+    Args:
+        headers (dict): response headers
+        now (float, optional): local unix timestamp, defaults to time.time()
+
+    Returns:
+        float: local unix timestamp after which the response is stale
+
+    >>> expires_at({'Date': 'Sat, 24 Dec 2023 12:00:00 GMT',
+    ...             'Expires': 'Sat, 24 Dec 2023 12:05:00 GMT'}, now=1000.0)
+    1300.0
+    >>> expires_at({}, now=1000.0)
+    1000.0
+    """
+    now = time.time() if now is None else now
+    expires = parse_http_date(headers.get('Expires'))
+    if expires is None:
+        return now
+    date = parse_http_date(headers.get('Date'))
+    if date is None:
+        return expires
+    return now + max(0.0, expires - date)
+
+
+class CacheEntry(object):
+    """A cached 200 response with its freshness information
+
+    Args:
+        url (str): url the response was fetched from
+        content (bytes): response body, already content-decoded
+        headers (dict): response headers
+        expires (float): local unix timestamp after which the entry is stale
+    """
+
+    def __init__(self, url, content, headers, expires):
+        self.url = url
+        self.content = content
+        self.headers = CaseInsensitiveDict(headers)
+        self.expires = expires
+
+    @classmethod
+    def from_response(cls, response):
+        """Creates a new CacheEntry from a 200 response
+
+        Args:
+            response (requests.Response): response to cache
+
+        Returns:
+            CacheEntry: entry for response
+        """
+        return cls(response.url, response.content, response.headers, expires_at(response.headers))
+
+    @property
+    def etag(self):
+        return self.headers.get('ETag')
+
+    @property
+    def last_modified(self):
+        return self.headers.get('Last-Modified')
+
+    @property
+    def fresh(self):
+        return time.time() < self.expires
+
+    @property
+    def validators(self):
+        """Conditional request headers to revalidate a stale entry"""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+    def revalidated(self, response):
+        """Updates freshness from a 304 Not Modified response
+
+        Args:
+            response (requests.Response): the 304 response
+        """
+        self.headers.update(response.headers)
+        self.expires = expires_at(response.headers)
+
+    def to_response(self):
+        """Rebuilds a requests.Response from the entry
+
+        Returns:
+            requests.Response: 200 response with the cached body and headers
+        """
+        response = requests.Response()
+        response.status_code = 200
+        response.url = self.url
+        response._content = self.content
+        response.headers = CaseInsensitiveDict(self.headers)
+        response.elapsed = datetime.timedelta(0)
+        response.request = requests.Request('GET', self.url).prepare()
+        response.from_cache = True
+        return response
+
+
+class LRUCache(object):
+    """In-memory response cache bounded by the size of the cached bodies
+
+    The least recently used entries are evicted once the bodies exceed
+    max_bytes, and every entry is dropped ttl seconds after it was stored.
+
+    Args:
+        max_bytes (int): budget for the cached bodies in bytes
+        ttl (int, optional): seconds an entry is kept in memory
+    """
+
+    def __init__(self, max_bytes, ttl=3600):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key: (entry, size, stored)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def entry_size(entry):
+        return len(entry.content or b'')
+
+    def get(self, key):
+        """Looks up a cache entry and marks it as recently used
+
+        Args:
+            key (str): canonical request key
+
+        Returns:
+            CacheEntry: the entry, fresh or stale, or None
+        """
+        with self._lock:
+            try:
+                entry, size, stored = self._entries[key]
+            except KeyError:
+                self.misses += 1
+                return None
+            if time.time() - stored > self.ttl:
+                self._evict(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def set(self, key, entry):
+        """Stores a cache entry, evicting least recently used entries if over budget
+
+        Args:
+            key (str): canonical request key
+            entry (CacheEntry): entry to store
+        """
+        size = self.entry_size(entry)
+        with self._lock:
+            if key in self._entries:
+                self._evict(key, count=False)
+            if size > self.max_bytes:
+                logger.info("Response too large for memory cache", extra={"key": key, "size": size})
+                return
+            self._entries[key] = (entry, size, time.time())
+            self.size += size
+            while self.size > self.max_bytes:
+                self._evict(next(iter(self._entries)))
+
+    def _evict(self, key, count=True):
+        entry, size, stored = self._entries.pop(key)
+        self.size -= size
+        if count:
+            self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._evict(key, count=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            return {'backend': 'memory', 'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'entries': len(self._entries), 'bytes': self.size}
+
+
+class SQLiteCache(object):
+    """Persistent response cache backed by SQLite in WAL mode
+
+    Safe to share between threads and between processes using the same file:
+    every thread gets its own connection and writers wait for each other
+    instead of failing. Stale entries are kept for revalidation until they
+    are older than max_stale.
+
+    Args:
+        path (str): database file
+        max_stale (int, optional): seconds to keep entries after they expired
+        timeout (float, optional): seconds to wait for a lock held by another writer
+    """
+
+    def __init__(self, path, max_stale=7 * 24 * 3600, timeout=30.0):
+        self.path = path
+        self.max_stale = max_stale
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        connection = self._connection()
+        connection.execute('CREATE TABLE IF NOT EXISTS responses ('
+                           'key TEXT PRIMARY KEY, url TEXT, content BLOB, headers TEXT, expires REAL)')
+        connection.execute('CREATE INDEX IF NOT EXISTS responses_expires ON responses (expires)')
+        self.purge()
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            # autocommit, every statement is its own short transaction
+            connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    def _count(self, counter, n=1):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + n)
+
+    def get(self, key):
+        """Looks up a cache entry
+
+        Args:
+            key (str): canonical request key
+
+        Returns:
+            CacheEntry: the entry, fresh or stale, or None
+        """
+        row = self._connection().execute('SELECT url, content, headers, expires FROM responses WHERE key = ?',
+                                          (key,)).fetchone()
+        if row is None:
+            self._count('misses')
+            return None
+        self._count('hits')
+        url, content, headers, expires = row
+        return CacheEntry(url, content, json.loads(headers), expires)
+
+    def set(self, key, entry):
+        """Stores a cache entry, replacing an existing one
+
+        Args:
+            key (str): canonical request key
+            entry (CacheEntry): entry to store
+        """
+        self._connection().execute('INSERT OR REPLACE INTO responses (key, url, content, headers, expires) '
+                                   'VALUES (?, ?, ?, ?, ?)',
+                                   (key, entry.url, entry.content, json.dumps(dict(entry.headers)), entry.expires))
+
+    def delete(self, key):
+        self._connection().execute('DELETE FROM responses WHERE key = ?', (key,))
+
+    def purge(self):
+        """Evicts entries that are stale for longer than max_stale
+
+        Returns:
+            int: number of evicted entries
+        """
+        cursor = self._connection().execute('DELETE FROM responses WHERE expires < ?',
+                                            (time.time() - self.max_stale,))
+        evicted = max(cursor.rowcount, 0)
+        self._count('evictions', evicted)
+        return evicted
+
+    def stats(self):
+        with self._lock:
+            return {'backend': 'sqlite', 'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+
+    def close(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+
+class SQLiteNameCache(object):
+    """Persistent store of resolved names and IDs, shared between runs
+
+    Uses the response cache's database file in its own tables. Entries are
+    served for ttl seconds after they were resolved, names and IDs of the
+    EVE universe rarely change. Names and IDs ESI couldn't resolve are kept
+    for negative_ttl seconds.
+
+    Args:
+        path (str): database file
+        ttl (int, optional): seconds a resolved name is valid
+        negative_ttl (int, optional): seconds an unresolvable name or ID isn't looked up again
+        timeout (float, optional): seconds to wait for a lock held by another writer
+    """
+
+    def __init__(self, path, ttl=12 * 3600, negative_ttl=24 * 3600, timeout=30.0):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.timeout = timeout
+        self._local = threading.local()
+        connection = self._connection()
+        connection.execute('CREATE TABLE IF NOT EXISTS names ('
+                           'id INTEGER PRIMARY KEY, name TEXT, category TEXT, stored REAL)')
+        connection.execute('CREATE INDEX IF NOT EXISTS names_name ON names (name)')
+        connection.execute('CREATE TABLE IF NOT EXISTS unresolved ('
+                           'kind TEXT, value TEXT, stored REAL, PRIMARY KEY (kind, value))')
+        self.purge()
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    def load(self):
+        """Reads all entries that are still valid
+
+        Returns:
+            list: (id, name, category) tuples
+        """
+        return self._connection().execute('SELECT id, name, category FROM names WHERE stored >= ?',
+                                          (time.time() - self.ttl,)).fetchall()
+
+    def set_many(self, entries):
+        """Stores resolved entries, replacing existing ones for the same ID
+
+        Args:
+            entries (iterable): (id, name, category) tuples
+        """
+        now = time.time()
+        connection = self._connection()
+        with connection:
+            connection.execute('BEGIN')
+            connection.executemany('INSERT OR REPLACE INTO names (id, name, category, stored) VALUES (?, ?, ?, ?)',
+                                   [(entry_id, name, category, now) for entry_id, name, category in entries])
+
+    def load_unresolved(self):
+        """Reads the names and IDs that couldn't be resolved recently
+
+        Returns:
+            list: unresolved names
+            list: unresolved IDs
+        """
+        rows = self._connection().execute('SELECT kind, value FROM unresolved WHERE stored >= ?',
+                                          (time.time() - self.negative_ttl,)).fetchall()
+        return [value for kind, value in rows if kind == 'name'], [int(value) for kind, value in rows if kind == 'id']
+
+    def set_unresolved(self, names=(), ids=()):
+        """Stores names and IDs ESI couldn't resolve
+
+        Args:
+            names (iterable, optional): unresolved names
+            ids (iterable, optional): unresolved IDs
+        """
+        now = time.time()
+        rows = [('name', name, now) for name in names] + [('id', str(entry_id), now) for entry_id in ids]
+        if not rows:
+            return
+        connection = self._connection()
+        with connection:
+            connection.execute('BEGIN')
+            connection.executemany('INSERT OR REPLACE INTO unresolved (kind, value, stored) VALUES (?, ?, ?)', rows)
+
+    def purge(self):
+        """Removes expired entries
+
+        Returns:
+            int: number of removed entries
+        """
+        connection = self._connection()
+        cursor = connection.execute('DELETE FROM names WHERE stored < ?', (time.time() - self.ttl,))
+        removed = max(cursor.rowcount, 0)
+        cursor = connection.execute('DELETE FROM unresolved WHERE stored < ?', (time.time() - self.negative_ttl,))
+        return removed + max(cursor.rowcount, 0)
+
+    def close(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+
+def open_name_cache(backend, path, ttl=12 * 3600, negative_ttl=24 * 3600):
+    """Creates the persistent name cache next to the response cache
+
+    Args:
+        backend (str): 'sqlite' or 'none', see CACHE_BACKEND
+        path (str): location of the cache
+        ttl (int, optional): seconds a resolved name is valid
+        negative_ttl (int, optional): seconds an unresolvable name or ID isn't looked up again
+
+    Returns:
+        SQLiteNameCache: the name cache or None if persistent caching is disabled
+    """
+    if backend and backend.lower() == 'sqlite':
+        return SQLiteNameCache(path, ttl=ttl, negative_ttl=negative_ttl)
+    return None
+
+
+def open_cache(backend, path):
+    """Creates the persistent cache backend configured in CACHE_BACKEND
+
+    Args:
+        backend (str): 'sqlite' or 'none'
+        path (str): location of the cache
+
+    Returns:
+        SQLiteCache: the backend or None if persistent caching is disabled
+    """
+    if not backend or backend.lower() == 'none':
+        return None
+    if backend.lower() == 'sqlite':
+        return SQLiteCache(path)
+    logger.error("Unknown cache backend, persistent caching disabled", extra={"backend": backend})
+    return None
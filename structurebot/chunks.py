@@ -0,0 +1,88 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from structurebot.logger import logger
+
+
+class ChunkDispatcher(object):
+    """Sends the chunks of bulk ESI lookups concurrently
+
+    All bulk helpers share one executor, so at most max_workers chunks are
+    in flight over all of them. Results come back in chunk order no matter
+    which chunk finished first. A chunk that dispatches chunks itself runs
+    them inline instead of waiting for a worker of its own pool.
+
+    Args:
+        max_workers (int, optional): chunks sent at the same time
+
+    >>> dispatcher = ChunkDispatcher(max_workers=2)
+    >>> dispatcher.map(sum, [1, 2, 3, 4, 5], 2, 'sum')
+    [3, 7, 5]
+    """
+
+    def __init__(self, max_workers=4):
+        self.max_workers = max(1, int(max_workers))
+        self.chunks = 0
+        self.seconds = 0.0
+        self.slowest = 0.0
+        self._executor = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="chunk")
+            return self._executor
+
+    def _run(self, fn, chunk, index, operation):
+        nested = getattr(self._local, 'in_chunk', False)
+        self._local.in_chunk = True
+        started = time.monotonic()
+        try:
+            return fn(chunk)
+        finally:
+            self._local.in_chunk = nested
+            duration = time.monotonic() - started
+            with self._lock:
+                self.chunks += 1
+                self.seconds += duration
+                self.slowest = max(self.slowest, duration)
+            logger.info("Chunk finished",
+                        extra={"operation": operation, "chunk": index, "size": len(chunk), "duration": duration})
+
+    def map(self, fn, items, chunk_size, operation):
+        """Calls fn with every chunk of items and collects the results
+
+        Args:
+            fn (callable): takes a list of up to chunk_size items
+            items (list): items to split into chunks
+            chunk_size (int): maximum items per chunk
+            operation (str): name of the lookup, used for logging
+
+        Returns:
+            list: the results of fn in chunk order
+        """
+        chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+        if len(chunks) < 2 or getattr(self._local, 'in_chunk', False):
+            return [self._run(fn, chunk, index, operation) for index, chunk in enumerate(chunks)]
+        futures = [self.executor.submit(self._run, fn, chunk, index, operation)
+                   for index, chunk in enumerate(chunks)]
+        try:
+            return [future.result() for future in futures]
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def stats(self):
+        with self._lock:
+            return {'chunks': self.chunks, 'seconds': round(self.seconds, 3), 'slowest': round(self.slowest, 3)}
+
+    def shutdown(self):
+        # finishing chunks take the lock for their stats, so don't hold it while waiting for them
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
@@ -5,7 +5,7 @@ import datetime
 from .assets import Fitting, Asset, Type
 from .config import CONFIG
 from .universe import System
-from .util import ncr, name_to_id, ids_to_names, HTTPError
+from .util import ncr, name_to_id, id_name_loader, HTTPError
 from structurebot.logger import logger
 
 
@@ -25,8 +25,9 @@ class Structure(object):
         if self.system_id:
             self.system = System.from_id(self.system_id)
             self.system_name = self.system.name
-            self.constellation_name = self.system.constellation.name
-            self.region_name = self.system.constellation.region.name
+            constellation = self.system.constellation
+            self.constellation_name = constellation.name if constellation else None
+            self.region_name = constellation.region.name if constellation and constellation.region else None
         self.fuel = fuel
         self.fuel_expires = None
         if fuel_expires:
@@ -209,11 +210,13 @@ class Structure(object):
         structure_keys = ['structure_id', 'corporation_id', 'system_id', 'type_id',
                           'services', 'fuel_expires', 'state', 'state_timer_end',
                           'unanchors_at', 'profile_id']
-        for s in structures:
+        # all type names are resolved with one request on the first result()
+        type_names = [id_name_loader.load(s['type_id']) for s in structures]
+        for s, type_name in zip(structures, type_names):
             sid = s['structure_id']
             kwargs = {k: v for k, v in s.items() if k in structure_keys}
             # Old Code: kwargs['type_name'] = ids_to_names([s['type_id']])[s['type_id']]
-            kwargs['type_name'] = ids_to_names([s['type_id']])[s['type_id']]
+            kwargs['type_name'] = type_name.result()
             kwargs['detonation'] = detonations.get(sid)
 
             structure_contents = None
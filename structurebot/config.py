@@ -8,9 +8,46 @@ CONFIG = {
     'NEUCORE_APP_SECRET': os.getenv('NEUCORE_APP_SECRET'),
     'NEUCORE_DATASOURCE': os.getenv('NEUCORE_DATASOURCE'),
 
+    'NOTIFY_SINKS': os.getenv('NOTIFY_SINKS', 'slack'),
     'OUTBOUND_WEBHOOK': os.getenv('OUTBOUND_WEBHOOK'),
+    'DISCORD_WEBHOOK': os.getenv('DISCORD_WEBHOOK'),
+    'NOTIFY_FILE': os.getenv('NOTIFY_FILE'),
+    'NOTIFY_FLUSH_TIMEOUT': float(os.getenv('NOTIFY_FLUSH_TIMEOUT', 120)),
+    'ALERT_COOLDOWN': int(os.getenv('ALERT_COOLDOWN', 24 * 3600)),
+    'ALERT_LEDGER_PATH': os.getenv('ALERT_LEDGER_PATH', '.structurebot-alerts.sqlite'),
 
     'ESI_HOST': os.getenv('ESI_HOST'),
+    'NCR_PAGE_WORKERS': int(os.getenv('NCR_PAGE_WORKERS', 8)),
+    'CHUNK_WORKERS': int(os.getenv('CHUNK_WORKERS', 4)),
+    'CACHE_ESI': os.getenv('CACHE_ESI', 'True').lower() == 'true',
+    'CACHE_NC': os.getenv('CACHE_NC', 'True').lower() == 'true',
+    'CACHE_BACKEND': os.getenv('CACHE_BACKEND', 'sqlite'),
+    'CACHE_PATH': os.getenv('CACHE_PATH', '.structurebot-cache.sqlite'),
+    'CACHE_MEMORY_BYTES': int(os.getenv('CACHE_MEMORY_BYTES', 64 * 1024 * 1024)),
+    'CACHE_MEMORY_TTL': int(os.getenv('CACHE_MEMORY_TTL', 3600)),
+    'JSON_BACKEND': os.getenv('JSON_BACKEND', 'json'),
+    'NAME_CACHE_TTL': int(os.getenv('NAME_CACHE_TTL', 12 * 3600)),
+    'STATIC_UNIVERSE': os.getenv('STATIC_UNIVERSE'),
+    'UNIVERSE_TTL': int(os.getenv('UNIVERSE_TTL', 24 * 3600)),
+    'NAME_NEGATIVE_TTL': int(os.getenv('NAME_NEGATIVE_TTL', 24 * 3600)),
+    'ESI_ERROR_LIMIT_SLOW': int(os.getenv('ESI_ERROR_LIMIT_SLOW', 50)),
+    'ESI_ERROR_LIMIT_PAUSE': int(os.getenv('ESI_ERROR_LIMIT_PAUSE', 10)),
+    'RETRY_ATTEMPTS': int(os.getenv('RETRY_ATTEMPTS', 3)),
+    'RETRY_BACKOFF': float(os.getenv('RETRY_BACKOFF', 0.5)),
+    'RETRY_MAX_BACKOFF': float(os.getenv('RETRY_MAX_BACKOFF', 10)),
+    'RETRY_BUDGET': int(os.getenv('RETRY_BUDGET', 30)),
+    'HTTP_CONNECT_TIMEOUT': float(os.getenv('HTTP_CONNECT_TIMEOUT', 5)),
+    'HTTP_READ_TIMEOUT': float(os.getenv('HTTP_READ_TIMEOUT', 30)),
+    'HTTP_TRANSPORT': os.getenv('HTTP_TRANSPORT', 'requests'),
+    'HTTP_POOL_CONNECTIONS': int(os.getenv('HTTP_POOL_CONNECTIONS', 10)),
+    'HTTP_POOL_MAXSIZE': int(os.getenv('HTTP_POOL_MAXSIZE', 20)),
+    'RUN_DEADLINE': float(os.getenv('RUN_DEADLINE', 300)),
+    'SCHEDULER_MAX_CONCURRENT': int(os.getenv('SCHEDULER_MAX_CONCURRENT', 20)),
+    'LOW_PRIORITY_CUTOFF': float(os.getenv('LOW_PRIORITY_CUTOFF', 60)),
+    'BREAKER_FAILURE_RATE': float(os.getenv('BREAKER_FAILURE_RATE', 0.5)),
+    'BREAKER_MIN_REQUESTS': int(os.getenv('BREAKER_MIN_REQUESTS', 10)),
+    'BREAKER_WINDOW': float(os.getenv('BREAKER_WINDOW', 60)),
+    'BREAKER_RESET_TIMEOUT': float(os.getenv('BREAKER_RESET_TIMEOUT', 30)),
     'CORPORATION_NAME': os.getenv('CORPORATION_NAME'),
     'TOO_SOON': datetime.timedelta(days=int(os.getenv('TOO_SOON', 3))),
     'STRONT_HOURS': int(os.getenv('STRONT_HOURS', 12)),
@@ -0,0 +1,155 @@
+import threading
+
+from requests.exceptions import RequestException
+
+from structurebot.logger import logger
+
+# Neucore and ESI answers meaning the character can't be used at all
+DEAD_MARKERS = ('character not found', 'no valid token', 'invalid token', 'token is expired',
+                'authentication failure', 'eve login')
+# ESI answers meaning the character lacks a corporation role for this endpoint
+ROLE_MARKERS = ('required role',)
+
+
+class NoDatasourceError(RequestException):
+    """None of the configured Neucore datasources can be used"""
+
+
+class Datasource(object):
+    """A character whose ESI token Neucore uses for authenticated requests
+
+    Args:
+        character_id (str): EVE character id
+        login (str, optional): Neucore EVE login name
+    """
+
+    def __init__(self, character_id, login=None):
+        self.character_id = str(character_id)
+        self.login = login
+        self.alive = True
+        self.requests = 0
+        self.failures = 0
+
+    @property
+    def headers(self):
+        headers = {'Neucore-EveCharacter': self.character_id}
+        if self.login:
+            headers['Neucore-EveLogin'] = str(self.login)
+        return headers
+
+    def __str__(self):
+        if self.login:
+            return '{}:{}'.format(self.character_id, self.login)
+        return self.character_id
+
+
+def datasource_error(response):
+    """Classifies a Neucore response as a datasource problem
+
+    Args:
+        response (requests.Response): Neucore response
+
+    Returns:
+        str: 'dead' if the character can't be used anymore, 'role' if it lacks a role for
+             this request, None if the response isn't about the datasource
+    """
+    if response.status_code not in (400, 401, 403):
+        return None
+    text = '{} {}'.format(response.reason or '', response.text or '').lower()
+    if any(marker in text for marker in DEAD_MARKERS):
+        return 'dead'
+    if any(marker in text for marker in ROLE_MARKERS):
+        return 'role'
+    return None
+
+
+class DatasourcePool(object):
+    """Spreads authenticated Neucore requests over several characters
+
+    Datasources are handed out round robin. A datasource whose character or
+    token is gone is taken out of rotation for the rest of the run.
+
+    Args:
+        datasources (list): Datasources to use
+
+    >>> pool = DatasourcePool.from_config('96061222:structures, 1073945516:structures')
+    >>> [str(d) for d in pool.datasources]
+    ['96061222:structures', '1073945516:structures']
+    >>> str(pool.acquire()), str(pool.acquire()), str(pool.acquire())
+    ('96061222:structures', '1073945516:structures', '96061222:structures')
+    """
+
+    def __init__(self, datasources):
+        self.datasources = list(datasources)
+        self._next = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, value):
+        """Parses NEUCORE_DATASOURCE, a comma separated list of character id:login name
+
+        Args:
+            value (str): e.g. '96061222:structures,1073945516:structures'
+
+        Returns:
+            DatasourcePool: pool of the configured datasources
+        """
+        datasources = []
+        for entry in (value or '').split(','):
+            entry = entry.strip()
+            if not entry:
+                continue
+            character_id, _, login = entry.partition(':')
+            datasources.append(Datasource(character_id, login or None))
+        return cls(datasources)
+
+    @property
+    def alive(self):
+        return [d for d in self.datasources if d.alive]
+
+    def acquire(self, exclude=()):
+        """Picks the next datasource in rotation
+
+        Args:
+            exclude (iterable, optional): datasources not to pick
+
+        Returns:
+            Datasource: the datasource to send the request with
+
+        Raises:
+            NoDatasourceError: all datasources are dead or excluded
+        """
+        with self._lock:
+            for i in range(len(self.datasources)):
+                datasource = self.datasources[(self._next + i) % len(self.datasources)]
+                if datasource.alive and datasource not in exclude:
+                    self._next = (self._next + i + 1) % len(self.datasources)
+                    datasource.requests += 1
+                    return datasource
+        raise NoDatasourceError('No usable Neucore datasource left')
+
+    def report(self, datasource, response):
+        """Checks a response for datasource problems and retires dead datasources
+
+        Args:
+            datasource (Datasource): datasource the request was sent with
+            response (requests.Response): the response
+
+        Returns:
+            str: the datasource_error of the response
+        """
+        error = datasource_error(response)
+        if error is None:
+            return None
+        with self._lock:
+            datasource.failures += 1
+            if error == 'dead' and datasource.alive:
+                datasource.alive = False
+                logger.critical("Neucore datasource taken out of rotation",
+                                extra={"datasource": str(datasource), "status_code": response.status_code})
+        return error
+
+    def stats(self):
+        with self._lock:
+            return {str(d): {'alive': d.alive, 'requests': d.requests, 'failures': d.failures}
+                    for d in self.datasources}
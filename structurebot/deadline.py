@@ -0,0 +1,75 @@
+import time
+
+from requests.exceptions import RequestException
+
+
+class DeadlineExceeded(RequestException):
+    """The run deadline passed before a request could be sent"""
+
+
+class Deadline(object):
+    """Wall clock budget of a whole run
+
+    NCR checks the deadline before every request and never waits longer for
+    a response, the error limit or a retry than the time that is left.
+
+    Args:
+        seconds (float): budget in seconds, None or 0 for no deadline
+
+    >>> Deadline(None).remaining()
+    >>> Deadline(60).remaining() > 59
+    True
+    >>> Deadline(60).timeout((5, 30))
+    (5, 30)
+    """
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.expires = time.monotonic() + seconds if seconds else None
+
+    def remaining(self):
+        """Seconds left or None if there is no deadline"""
+        if self.expires is None:
+            return None
+        return max(0.0, self.expires - time.monotonic())
+
+    @property
+    def expired(self):
+        return self.remaining() == 0.0
+
+    def check(self):
+        """Raises DeadlineExceeded once the deadline passed"""
+        if self.expired:
+            raise DeadlineExceeded('Run deadline of {} seconds exceeded'.format(self.seconds))
+
+    def check_wait(self, seconds):
+        """Raises DeadlineExceeded if waiting seconds would pass the deadline
+
+        Args:
+            seconds (float): the planned wait
+
+        >>> Deadline(60).check_wait(5)
+        >>> Deadline(60).check_wait(120)  # doctest: +IGNORE_EXCEPTION_DETAIL
+        Traceback (most recent call last):
+        ...
+        structurebot.deadline.DeadlineExceeded: Run deadline of 60 seconds exceeded while waiting 120.0 seconds
+        """
+        remaining = self.remaining()
+        if remaining is not None and seconds >= remaining:
+            raise DeadlineExceeded('Run deadline of {} seconds exceeded while waiting {:.1f} seconds'.format(
+                self.seconds, seconds))
+
+    def timeout(self, timeout):
+        """Shrinks a (connect, read) timeout to the time left
+
+        Args:
+            timeout (tuple): connect and read timeout in seconds
+
+        Returns:
+            tuple: connect and read timeout in seconds
+        """
+        remaining = self.remaining()
+        if remaining is None:
+            return timeout
+        connect, read = timeout
+        return min(connect, remaining), min(read, remaining)
@@ -0,0 +1,123 @@
+import threading
+import time
+
+from structurebot.logger import logger
+
+
+class ErrorLimitGovernor(object):
+    """Holds requests back before the ESI error limit is exhausted
+
+    ESI reports the remaining error budget and the seconds until it resets in
+    the X-ESI-Error-Limit-Remain and X-ESI-Error-Limit-Reset headers of every
+    response. Below slow_threshold requests are spaced out, increasingly so
+    the lower the budget gets; at pause_threshold they wait until the window
+    resets. NCR keeps one governor per upstream, shared by all of its threads.
+
+    Args:
+        slow_threshold (int, optional): remaining errors below which requests are delayed
+        pause_threshold (int, optional): remaining errors at which requests wait for the reset
+        max_delay (float, optional): delay in seconds just above pause_threshold
+    """
+
+    def __init__(self, slow_threshold=50, pause_threshold=10, max_delay=1.0):
+        self.slow_threshold = slow_threshold
+        self.pause_threshold = pause_threshold
+        self.max_delay = max_delay
+        self.remain = None
+        self.reset_at = None
+        self.held = 0
+        self.held_seconds = 0.0
+        self.max_held_seconds = 0.0
+        self.paused = 0
+        self._lock = threading.Lock()
+
+    def update(self, headers):
+        """Reads the error limit headers of a response
+
+        Args:
+            headers (dict): response headers
+        """
+        remain = headers.get('X-ESI-Error-Limit-Remain')
+        reset = headers.get('X-ESI-Error-Limit-Reset')
+        if remain is None or reset is None:
+            return
+        try:
+            remain = int(remain)
+            reset_at = time.monotonic() + int(reset)
+        except ValueError:
+            return
+        with self._lock:
+            self.remain = remain
+            self.reset_at = reset_at
+
+    def delay(self):
+        """Calculates how long the next request has to wait
+
+        Returns:
+            float: seconds to wait, 0 if the budget is healthy
+
+        >>> governor = ErrorLimitGovernor(slow_threshold=50, pause_threshold=10, max_delay=1.0)
+        >>> governor.delay()
+        0
+        >>> governor.update({'X-ESI-Error-Limit-Remain': '100', 'X-ESI-Error-Limit-Reset': '30'})
+        >>> governor.delay()
+        0
+        >>> governor.update({'X-ESI-Error-Limit-Remain': '30', 'X-ESI-Error-Limit-Reset': '30'})
+        >>> governor.delay()
+        0.5
+        >>> governor.update({'X-ESI-Error-Limit-Remain': '10', 'X-ESI-Error-Limit-Reset': '30'})
+        >>> 29 < governor.delay() <= 30
+        True
+        """
+        with self._lock:
+            if self.remain is None:
+                return 0
+            now = time.monotonic()
+            if now >= self.reset_at:
+                # the window has reset, the budget is full again
+                self.remain = None
+                return 0
+            if self.remain <= self.pause_threshold:
+                return self.reset_at - now
+            if self.remain < self.slow_threshold:
+                used = (self.slow_threshold - self.remain) / (self.slow_threshold - self.pause_threshold)
+                return self.max_delay * used
+            return 0
+
+    def wait(self, deadline=None):
+        """Blocks the calling thread as long as the error budget requires
+
+        Args:
+            deadline (Deadline, optional): run deadline the wait has to end before
+
+        Returns:
+            float: seconds waited
+
+        Raises:
+            DeadlineExceeded: the wait would pass the deadline
+        """
+        delay = self.delay()
+        if delay <= 0:
+            return 0
+        if deadline is not None:
+            deadline.check_wait(delay)
+        pausing = self.remain is not None and self.remain <= self.pause_threshold
+        if pausing:
+            logger.warning("ESI error limit nearly exhausted, pausing until reset",
+                           extra={"remain": self.remain, "delay": delay})
+        else:
+            logger.info("ESI error limit low, slowing down", extra={"remain": self.remain, "delay": delay})
+        time.sleep(delay)
+        with self._lock:
+            self.held += 1
+            self.held_seconds += delay
+            self.max_held_seconds = max(self.max_held_seconds, delay)
+            if pausing:
+                self.paused += 1
+        return delay
+
+    def stats(self):
+        with self._lock:
+            return {'held_requests': self.held, 'held_seconds': round(self.held_seconds, 3),
+                    'max_held_seconds': round(self.max_held_seconds, 3), 'paused_requests': self.paused,
+                    'error_limit_remain': self.remain}
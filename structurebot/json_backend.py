@@ -0,0 +1,73 @@
+import importlib
+import json
+
+from structurebot.logger import logger
+
+
+def _orjson():
+    return importlib.import_module('orjson').loads
+
+
+def _msgspec():
+    return importlib.import_module('msgspec.json').decode
+
+
+# decoders are imported when selected, importing structurebot stays fast
+BACKENDS = {
+    'json': lambda: json.loads,
+    'orjson': _orjson,
+    'msgspec': _msgspec,
+}
+
+_loads = json.loads
+backend_name = 'json'
+
+
+def set_backend(name):
+    """Selects the JSON decoder used for ESI responses
+
+    orjson and msgspec decode large asset pages several times faster than
+    the standard library, but are optional. Falls back to the standard
+    library if the backend isn't installed.
+
+    Args:
+        name (str): 'json', 'orjson' or 'msgspec'
+
+    Returns:
+        str: name of the backend in use
+
+    >>> set_backend('json')
+    'json'
+    >>> set_backend('yaml')
+    'json'
+    """
+    global _loads, backend_name
+    name = (name or 'json').lower()
+    if name not in BACKENDS:
+        logger.error("Unknown JSON backend, using json", extra={"backend": name})
+        name = 'json'
+    try:
+        loads = BACKENDS[name]()
+    except ImportError:
+        logger.warning("JSON backend is not installed, using json", extra={"backend": name})
+        name, loads = 'json', json.loads
+    _loads, backend_name = loads, name
+    return backend_name
+
+
+def loads(content):
+    """Decodes a JSON response body with the selected backend
+
+    Args:
+        content (bytes or str): UTF-8 encoded JSON
+
+    Returns:
+        the decoded data
+
+    Raises:
+        ValueError: content isn't valid JSON
+
+    >>> loads(b'[{"type_id": 34}]')
+    [{'type_id': 34}]
+    """
+    return _loads(content)
@@ -0,0 +1,143 @@
+import threading
+
+
+class NameIndex(object):
+    """Bidirectional index of resolved EVE names and IDs
+
+    A name can stand for different entities in different categories, e.g. a
+    corporation and a character of the same name, so names map to their IDs
+    by category. IDs are unique over all categories. Bulk lookups split the
+    requested names or IDs into hits and misses in one pass. Names and IDs
+    ESI couldn't resolve are remembered as well and are neither found nor
+    missing.
+
+    >>> index = NameIndex()
+    >>> index.add_many([(30003801, 'Aunsou', 'systems'), (1073945516, 'n0rman', 'characters')])
+    >>> index.lookup_names(['Aunsou', 'Jita'])
+    ({'systems': {'Aunsou': 30003801}}, ['Jita'])
+    >>> index.lookup_ids([1073945516, 1])
+    ({1073945516: 'n0rman'}, [1])
+    >>> index.id_for('Aunsou', 'systems'), index.id_for('Aunsou', 'characters')
+    (30003801, None)
+    >>> index.add_unresolved(names=['Jita'], ids=[1])
+    >>> index.lookup_names(['Jita']), index.lookup_ids([1])
+    (({}, []), ({}, []))
+    """
+
+    def __init__(self):
+        self.by_name = {}  # name: {category: id}
+        self.by_id = {}  # id: (name, category)
+        self.unresolved_names = set()
+        self.unresolved_ids = set()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def add_many(self, entries):
+        """Adds resolved entries, replacing older ones with the same ID
+
+        Args:
+            entries (iterable): (id, name, category) tuples
+        """
+        with self._lock:
+            for entry_id, name, category in entries:
+                previous = self.by_id.get(entry_id)
+                if previous is not None and previous != (name, category):
+                    # renamed, drop the old name
+                    self.by_name.get(previous[0], {}).pop(previous[1], None)
+                self.by_id[entry_id] = (name, category)
+                self.by_name.setdefault(name, {})[category] = entry_id
+                self.unresolved_names.discard(name)
+                self.unresolved_ids.discard(entry_id)
+
+    def add_unresolved(self, names=(), ids=()):
+        """Remembers names and IDs ESI doesn't know, so they aren't looked up again
+
+        Args:
+            names (iterable, optional): names /universe/ids/ didn't resolve
+            ids (iterable, optional): IDs /universe/names/ rejected
+        """
+        with self._lock:
+            self.unresolved_names.update(names)
+            self.unresolved_ids.update(ids)
+
+    def add(self, entry_id, name, category):
+        self.add_many([(entry_id, name, category)])
+
+    def id_for(self, name, category):
+        """Looks up the ID of a name in one category
+
+        Args:
+            name (str): EVE name
+            category (str): ESI category, e.g. 'systems'
+
+        Returns:
+            int: the ID or None if unknown
+        """
+        with self._lock:
+            entry_id = self.by_name.get(name, {}).get(category)
+            if entry_id is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return entry_id
+
+    def lookup_names(self, names):
+        """Splits names into known and unknown ones
+
+        Args:
+            names (iterable): EVE names
+
+        Returns:
+            dict: {'category': {'name': id}} of the known names
+            list: unknown names in request order, without duplicates
+        """
+        names = list(dict.fromkeys(names))
+        found = {}
+        missing = []
+        with self._lock:
+            for name in names:
+                categories = self.by_name.get(name)
+                if not categories:
+                    if name not in self.unresolved_names:
+                        missing.append(name)
+                    continue
+                for category, entry_id in categories.items():
+                    found.setdefault(category, {})[name] = entry_id
+            self.misses += len(missing)
+            self.hits += len(names) - len(missing)
+        return found, missing
+
+    def lookup_ids(self, ids):
+        """Splits IDs into known and unknown ones
+
+        Args:
+            ids (iterable): EVE IDs
+
+        Returns:
+            dict: {id: name} of the known IDs
+            list: unknown IDs in request order, without duplicates
+        """
+        ids = list(dict.fromkeys(ids))
+        found = {}
+        missing = []
+        with self._lock:
+            for entry_id in ids:
+                entry = self.by_id.get(entry_id)
+                if entry is not None:
+                    found[entry_id] = entry[0]
+                elif entry_id not in self.unresolved_ids:
+                    missing.append(entry_id)
+            self.misses += len(missing)
+            self.hits += len(ids) - len(missing)
+        return found, missing
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'names': len(self.by_id), 'unresolved': len(self.unresolved_names) + len(self.unresolved_ids),
+                    'hits': self.hits, 'misses': self.misses,
+                    'hit_rate': round(self.hits / lookups, 3) if lookups else None}
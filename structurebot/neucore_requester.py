@@ -2,47 +2,32 @@ import base64
 import json
 import requests
 import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from urllib.parse import urlencode
+from structurebot.breaker import CircuitBreaker
+from structurebot.cache import CacheEntry, LRUCache, request_key
+from structurebot.datasources import Datasource, DatasourcePool
+from structurebot.deadline import Deadline
+from structurebot import json_backend
+from structurebot.governor import ErrorLimitGovernor
+from structurebot.retry import RetryPolicy
+from structurebot.scheduler import CRITICAL, LOW, NORMAL, PriorityScheduler
+from structurebot.singleflight import SingleFlight
+from structurebot.transport import connection_stats, create_session, set_pool_size
 from structurebot.logger import logger
 
-nc_cache_get = {}
-esi_cache_get = {}
-
-
-def try_nc_cache_get(neucore_prefix: str, params: dict):
-    key = tuple(params.items())
-    if key in nc_cache_get.keys():
-        return nc_cache_get[key]
-    return None
-
-
-def store_nc_cache_get(neucore_prefix: str, params: dict, resp):
-    key = tuple(params.items())
-    nc_cache_get[key] = resp
-
-    logger.info("Response cached")
-    logger.debug("Cached content", extra={"key": key, "response": resp})
-
-
-def try_esi_cache_get(esiurl: str, params: dict):
-    key = (esiurl, tuple(params.items()))
-    if key in esi_cache_get.keys():
-        return esi_cache_get[key]
-    return None
-
-
-def store_esi_cache_get(esiurl: str, params: dict, resp):
-    key = (esiurl, tuple(params.items()))
-    esi_cache_get[key] = resp
-
-    logger.info("Response cached")
-    logger.debug("Cached content", extra={"key": key, "response": resp})
-
 
 class NCR:
     def __init__(self, app_id: str, app_secret: str, datasource_id: str, datasource_name: str, neucore_prefix: str,
                  useragent: str = None, esi_prefix: str = "https://esi.evetech.net", esi_version: str = "/latest",
-                 cache_nc=True, cache_esi=True) -> None:
+                 cache_nc=True, cache_esi=True, page_workers: int = 8, cache_backend=None,
+                 memory_cache_bytes: int = 64 * 1024 * 1024, memory_cache_ttl: int = 3600,
+                 governors: dict = None, retry: RetryPolicy = None, timeout: tuple = (5, 30),
+                 deadline: Deadline = None, breakers: dict = None, transport: str = 'requests',
+                 pool_connections: int = 10, pool_maxsize: int = 10, datasources: DatasourcePool = None,
+                 scheduler: PriorityScheduler = None) -> None:
         self.app_id = str(app_id)
         self.app_secret = str(app_secret)
         self.neucore_prefix = str(neucore_prefix)
@@ -51,23 +36,329 @@ class NCR:
         self.cache_nc = cache_nc
         self.cache_esi = cache_esi
         self.esi_version = esi_version
-
-        self.nc_session = requests.Session()
-        self.esi_session = requests.Session()
+        self.page_workers = max(1, int(page_workers))
+        self.cache_backend = cache_backend
+        self.memory_cache = LRUCache(max_bytes=memory_cache_bytes, ttl=memory_cache_ttl)
+        # Neucore's ESI proxy reports the error limit of its own IP, so each upstream has its own budget
+        self.governors = governors or {'neucore': ErrorLimitGovernor(), 'esi': ErrorLimitGovernor()}
+        self.retry = retry or RetryPolicy()
+        self.singleflight = SingleFlight()
+        self.timeout = timeout
+        self.deadline = deadline
+        self.breakers = breakers or {'neucore': CircuitBreaker('neucore'), 'esi': CircuitBreaker('esi')}
+        self.datasources = datasources or DatasourcePool([Datasource(datasource_id, datasource_name)])
+        self.scheduler = scheduler or PriorityScheduler(max_concurrent=pool_maxsize)
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+
+        self.nc_session = create_session(transport, pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self.esi_session = create_session(transport, pool_connections=pool_connections, pool_maxsize=pool_maxsize)
         # self.nc_session.auth = (self.app_id,self.app_secret)
         b = base64.b64encode(bytes("{}:{}".format(app_id, app_secret).encode()))
         auth = "Bearer {}".format(b.decode())
         # print(type(auth),auth)
         self.nc_session.headers.update({'Authorization': auth})
-        self.nc_session.headers.update({'Neucore-EveCharacter': str(datasource_id)})
-        if datasource_name: self.nc_session.headers.update({'Neucore-EveLogin': str(datasource_name)})
+        # Neucore-EveCharacter/Neucore-EveLogin are set per request from the datasource pool
         if useragent:
             self.nc_session.headers.update({'User-Agent': useragent})
             self.esi_session.headers.update({'User-Agent': useragent})
 
         logger.debug("Class init", extra={**self.__dict__})
 
-    def nc_get(self, endpoint: str, page: int = None, query: dict = {}):
+    def set_pool_size(self, size: int):
+        """grows the connection pools of both sessions and the scheduler's concurrency
+
+        Pools are only replaced if they are smaller than size, so the open connections and the
+        configured number of hosts are kept otherwise. The scheduler is raised to size as well,
+        otherwise the extra connections would never be used.
+
+        Args:
+            size (int): number of connections kept per host
+        """
+        if size <= self.pool_maxsize:
+            return
+        self.pool_maxsize = size
+        for session in (self.nc_session, self.esi_session):
+            set_pool_size(session, size, pool_connections=self.pool_connections)
+        self.scheduler.set_max_concurrent(size)
+
+    def transport_stats(self):
+        """reports requests sent and connections opened per session
+
+        Returns:
+            dict: connection reuse statistics of the Neucore and the ESI session
+        """
+        return {'neucore': connection_stats(self.nc_session), 'esi': connection_stats(self.esi_session)}
+
+    def _send(self, upstream: str, method: str, url: str, idempotent: bool = True, priority: int = NORMAL,
+              **kwargs):
+        """sends a request, every request of NCR goes through here
+
+        Transient failures of idempotent requests are retried with backoff. Every attempt waits for
+        the upstream's error limit governor before sending and feeds it the response headers. Attempts are not
+        started after the run deadline and never wait longer than the time left before it. While the
+        upstream's circuit breaker is open requests fail right away.
+
+        Neucore requests are sent with the next datasource of the pool. If Neucore or ESI reject the
+        datasource, the request is repeated with the other datasources; dead ones leave the rotation.
+
+        Requests are admitted by the scheduler in priority order, low priority requests are dropped
+        when the run deadline gets close.
+
+        Args:
+            upstream (str): 'neucore' or 'esi'
+            method (str): HTTP method
+            url (str): request url
+            idempotent (bool, optional): the request is safe to repeat. Defaults to True.
+            priority (int, optional): CRITICAL, NORMAL or LOW. Defaults to NORMAL.
+            **kwargs: passed on to requests
+
+        Returns:
+            requests.Response : the response
+
+        Raises:
+            DeadlineExceeded: the run deadline passed
+            CircuitOpenError: the upstream is failing
+            NoDatasourceError: no Neucore datasource is left
+            RequestDropped: a low priority request was dropped close to the deadline
+        """
+        session = self.nc_session if upstream == 'neucore' else self.esi_session
+        breaker = self.breakers[upstream]
+        governor = self.governors[upstream]
+        headers = kwargs.pop('headers', None) or {}
+
+        def attempt(request_headers):
+            if self.deadline is not None:
+                self.deadline.check()
+            governor.wait(self.deadline)
+            timeout = self.timeout
+            if self.deadline is not None:
+                timeout = self.deadline.timeout(timeout)
+            with self.scheduler.slot(priority, self.deadline):
+                resp = breaker.call(lambda: session.request(method, url, timeout=timeout, headers=request_headers,
+                                                            **kwargs))
+            governor.update(resp.headers)
+            return resp
+
+        if upstream != 'neucore':
+            return self.retry.call(lambda: attempt(headers), idempotent=idempotent, deadline=self.deadline)
+
+        tried = []
+        while True:
+            datasource = self.datasources.acquire(exclude=tried)
+            resp = self.retry.call(lambda: attempt({**headers, **datasource.headers}), idempotent=idempotent,
+                                   deadline=self.deadline)
+            if self.datasources.report(datasource, resp) is None:
+                return resp
+            tried.append(datasource)
+            if not idempotent or not [d for d in self.datasources.alive if d not in tried]:
+                return resp
+            logger.warning("Datasource rejected, trying the next one",
+                           extra={"datasource": str(datasource), "status_code": resp.status_code})
+
+    @staticmethod
+    def _decode(resp):
+        """decodes a response body once with the configured JSON backend
+
+        The decoded data is logged at debug level, which costs nothing while debug logging is off.
+
+        Args:
+            resp (requests.Response): the response
+
+        Returns:
+            the json decoded content
+        """
+        data = json_backend.loads(resp.content)
+        logger.debug("Response data", extra={"data": data})
+        return data
+
+    def _merge_page(self, data, page_data, page: int):
+        """merges a single page into the data collected so far
+
+        Args:
+            data (list or dict): data of the previous pages
+            page_data (list or dict): data of the page to merge
+            page (int): number of the page to merge, used for logging
+
+        Returns:
+            list or dict: the merged data
+        """
+        if type(data) == dict and type(page_data) == dict:
+            # update dictionaries
+            data.update(page_data)
+        elif type(data) == list and type(page_data) == list:
+            # update lists
+            data += page_data
+        else:
+            # we should only have lists and dicts
+            logger.error("Wrong response type",
+                         extra={"pageNo": page, "expected": f"{list} or {dict}", "received": type(data)})
+        return data
+
+    def _fetch_remaining_pages(self, data, page_max: int, fetch_page):
+        """fetches pages 2 to page_max concurrently and merges them in page order
+
+        Args:
+            data (list or dict): data of the first page
+            page_max (int): value of the X-Pages header
+            fetch_page (callable): takes a page number and returns (response, data) of that page
+
+        Returns:
+            list or dict: data of all pages
+        """
+        pages = range(2, page_max + 1)  # request page 2+ if possible
+        if not pages:
+            return data
+        workers = min(self.page_workers, len(pages))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ncr-page") as executor:
+            # map() yields in submission order, so pages are merged in order regardless of arrival
+            for page, (page_resp, page_data) in zip(pages, executor.map(fetch_page, pages)):
+                data = self._merge_page(data, page_data, page)
+        return data
+
+    def _cache_get(self, key: str):
+        """looks up a cache entry in memory, then in the persistent backend
+
+        Entries found in the persistent backend are kept in memory for the rest of the run.
+        """
+        entry = self.memory_cache.get(key)
+        if entry is None and self.cache_backend is not None:
+            entry = self.cache_backend.get(key)
+            if entry is not None:
+                self.memory_cache.set(key, entry)
+        return entry
+
+    def _cache_store(self, key: str, entry: CacheEntry):
+        """stores a cache entry in memory and in the persistent backend"""
+        self.memory_cache.set(key, entry)
+        if self.cache_backend is not None:
+            self.cache_backend.set(key, entry)
+
+        logger.info("Response cached")
+        logger.debug("Cached content", extra={"key": key, "expires": entry.expires, "etag": entry.etag})
+
+    def _get(self, upstream: str, url: str, params: dict, use_cache: bool, priority: int = NORMAL):
+        """makes a GET request, honouring the Expires and ETag/Last-Modified headers of cached responses
+
+        Fresh cache entries are served without touching the network, stale ones are revalidated
+        with a conditional request and served from the cache if the server answers 304.
+        Identical GETs in flight at the same time are sent once and share the response.
+
+        Args:
+            upstream (str): 'neucore' or 'esi'
+            url (str): request url
+            params (dict): query parameters, including the page
+            use_cache (bool): read from and write to the cache
+            priority (int, optional): CRITICAL, NORMAL or LOW. Defaults to NORMAL.
+
+        Returns:
+            requests.Response : the response, rebuilt from the cache if fresh or not modified
+        """
+        key = request_key(url, params)
+        return self.singleflight.do(key, lambda: self._get_once(upstream, key, url, params, use_cache, priority))
+
+    def _get_once(self, upstream: str, key: str, url: str, params: dict, use_cache: bool, priority: int):
+        entry = self._cache_get(key) if use_cache else None
+        if entry and entry.fresh:
+            logger.info("Response served from cache", extra={"url": entry.url, "expires": entry.expires})
+            return entry.to_response()
+
+        headers = entry.validators if entry else {}
+        resp = self._send(upstream, 'GET', url, priority=priority, params=params, headers=headers)
+
+        logger.info("Response",
+                    extra={"method": resp.request.method,
+                           "url": resp.url,
+                           "status_code": resp.status_code,
+                           "duration": resp.elapsed.total_seconds()})
+
+        if resp.status_code == 304 and entry:
+            logger.info("Response not modified", extra={"url": entry.url, "etag": entry.etag})
+            entry.revalidated(resp)
+            self._cache_store(key, entry)
+            return entry.to_response()
+
+        if resp.status_code != 200:
+            logger.critical("Request not processed", extra={"status_code": resp.status_code})
+
+        if resp.status_code == 200 and use_cache:
+            logger.info("Caching response", extra={"cacheFlag": use_cache})
+            self._cache_store(key, CacheEntry.from_response(resp))
+
+        return resp
+
+    def iter_pages(self, endpoint: str, query: dict = {}, neucore: bool = True, priority: int = NORMAL):
+        """yields the pages of a paginated ESI-GET one by one
+
+        The first page is fetched to read X-Pages, then up to page_workers pages are fetched ahead
+        concurrently. Pages are yielded in order as soon as they arrived, so callers can process and
+        drop each page instead of holding the whole response in memory.
+
+        Args:
+            endpoint (str): the desired ESI endpoint
+            query (dict, optional): additional query parameters
+            neucore (bool, optional): route the requests through Neucore. Defaults to True.
+            priority (int, optional): CRITICAL, NORMAL or LOW. Defaults to NORMAL.
+
+        Yields:
+            requests.Response : the response of a page
+            data : the json decoded content of that page
+        """
+        get = self.nc_get if neucore else self.esi_get
+
+        def fetch_page(page):
+            return get(endpoint=endpoint, page=page, query=query, priority=priority)
+
+        resp, data = fetch_page(1)
+        yield resp, data
+        page_max = int(resp.headers.get('X-Pages', 1))
+        if resp.status_code != 200 or page_max < 2:
+            return
+
+        logger.info("Streaming multiple pages", extra={"page_max": page_max})
+        pages = iter(range(2, page_max + 1))
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=min(self.page_workers, page_max - 1),
+                                thread_name_prefix="ncr-page") as executor:
+            try:
+                for page in islice(pages, self.page_workers):
+                    pending.append(executor.submit(fetch_page, page))
+                while pending:
+                    resp, data = pending.popleft().result()
+                    page = next(pages, None)
+                    if page is not None:
+                        pending.append(executor.submit(fetch_page, page))
+                    yield resp, data
+            finally:
+                # the caller stopped early, don't fetch pages nobody will read
+                for future in pending:
+                    future.cancel()
+
+    def iter_items(self, endpoint: str, query: dict = {}, neucore: bool = True, priority: int = NORMAL):
+        """yields the items of a paginated ESI-GET returning lists, page by page
+
+        Args:
+            endpoint (str): the desired ESI endpoint
+            query (dict, optional): additional query parameters
+            neucore (bool, optional): route the requests through Neucore. Defaults to True.
+            priority (int, optional): CRITICAL, NORMAL or LOW. Defaults to NORMAL.
+
+        Yields:
+            the json decoded items
+
+        Raises:
+            HTTPError: a page could not be fetched
+        """
+        for resp, data in self.iter_pages(endpoint=endpoint, query=query, neucore=neucore, priority=priority):
+            if resp.status_code != 200:
+                raise requests.exceptions.HTTPError(request=resp.request, response=resp)
+            if not type(data) == list:
+                logger.error("Wrong response type",
+                             extra={"endpoint": endpoint, "expected": list, "received": type(data)})
+                continue
+            yield from data
+
+    def nc_get(self, endpoint: str, page: int = None, query: dict = {}, priority: int = NORMAL):
         """routes an ESI-GET through Neucore
 
         used for protected data
@@ -76,14 +367,12 @@ class NCR:
             endpoint (str): the desired ESI endpoint
             page (int, optional): returns only the specified page. If None concats all pages into the initial request.
                                   Defaults to None.
+            priority (int, optional): CRITICAL, NORMAL or LOW. Defaults to NORMAL.
 
         Returns:
             requests.Response : the requests response
             data : the json decoded response content
         """
-
-        # TODO add caching here
-        # TODO add page-handling
         query_params = query.copy()
 
         url = self.neucore_prefix
@@ -91,33 +380,17 @@ class NCR:
             query_params['page'] = page
 
         if query_params:
-            params = {'esi-path-query': self.esi_version + endpoint + "?" + urlencode(query_params)}
+            # sorted, so the cache and singleflight keys don't depend on the caller's dict order
+            query_string = urlencode(sorted(query_params.items()))
+            params = {'esi-path-query': self.esi_version + endpoint + "?" + query_string}
         else:
             params = {'esi-path-query': self.esi_version + endpoint}
 
         logger.info("Request parameters", extra={"query": params})
 
-        resp = None  # try_nc_cache_get(url, params=params)
-        if not resp:
-
-            resp = self.nc_session.get(url, params=params)
+        resp = self._get('neucore', url, params, self.cache_nc, priority)
 
-            if resp.status_code != 200:
-                logger.critical("Request not processed", extra={"status_code": resp.status_code})
-
-            logger.info("Response",
-                        extra={"method": resp.request.method,
-                               "url": resp.url,
-                               "status_code": resp.status_code,
-                               "duration": resp.elapsed.total_seconds()})
-            logger.debug("Response data", extra={"data": resp.json()})
-
-            if resp.status_code == 200 and self.cache_nc:
-                logger.info("Caching response", extra={"cacheFlag": self.cache_nc})
-                # cache resp
-                store_nc_cache_get(url, params=params, resp=resp)
-
-        resp_data = resp.json()
+        resp_data = self._decode(resp)
 
         if page:
             # only requested this page
@@ -127,65 +400,32 @@ class NCR:
             page_max = int(resp.headers['X-Pages'])
 
             logger.info("Response contains multiple pages", extra={"pageNo": page_max})
-
-            page = 2  # request page 2+ if possible
-            while page <= page_max:
-                page_resp, page_data = self.nc_get(endpoint=endpoint, page=page, query=query)
-                page = page + 1
-
-                if type(resp_data) == dict and type(page_data) == dict:
-                    # update dictionaries
-                    resp_data.update(page_data)
-                elif type(resp_data) == list and type(page_data) == list:
-                    # update dictionaries
-                    resp_data += page_data
-                else:
-                    # we should only have lists and dicts
-                    logger.error("Wrong response type",
-                                 extra={"expected": f"{list} or {dict}", "received": type(resp_data)})
-
-                    pass
+            resp_data = self._fetch_remaining_pages(
+                resp_data, page_max, lambda p: self.nc_get(endpoint=endpoint, page=p, query=query, priority=priority))
 
         return resp, resp_data
 
-    def esi_get(self, endpoint: str, page=None, query: dict = {}):
+    def esi_get(self, endpoint: str, page=None, query: dict = {}, priority: int = NORMAL):
         """makes a GET request directly to the ESI
 
         Used for public data
 
         Args:
             endpoint (str): the desired ESI endpoint
+            priority (int, optional): CRITICAL, NORMAL or LOW. Defaults to NORMAL.
 
         Returns:
             requests.Response : the requests response generated
         """
-        # TODO add caching here
-        # TODO add page-handling
-
         params = query.copy()
         if page:
             params['page'] = page
 
         logger.info("Request parameters", extra={"query": params})
 
-        resp = None  # try_esi_cache_get(self.esi_prefix+endpoint,params=params)
-        if not resp:
-            resp = self.esi_session.get(self.esi_prefix + self.esi_version + endpoint, params=params)
-            
-            if resp.status_code != 200:
-                logger.critical("Request not processed", extra={"status_code": resp.status_code})
-                
-            if resp.status_code == 200 and self.cache_esi:
-                store_esi_cache_get(self.esi_prefix + endpoint, params=params, resp=resp)
-
-        logger.info("Response",
-                    extra={"method": resp.request.method,
-                           "url": resp.url,
-                           "status_code": resp.status_code,
-                           "duration": resp.elapsed.total_seconds()})
-        logger.debug("Response data", extra={"data": resp.json()})
+        resp = self._get('esi', self.esi_prefix + self.esi_version + endpoint, params, self.cache_esi, priority)
 
-        data = resp.json()
+        data = self._decode(resp)
 
         if page:
             # only requested this page
@@ -194,32 +434,20 @@ class NCR:
         if 'X-Pages' in resp.headers.keys():
             page_max = int(resp.headers['X-Pages'])
             logger.info("Response contains multiple pages", extra={"page_max": page_max})
-            page = 2  # request page 2+ if possible
-            while page <= page_max:
-                page_resp, page_data = self.esi_get(endpoint=endpoint, page=page, query=query)
-                page = page + 1
-
-                if type(data) == dict and type(page_data) == dict:
-                    # update dictionaries
-                    data.update(page_data)
-                elif type(data) == list and type(page_data) == list:
-                    # update dictionaries
-                    data += page_data
-                else:
-                    # we should only have lists and dicts
-                    logger.error("Wrong response type",
-                                 extra={"pageNo": page, "expected": f"{list} or {dict}", "received": type(data)})
-
-                    pass
+            data = self._fetch_remaining_pages(
+                data, page_max, lambda p: self.esi_get(endpoint=endpoint, page=p, query=query, priority=priority))
         return resp, data
 
-    def nc_post(self, endpoint: str, data, page=None, query: dict = {}):
+    def nc_post(self, endpoint: str, data, page=None, query: dict = {}, idempotent: bool = False,
+                priority: int = NORMAL):
         """routes an ESI-POST through Neucore
 
         used for protected data
 
         Args:
             endpoint (str): the desired ESI endpoint
+            idempotent (bool, optional): the POST only looks data up and may be retried. Defaults to False.
+            priority (int, optional): CRITICAL, NORMAL or LOW. Defaults to NORMAL.
 
         Returns:
             requests.Response : the requests response generated
@@ -231,13 +459,16 @@ class NCR:
             query_params['page'] = page
 
         if query_params:
-            params = {'esi-path-query': self.esi_version + endpoint + "?" + urlencode(query_params)}
+            # sorted, so the cache and singleflight keys don't depend on the caller's dict order
+            query_string = urlencode(sorted(query_params.items()))
+            params = {'esi-path-query': self.esi_version + endpoint + "?" + query_string}
         else:
             params = {'esi-path-query': self.esi_version + endpoint}
 
         logger.info("Request parameters", extra={"query": params})
 
-        resp = self.nc_session.post(self.neucore_prefix, data=json.dumps(data), params=params)
+        resp = self._send('neucore', 'POST', self.neucore_prefix, idempotent=idempotent, priority=priority,
+                          data=json.dumps(data), params=params)
 
         if resp.status_code != 200:
             logger.critical("Request not processed", extra={"status_code": resp.status_code})
@@ -247,9 +478,7 @@ class NCR:
                            "url": resp.url,
                            "status_code": resp.status_code,
                            "duration": resp.elapsed.total_seconds()})
-        logger.debug("Response data", extra={"data": resp.json()})
-        
-        resp_data = resp.json()
+        resp_data = self._decode(resp)
 
         if page:
             # only requested this specific page
@@ -259,36 +488,25 @@ class NCR:
         if 'X-Pages' in resp.headers.keys():
             page_max = int(resp.headers['X-Pages'])
             logger.info("Response contains multiple pages", extra={"page_max": page_max})
-            page = 2  # request page 2+ if possible
-            while page <= page_max:
-
-                page_resp, page_data = self.nc_post(endpoint=endpoint, data=data, page=page, query=query)
-                page = page + 1
-
-                if type(resp_data) == dict and type(page_data) == dict:
-                    # update dictionaries
-                    resp_data.update(page_data)
-                elif type(resp_data) == list and type(page_data) == list:
-                    # update lists
-                    resp_data += page_data
-                else:
-                    # we should only have lists and dicts
-                    logger.error("Wrong response type",
-                                 extra={"expected": f"{list} or {dict}", "received": type(resp_data)})
-
-                    pass
+            resp_data = self._fetch_remaining_pages(
+                resp_data, page_max,
+                lambda p: self.nc_post(endpoint=endpoint, data=data, page=p, query=query, idempotent=idempotent,
+                                          priority=priority))
             return resp, resp_data
 
         # we have no pages.
         return resp, resp_data
 
-    def esi_post(self, endpoint: str, data, page=None, query: dict = {}):
+    def esi_post(self, endpoint: str, data, page=None, query: dict = {}, idempotent: bool = False,
+                 priority: int = NORMAL):
         """makes a POST request directly to the ESI
 
         used for protected data
 
         Args:
             endpoint (str): the desired ESI endpoint
+            idempotent (bool, optional): the POST only looks data up and may be retried. Defaults to False.
+            priority (int, optional): CRITICAL, NORMAL or LOW. Defaults to NORMAL.
 
         Returns:
             requests.Response : the requests response generated
@@ -304,8 +522,8 @@ class NCR:
 
         logger.info("Request parameters", extra={"query": params})
 
-        resp = self.esi_session.post(self.esi_prefix + self.esi_version + endpoint, data=json.dumps(data),
-                                     params=params)
+        resp = self._send('esi', 'POST', self.esi_prefix + self.esi_version + endpoint,
+                          idempotent=idempotent, priority=priority, data=json.dumps(data), params=params)
 
         if resp.status_code != 200:
             logger.critical("Request not processed", extra={"status_code": resp.status_code})
@@ -315,9 +533,7 @@ class NCR:
                            "url": resp.url,
                            "status_code": resp.status_code,
                            "duration": resp.elapsed.total_seconds()})
-        logger.debug("Response data", extra={"data": resp.json()})
-
-        resp_data = resp.json()
+        resp_data = self._decode(resp)
 
         if page:
             # only requested this page
@@ -326,24 +542,10 @@ class NCR:
         if 'X-Pages' in resp.headers.keys():
             page_max = int(resp.headers['X-Pages'])
             logger.info("Response contains multiple pages", extra={"page_max": page_max})
-            page = 2  # request page 2+ if possible
-            while page <= page_max:
-
-                page_resp, page_data = self.esi_post(endpoint=endpoint, data=data, page=page, query=query)
-                page = page + 1
-
-                if type(resp_data) == dict and type(page_data) == dict:
-                    # update dictionaries
-                    resp_data.update(page_data)
-                elif type(data) == list and type(page_data) == list:
-                    # update dictionaries
-                    resp_data += page_data
-                else:
-                    # we should only have lists and dicts
-                    logger.error("Wrong response type",
-                                 extra={"expected": f"{list} or {dict}", "received": type(resp_data)})
-
-                    pass
+            resp_data = self._fetch_remaining_pages(
+                resp_data, page_max,
+                lambda p: self.esi_post(endpoint=endpoint, data=data, page=p, query=query, idempotent=idempotent,
+                                          priority=priority))
         return resp, resp_data
 
     def get_universe_structures_structure_id(self, structure_id):
@@ -356,7 +558,7 @@ class NCR:
 
     def get_corporations_corporation_id_structures(self, corporation_id):
         endpoint = "/corporations/{corporation_id}/structures/".format(corporation_id=corporation_id)
-        response, data = self.nc_get(endpoint=endpoint)
+        response, data = self.nc_get(endpoint=endpoint, priority=CRITICAL)
         if not type(data) == list:
             logger.warning("Wrong data type",
                            extra={"endpoint": endpoint, "expected": list, "received": type(data)})
@@ -364,7 +566,7 @@ class NCR:
 
     def get_corporation_corporation_id_mining_extractions(self, corporation_id):
         endpoint = "/corporation/{corporation_id}/mining/extractions/".format(corporation_id=corporation_id)
-        response, data = self.nc_get(endpoint=endpoint)
+        response, data = self.nc_get(endpoint=endpoint, priority=CRITICAL)
         if not type(data) == list:
             logger.warning("Wrong data type",
                            extra={"endpoint": endpoint, "expected": list, "received": type(data)})
@@ -375,7 +577,7 @@ class NCR:
                                                               system_id):
         endpoint = "/corporations/{corporation_id}/starbases/{starbase_id}/".format(corporation_id=corporation_id,
                                                                                     starbase_id=starbase_id)
-        response, data = self.nc_get(endpoint=endpoint, query={'system_id': system_id})
+        response, data = self.nc_get(endpoint=endpoint, query={'system_id': system_id}, priority=CRITICAL)
         if not type(data) == dict:
             logger.warning("Wrong data type",
                            extra={"endpoint": endpoint, "expected": dict, "received": type(data)})
@@ -383,7 +585,7 @@ class NCR:
 
     def get_corporations_corporation_id_starbases(self, corporation_id):
         endpoint = "/corporations/{corporation_id}/starbases/".format(corporation_id=corporation_id)
-        response, data = self.nc_get(endpoint=endpoint)
+        response, data = self.nc_get(endpoint=endpoint, priority=CRITICAL)
         if not type(data) == list:
             logger.warning("Wrong data type",
                            extra={"endpoint": endpoint, "expected": list, "received": type(data)})
@@ -399,7 +601,7 @@ class NCR:
 
     def get_universe_moons_moon_id(self, moon_id):
         endpoint = "/universe/moons/{moon_id}/".format(moon_id=moon_id)
-        response, data = self.esi_get(endpoint=endpoint)
+        response, data = self.esi_get(endpoint=endpoint, priority=LOW)
         if not type(data) == dict:
             logger.warning("Wrong data type",
                            extra={"endpoint": endpoint, "expected": dict, "received": type(data)})
@@ -407,7 +609,7 @@ class NCR:
 
     def post_corporations_corporation_id_assets_locations(self, corporation_id, asset_ids: list):
         endpoint = "/corporations/{corporation_id}/assets/locations/".format(corporation_id=corporation_id)
-        response, data = self.nc_post(endpoint=endpoint, data=asset_ids)
+        response, data = self.nc_post(endpoint=endpoint, data=asset_ids, idempotent=True, priority=CRITICAL)
         if not type(data) == list:
             logger.warning("Wrong data type",
                            extra={"endpoint": endpoint, "expected": list, "received": type(data)})
@@ -432,7 +634,7 @@ class NCR:
     def post_universe_ids(self, ids: list):
         endpoint = "/universe/ids/"
         # note: contrary to my understanding of ESI, data should not be 'names':[items] but rather just [items]
-        response, data = self.esi_post(endpoint=endpoint, data=ids)
+        response, data = self.esi_post(endpoint=endpoint, data=ids, idempotent=True)
         if not type(data) == dict:
             logger.warning("Wrong data type",
                            extra={"endpoint": endpoint, "expected": dict, "received": type(data)})
@@ -440,7 +642,7 @@ class NCR:
 
     def post_universe_names(self, names: list):
         endpoint = "/universe/names/"
-        response, data = self.esi_post(endpoint=endpoint, data=names)
+        response, data = self.esi_post(endpoint=endpoint, data=names, idempotent=True)
         if not type(data) == list:
             logger.warning("Wrong data type",
                            extra={"endpoint": endpoint, "expected": list, "received": type(data)})
@@ -448,7 +650,7 @@ class NCR:
 
     def get_universe_constellations_constellation_id(self, constellation_id):
         endpoint = "/universe/constellations/{constellation_id}/".format(constellation_id=constellation_id)
-        response, data = self.esi_get(endpoint=endpoint)
+        response, data = self.esi_get(endpoint=endpoint, priority=LOW)
         if not type(data) == dict:
             logger.warning("Wrong data type",
                            extra={"endpoint": endpoint, "expected": dict, "received": type(data)})
@@ -456,7 +658,7 @@ class NCR:
 
     def get_universe_regions_region_id(self, region_id):
         endpoint = "/universe/regions/{region_id}/".format(region_id=region_id)
-        response, data = self.esi_get(endpoint=endpoint)
+        response, data = self.esi_get(endpoint=endpoint, priority=LOW)
         if not type(data) == dict:
             logger.warning("Wrong data type",
                            extra={"endpoint": endpoint, "expected": dict, "received": type(data)})
@@ -488,7 +690,7 @@ class NCR:
 
     def get_characters_character_id_assets(self, character_id):
         endpoint = "/characters/{character_id}/assets/".format(character_id=character_id)
-        response, data = self.nc_get(endpoint=endpoint)
+        response, data = self.nc_get(endpoint=endpoint, priority=CRITICAL)
         if not type(data) == list:
             logger.warning("Wrong data type",
                            extra={"endpoint": endpoint, "expected": list, "received": type(data)})
@@ -496,12 +698,20 @@ class NCR:
 
     def get_corporations_corporation_id_assets(self, corporation_id):
         endpoint = "/corporations/{corporation_id}/assets/".format(corporation_id=corporation_id)
-        response, data = self.nc_get(endpoint=endpoint)
+        response, data = self.nc_get(endpoint=endpoint, priority=CRITICAL)
         if not type(data) == list:
             logger.warning("Wrong data type",
                            extra={"endpoint": endpoint, "expected": list, "received": type(data)})
         return response, data
 
+    def iter_characters_character_id_assets(self, character_id):
+        endpoint = "/characters/{character_id}/assets/".format(character_id=character_id)
+        return self.iter_pages(endpoint=endpoint, priority=CRITICAL)
+
+    def iter_corporations_corporation_id_assets(self, corporation_id):
+        endpoint = "/corporations/{corporation_id}/assets/".format(corporation_id=corporation_id)
+        return self.iter_pages(endpoint=endpoint, priority=CRITICAL)
+
 
 if __name__ == "__main__":
     app_id = ""
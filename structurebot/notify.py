@@ -0,0 +1,268 @@
+import datetime
+import json
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import requests
+
+from structurebot.logger import logger
+
+
+def _pieces(message, limit):
+    """Cuts a message longer than limit at line breaks, overlong lines at limit"""
+    if len(message) <= limit:
+        return [message]
+    pieces, current = [], ''
+    for line in message.split('\n'):
+        while len(line) > limit:
+            if current:
+                pieces.append(current)
+                current = ''
+            pieces.append(line[:limit])
+            line = line[limit:]
+        candidate = current + '\n' + line if current else line
+        if len(candidate) <= limit:
+            current = candidate
+        else:
+            pieces.append(current)
+            current = line
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def split_messages(messages, limit=None, separator='\n\n'):
+    """Joins messages into as few parts as fit a sink's size limit
+
+    Messages are only cut if one alone exceeds the limit, preferably at a
+    line break.
+
+    Args:
+        messages (list): message strings
+        limit (int, optional): maximum characters per part, None for no limit
+        separator (str, optional): put between messages of the same part
+
+    Returns:
+        list: parts to send in order
+
+    >>> split_messages(['aaaa', 'bbbb', 'cc'], limit=10)
+    ['aaaa\\n\\nbbbb', 'cc']
+    >>> split_messages(['aaaa\\nbbbb\\ncccc'], limit=10)
+    ['aaaa\\nbbbb', 'cccc']
+    >>> split_messages(['aaaa', 'bbbb'])
+    ['aaaa\\n\\nbbbb']
+    """
+    messages = [m for m in messages if m]
+    if limit is None:
+        return [separator.join(messages)] if messages else []
+    parts, current = [], ''
+    for message in messages:
+        for piece in _pieces(message, limit):
+            candidate = current + separator + piece if current else piece
+            if len(candidate) <= limit:
+                current = candidate
+            else:
+                parts.append(current)
+                current = piece
+    if current:
+        parts.append(current)
+    return parts
+
+
+class Sink(object):
+    """Destination of notifications
+
+    Subclasses implement send(), which delivers one part of at most limit
+    characters or raises.
+    """
+    name = 'sink'
+    limit = None
+
+    def send(self, text):
+        raise NotImplementedError
+
+
+class WebhookSink(Sink):
+    """Posts notifications to a chat webhook
+
+    Args:
+        url (str): webhook URL
+        breaker (CircuitBreaker, optional): circuit breaker of the webhook
+        retry (RetryPolicy, optional): retries rate limits and failed connections, webhook posts
+            aren't idempotent, so nothing that may have been posted is sent again
+        timeout (tuple, optional): connect and read timeout in seconds
+        post (callable, optional): sends the request, defaults to requests.post
+    """
+    field = 'text'
+
+    def __init__(self, url, breaker=None, retry=None, timeout=None, post=requests.post):
+        self.url = url
+        self.breaker = breaker
+        self.retry = retry
+        self.timeout = timeout
+        self.post = post
+
+    def send(self, text):
+        """Posts one part
+
+        Args:
+            text (str): message text
+
+        Raises:
+            requests.exceptions.RequestException: the webhook failed
+        """
+        def post():
+            return self.post(self.url, json={self.field: text}, timeout=self.timeout)
+        send = post if self.breaker is None else lambda: self.breaker.call(post)
+        response = send() if self.retry is None else self.retry.call(send, idempotent=False)
+        response.raise_for_status()
+
+
+class SlackSink(WebhookSink):
+    name = 'slack'
+    field = 'text'
+    limit = 40000  # Slack truncates longer message texts
+
+
+class DiscordSink(WebhookSink):
+    name = 'discord'
+    field = 'content'
+    limit = 2000  # Discord rejects longer message contents
+
+
+class FileSink(Sink):
+    """Appends notifications to a file, one JSON object per line
+
+    Args:
+        path (str): file to append to
+    """
+    name = 'file'
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def send(self, text):
+        line = json.dumps({'time': datetime.datetime.now(datetime.timezone.utc).isoformat(), 'text': text})
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+
+
+class StdoutSink(Sink):
+    """Prints notifications
+
+    Args:
+        stream (file, optional): stream to print to, defaults to sys.stdout
+    """
+    name = 'stdout'
+
+    def __init__(self, stream=None):
+        self.stream = stream
+
+    def send(self, text):
+        print(text, file=self.stream or sys.stdout, flush=True)
+
+
+class Notifier(object):
+    """Sends notifications to several sinks in the background
+
+    notify() splits the messages at every sink's limit and returns right
+    away, each sink gets its parts in order on a thread of its own. A
+    failing sink doesn't hold up the others. flush() waits for the
+    deliveries, call it before the process exits.
+
+    Args:
+        sinks (list): Sink instances
+
+    >>> class Collector(Sink):
+    ...     limit = 10
+    ...     parts = []
+    ...     def send(self, text):
+    ...         self.parts.append(text)
+    >>> notifier = Notifier([Collector()])
+    >>> notifier.notify(['aaaa', 'bbbb', 'cc'])
+    >>> notifier.flush(), Collector.parts
+    (True, ['aaaa\\n\\nbbbb', 'cc'])
+    """
+
+    def __init__(self, sinks):
+        self.sinks = list(sinks)
+        self._futures = []
+        self._undelivered = False
+        self._executor = None
+        self._stats = {sink.name: {'parts': 0, 'sent': 0, 'failed': 0} for sink in self.sinks}
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=max(1, len(self.sinks)),
+                                                    thread_name_prefix="notify")
+            return self._executor
+
+    def notify(self, messages):
+        """Queues messages for delivery to all sinks
+
+        Args:
+            messages (list): message strings
+        """
+        if not self.sinks and any(messages):
+            logger.error("No notification sink configured, messages are dropped", extra={"messages": len(messages)})
+            with self._lock:
+                self._undelivered = True
+        for sink in self.sinks:
+            parts = split_messages(messages, sink.limit)
+            if not parts:
+                continue
+            future = self.executor.submit(self._deliver, sink, parts)
+            with self._lock:
+                self._futures.append(future)
+
+    def _deliver(self, sink, parts):
+        for index, part in enumerate(parts):
+            try:
+                sink.send(part)
+            except Exception as e:
+                logger.error("Notification failed",
+                             extra={"sink": sink.name, "part": index, "parts": len(parts), "error": str(e)})
+                self._count(sink, 'failed')
+            else:
+                self._count(sink, 'sent')
+
+    def _count(self, sink, outcome):
+        with self._lock:
+            self._stats[sink.name]['parts'] += 1
+            self._stats[sink.name][outcome] += 1
+
+    def flush(self, timeout=None):
+        """Waits for queued notifications
+
+        Args:
+            timeout (float, optional): seconds to wait at most
+
+        Returns:
+            bool: True if every part was delivered, False if messages were dropped for lack of sinks
+        """
+        with self._lock:
+            futures, self._futures = self._futures, []
+        done, not_done = wait(futures, timeout=timeout)
+        if not_done:
+            logger.error("Notifications still pending", extra={"pending": len(not_done)})
+        with self._lock:
+            failed = sum(stats['failed'] for stats in self._stats.values())
+            undelivered = self._undelivered
+        return not not_done and not failed and not undelivered
+
+    def stats(self):
+        with self._lock:
+            return {name: dict(stats) for name, stats in self._stats.items()}
+
+    def shutdown(self):
+        # workers take the lock to count, so don't hold it while waiting for them
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
@@ -9,7 +9,8 @@ import sys
 from .assets import Asset, is_system_id
 from .config import CONFIG
 from .pos_resources import pos_fuel
-from .util import ncr, name_to_id, HTTPError
+from .scheduler import RequestDropped
+from .util import ncr, name_to_id, chunk_dispatcher, HTTPError
 from structurebot.logger import logger
 
 def nearest(source, destinations):
@@ -150,7 +151,11 @@ class Pos(Asset):
         try:
             return self._moon_name
         except AttributeError:
-            moon_name_response, moon_name_response_data = ncr.get_universe_moons_moon_id(moon_id=self.moon_id)
+            try:
+                moon_name_response, moon_name_response_data = ncr.get_universe_moons_moon_id(moon_id=self.moon_id)
+            except RequestDropped:
+                # the run deadline is close, name the POS by its system instead
+                return '{} moon {}'.format(self.system_name, self.moon_id)
             if moon_name_response.status_code == 200:
                 self._moon_name = moon_name_response_data['name']
             return self._moon_name
@@ -168,11 +173,14 @@ def item_locations(ids):
     location_dict = {}
     chunks = 1000
     ids = list(set(ids))
-    for items in [ids[i:i + chunks] for i in range(0, len(ids), chunks)]:
 
+    def locate(items):
         location_response, locations = ncr.post_corporations_corporation_id_assets_locations(
             corporation_id=CONFIG['CORP_ID'], asset_ids=items)
+        return locations
 
+    # chunks are sent concurrently, their results merged in chunk order
+    for locations in chunk_dispatcher.map(locate, ids, chunks, 'item_locations'):
         for location in locations:
             i = int(location.get('item_id'))
             location_dict[i] = location.get('position')
@@ -200,19 +208,24 @@ def sov_systems(sov_holder_id):
     return sov_systems
 
 
-def check_pos(corp_name, corp_assets=None):
+def check_pos(corp_name, corp_assets=None, ledger=None):
     """
     Check POS for fuel and status
-    
-    Returns:
-        list: list of alert strings
+
+    Args:
+        corp_name (str): corporation owning the POS
+        corp_assets (list, optional): the corporation's assets
+        ledger (AlertLedger, optional): leaves out alerts that were already sent
+
+    Yields:
+        str: alert strings, each one right after the ledger recorded it, so the
+        caller keeps the alerts found before a request fails
 
     """
-    messages = []
     corp_id = name_to_id(CONFIG['CORPORATION_NAME'], 'corporation')
     pos_list = Pos.from_corp_name(corp_name, corp_assets)
     if not pos_list:
-        return messages
+        return
     alliance_id_response, alliance_id_response_data = ncr.get_corporations_corporation_id(corporation_id=corp_id)
     if 'alliance_id' in alliance_id_response_data.keys():
         alliance_id = alliance_id_response_data['alliance_id']
@@ -223,6 +236,9 @@ def check_pos(corp_name, corp_assets=None):
     for pos in pos_list:
         # TODO: All this could be done in the Pos object for easier testing
         # But POS are going away ;)
+        def send(kind, fingerprint=''):
+            return ledger is None or ledger.check(pos.item_id, kind, fingerprint)
+
         sov = pos.system_id in sovs
         # has_stront = False
         has_fuel = False
@@ -237,7 +253,8 @@ def check_pos(corp_name, corp_assets=None):
                 reinforce_hours = int(fuel.quantity / rate)
                 if reinforce_hours < CONFIG['STRONT_HOURS']:
                     message = '{} has {} hours of stront'.format(pos.moon_name, reinforce_hours)
-                    messages.append(message)
+                    if send('stront', reinforce_hours):
+                        yield message
             else:
                 has_fuel = True
                 if pos.state == 'offline':
@@ -246,7 +263,8 @@ def check_pos(corp_name, corp_assets=None):
                 if how_soon < CONFIG['TOO_SOON']:
                     days = 'day' if how_soon == 1 else 'days'
                     message = '{} has {} {} of fuel'.format(pos.moon_name, how_soon, days)
-                    messages.append(message)
+                    if send('fuel', how_soon.days):
+                        yield message
         for mod in pos.mods:
             if mod.group.name == 'Shield Hardening Array':
                 has_defensive_mods = True
@@ -259,5 +277,5 @@ def check_pos(corp_name, corp_assets=None):
                     'reinforced': 'until'
                 }
                 message += ' {} {}'.format(state_predicates.get(pos.state, 'since'), pos.reinforced_until)
-            messages.append(message)
-    return messages
+            if send('state', '{} {}'.format(pos.state, pos.reinforced_until)):
+                yield message
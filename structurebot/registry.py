@@ -0,0 +1,85 @@
+import threading
+import time
+from concurrent.futures import Future
+
+
+class Registry(object):
+    """Interns objects built from ESI by their ID
+
+    The first caller for an ID builds the object, everybody else gets the
+    same instance until it is ttl seconds old. Callers asking for an ID
+    while it is being built wait for it instead of building it again. A
+    failed build isn't kept, the next caller tries again, and neither is an
+    instance the keep predicate rejects.
+
+    Args:
+        name (str): name of the registry, used for statistics
+        ttl (float, optional): seconds an instance is shared, None to keep it for the whole process
+
+    >>> registry = Registry('test')
+    >>> first = registry.get(1, object)
+    >>> registry.get(1, object) is first
+    True
+    >>> registry.stats()
+    {'registry': 'test', 'hits': 1, 'misses': 1, 'size': 1}
+    >>> registry.get(2, list, keep=bool) is registry.get(2, list, keep=bool)
+    False
+    """
+
+    def __init__(self, name, ttl=None):
+        self.name = name
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}  # key: (Future, stored)
+        self._lock = threading.Lock()
+
+    def get(self, key, build, keep=None):
+        """Returns the instance for key, building it on first use
+
+        Args:
+            key (hashable): ID of the object
+            build (callable): creates the object, without arguments
+            keep (callable, optional): called with the new object, False to hand it out without sharing it
+
+        Returns:
+            the shared instance
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (self.ttl is None or time.monotonic() - entry[1] < self.ttl):
+                self.hits += 1
+                future = entry[0]
+                leader = False
+            else:
+                self.misses += 1
+                future = Future()
+                self._entries[key] = (future, time.monotonic())
+                leader = True
+        if not leader:
+            return future.result()
+        try:
+            instance = build()
+        except BaseException as e:
+            future.set_exception(e)
+            self._forget(key, future)
+            raise
+        future.set_result(instance)
+        if keep is not None and not keep(instance):
+            self._forget(key, future)
+        return instance
+
+    def _forget(self, key, future):
+        with self._lock:
+            if self._entries.get(key, (None,))[0] is future:
+                del self._entries[key]
+
+    def clear(self):
+        """Forgets all instances and resets the statistics"""
+        with self._lock:
+            self._entries = {}
+            self.hits = self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {'registry': self.name, 'hits': self.hits, 'misses': self.misses, 'size': len(self._entries)}
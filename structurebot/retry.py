@@ -0,0 +1,190 @@
+import random
+import threading
+import time
+
+import requests
+from urllib3.exceptions import NewConnectionError
+
+from structurebot.cache import parse_http_date
+from structurebot.logger import logger
+
+
+def retry_after(headers, now=None):
+    """Reads the Retry-After header of a response
+
+    Args:
+        headers (dict): response headers
+        now (float, optional): unix timestamp, defaults to time.time()
+
+    Returns:
+        float: seconds to wait or None if the header is missing or invalid
+
+    >>> retry_after({'Retry-After': '3'})
+    3.0
+    >>> retry_after({'Retry-After': 'Sat, 24 Dec 2023 12:00:10 GMT'}, now=1703419200.0)
+    10.0
+    >>> retry_after({})
+    """
+    value = headers.get('Retry-After')
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    date = parse_http_date(value)
+    if date is None:
+        return None
+    now = time.time() if now is None else now
+    return max(0.0, date - now)
+
+
+def not_sent(error):
+    """Tells whether a request failed before it reached the server
+
+    Args:
+        error (requests.exceptions.RequestException): the failure
+
+    Returns:
+        bool: True if the connection couldn't be established
+
+    >>> not_sent(requests.exceptions.ConnectTimeout())
+    True
+    >>> not_sent(requests.exceptions.ReadTimeout())
+    False
+    """
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    return isinstance(reason, NewConnectionError)
+
+
+class RetryBudget(object):
+    """Limits the retries of a whole run
+
+    Once the budget is spent, failures are returned to the caller right away
+    instead of stretching the run with more backoff.
+
+    Args:
+        max_retries (int): retries allowed over all requests
+    """
+
+    def __init__(self, max_retries):
+        self.max_retries = max_retries
+        self.retries = 0
+        self.exhausted = 0
+        self.slept = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Takes a retry out of the budget
+
+        Returns:
+            bool: True if the retry may happen
+        """
+        with self._lock:
+            if self.retries >= self.max_retries:
+                self.exhausted += 1
+                return False
+            self.retries += 1
+            return True
+
+    def record_sleep(self, seconds):
+        with self._lock:
+            self.slept += seconds
+
+    def stats(self):
+        with self._lock:
+            return {'retries': self.retries, 'retry_budget': self.max_retries,
+                    'retries_denied': self.exhausted, 'retry_seconds': round(self.slept, 3)}
+
+
+class RetryPolicy(object):
+    """Retries transient failures with jittered exponential backoff
+
+    Requests that aren't idempotent are only retried if they can't have been
+    processed: the connection couldn't be established or the server
+    answered with one of the unprocessed_statuses. The wait before attempt n is drawn
+    uniformly from [0, min(max_backoff, backoff * 2 ** n)] ("full jitter"),
+    unless the server sent a Retry-After header, which is honoured up to
+    max_retry_after seconds.
+
+    Args:
+        attempts (int, optional): total attempts per request including the first one
+        backoff (float, optional): base backoff in seconds
+        max_backoff (float, optional): upper bound of the backoff in seconds
+        max_retry_after (float, optional): upper bound for Retry-After in seconds
+        statuses (tuple, optional): response status codes worth retrying
+        budget (RetryBudget, optional): retry budget shared by all requests
+        unprocessed_statuses (tuple, optional): statuses meaning the server didn't act on the request
+    """
+
+    def __init__(self, attempts=3, backoff=0.5, max_backoff=10.0, max_retry_after=60.0,
+                 statuses=(502, 503, 504), budget=None, unprocessed_statuses=(429,)):
+        self.attempts = max(1, attempts)
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_retry_after = max_retry_after
+        self.statuses = statuses
+        self.budget = budget or RetryBudget(max_retries=30)
+        self.unprocessed_statuses = unprocessed_statuses
+
+    def delay(self, attempt, response=None):
+        """Seconds to wait before the next attempt
+
+        Args:
+            attempt (int): number of the failed attempt, starting at 0
+            response (requests.Response, optional): the failed response
+
+        Returns:
+            float: seconds to wait
+        """
+        if response is not None:
+            wait = retry_after(response.headers)
+            if wait is not None:
+                return min(wait, self.max_retry_after)
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def call(self, send, idempotent=True, deadline=None):
+        """Calls send until it succeeds, attempts run out or the budget is spent
+
+        Args:
+            send (callable): sends the request and returns a requests.Response
+            idempotent (bool, optional): the request is safe to repeat
+            deadline (Deadline, optional): run deadline the backoff has to end before
+
+        Returns:
+            requests.Response: the last response
+
+        Raises:
+            requests.exceptions.RequestException: the last connection error or timeout
+            DeadlineExceeded: the backoff would pass the deadline
+        """
+        attempt = 0
+        while True:
+            response = None
+            try:
+                response = send()
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if not self._retry(attempt, idempotent or not_sent(e), error=e):
+                    raise
+            else:
+                safe = idempotent or response.status_code in self.unprocessed_statuses
+                if response.status_code not in self.statuses or not self._retry(attempt, safe, response=response):
+                    return response
+            wait = self.delay(attempt, response)
+            if deadline is not None:
+                deadline.check_wait(wait)
+            logger.warning("Retrying request", extra={"attempt": attempt + 1, "wait": round(wait, 3)})
+            time.sleep(wait)
+            self.budget.record_sleep(wait)
+            attempt += 1
+
+    def _retry(self, attempt, idempotent, response=None, error=None):
+        if not idempotent or attempt + 1 >= self.attempts:
+            return False
+        if not self.budget.acquire():
+            logger.warning("Retry budget exhausted, giving up",
+                           extra={"status_code": getattr(response, 'status_code', None), "error": error})
+            return False
+        return True
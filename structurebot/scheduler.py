@@ -0,0 +1,135 @@
+import heapq
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+
+from requests.exceptions import RequestException
+
+from structurebot.logger import logger
+
+# request priorities, lower values are sent first
+CRITICAL = 0  # data an alert depends on: structures, extractions, starbases, assets
+NORMAL = 1
+LOW = 2  # cosmetic data: moon, constellation and region names
+
+PRIORITY_NAMES = {CRITICAL: 'critical', NORMAL: 'normal', LOW: 'low'}
+
+
+class RequestDropped(RequestException):
+    """A low priority request was dropped because the run deadline is close"""
+
+
+class PriorityScheduler(object):
+    """Admits requests by priority once more of them wait than may be in flight
+
+    At most max_concurrent requests are sent at the same time. Waiting
+    requests are admitted in priority order and first come, first served
+    within a priority, so critical work always drains first. Once less than
+    low_cutoff seconds are left before the run deadline, low priority
+    requests are dropped instead of competing for the remaining time.
+
+    Args:
+        max_concurrent (int, optional): requests in flight at the same time
+        low_cutoff (float, optional): seconds before the deadline low priority requests are dropped
+
+    >>> scheduler = PriorityScheduler(max_concurrent=2)
+    >>> with scheduler.slot(CRITICAL):
+    ...     scheduler.stats()['in_flight']
+    1
+    """
+
+    def __init__(self, max_concurrent=20, low_cutoff=60.0):
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.low_cutoff = low_cutoff
+        self.in_flight = 0
+        self._waiting = []  # heap of (priority, sequence)
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._sent = dict.fromkeys(PRIORITY_NAMES, 0)
+        self._dropped = dict.fromkeys(PRIORITY_NAMES, 0)
+        self._waited = dict.fromkeys(PRIORITY_NAMES, 0.0)
+
+    def _drop(self, priority, deadline):
+        if priority < LOW or deadline is None:
+            return False
+        remaining = deadline.remaining()
+        return remaining is not None and remaining < self.low_cutoff
+
+    def acquire(self, priority=NORMAL, deadline=None):
+        """Waits until a request of this priority may be sent
+
+        Args:
+            priority (int, optional): CRITICAL, NORMAL or LOW
+            deadline (Deadline, optional): run deadline
+
+        Raises:
+            RequestDropped: a low priority request is too close to the deadline
+        """
+        started = time.monotonic()
+        with self._condition:
+            ticket = (priority, next(self._sequence))
+            heapq.heappush(self._waiting, ticket)
+            while True:
+                if self._drop(priority, deadline):
+                    self._waiting.remove(ticket)
+                    heapq.heapify(self._waiting)
+                    self._dropped[priority] += 1
+                    self._condition.notify_all()
+                    logger.warning("Low priority request dropped", extra={"remaining": deadline.remaining()})
+                    raise RequestDropped('Low priority request dropped, run deadline is close')
+                if self.in_flight < self.max_concurrent and self._waiting[0] == ticket:
+                    break
+                # wake up now and then to notice the deadline getting close
+                self._condition.wait(timeout=1.0)
+            heapq.heappop(self._waiting)
+            self.in_flight += 1
+            self._sent[priority] += 1
+            self._waited[priority] += time.monotonic() - started
+            # the next waiter may fit as well
+            self._condition.notify_all()
+
+    def set_max_concurrent(self, max_concurrent):
+        """Lets more requests be in flight at the same time
+
+        The limit only grows, so callers that need fewer concurrent requests
+        don't take slots away from others.
+
+        Args:
+            max_concurrent (int): requests in flight at the same time
+        """
+        with self._condition:
+            if max_concurrent > self.max_concurrent:
+                self.max_concurrent = int(max_concurrent)
+                self._condition.notify_all()
+
+    def release(self):
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    @contextmanager
+    def slot(self, priority=NORMAL, deadline=None):
+        """Holds one of the max_concurrent slots while sending a request
+
+        Args:
+            priority (int, optional): CRITICAL, NORMAL or LOW
+            deadline (Deadline, optional): run deadline
+
+        Raises:
+            RequestDropped: a low priority request is too close to the deadline
+        """
+        self.acquire(priority, deadline)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self):
+        with self._condition:
+            stats = {'in_flight': self.in_flight, 'waiting': len(self._waiting)}
+            for priority, name in PRIORITY_NAMES.items():
+                stats['{}_sent'.format(name)] = self._sent[priority]
+                stats['{}_dropped'.format(name)] = self._dropped[priority]
+                stats['{}_waited'.format(name)] = round(self._waited[priority], 3)
+            return stats
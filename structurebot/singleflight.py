@@ -0,0 +1,50 @@
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight(object):
+    """Coalesces identical calls that are in flight at the same time
+
+    The first caller for a key runs the call, callers arriving while it is
+    still running wait for it and get the same result or exception. Once the
+    call returns the key is released, so later calls run again.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.coalesced = 0
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        """Runs fn unless a call for key is already in flight
+
+        Args:
+            key (hashable): identifies identical calls
+            fn (callable): the call, without arguments
+
+        Returns:
+            the result of fn, possibly from another caller's call
+        """
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                self.calls += 1
+                future = self._in_flight[key] = Future()
+            else:
+                self.coalesced += 1
+        if not leader:
+            return future.result()
+        try:
+            future.set_result(fn())
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+        return future.result()
+
+    def stats(self):
+        with self._lock:
+            return {'requests_sent': self.calls, 'requests_coalesced': self.coalesced}
@@ -0,0 +1,179 @@
+import csv
+import os
+import sqlite3
+import threading
+from urllib.request import pathname2url
+
+from structurebot.logger import logger
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'universe.sqlite')
+
+SCHEMA = [
+    'CREATE TABLE regions (region_id INTEGER PRIMARY KEY, name TEXT)',
+    'CREATE TABLE constellations (constellation_id INTEGER PRIMARY KEY, region_id INTEGER, name TEXT)',
+    'CREATE TABLE systems (system_id INTEGER PRIMARY KEY, constellation_id INTEGER, name TEXT, '
+    'security_status REAL, x REAL, y REAL, z REAL)',
+    'CREATE INDEX regions_name ON regions (name)',
+    'CREATE INDEX constellations_name ON constellations (name)',
+    'CREATE INDEX systems_name ON systems (name)',
+]
+
+# table: columns of the ESI /universe/<table>/{id}/ answer they are read as
+TABLES = {
+    'regions': ('region_id', 'name'),
+    'constellations': ('constellation_id', 'region_id', 'name'),
+    'systems': ('system_id', 'constellation_id', 'name', 'security_status', 'x', 'y', 'z'),
+}
+
+
+class StaticUniverse(object):
+    """Read-only dataset of the regions, constellations and solar systems
+
+    Answers universe lookups without ESI. The SQLite file is opened read
+    only and memory mapped, one connection per thread.
+
+    Args:
+        path (str): dataset built by build()
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect('file:{}?mode=ro'.format(pathname2url(os.path.abspath(self.path))), uri=True)
+            connection.execute('PRAGMA mmap_size=67108864')
+            self._local.connection = connection
+        return connection
+
+    def _count(self, found):
+        with self._lock:
+            if found:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, table, id):
+        """Looks up an entry by ID
+
+        Args:
+            table (str): 'regions', 'constellations' or 'systems'
+            id (int): EVE ID
+
+        Returns:
+            dict: the entry shaped like the ESI answer or None if it isn't in the dataset
+        """
+        columns = TABLES[table]
+        row = self._connection().execute('SELECT {} FROM {} WHERE {} = ?'.format(', '.join(columns), table,
+                                                                                  columns[0]), (id,)).fetchone()
+        self._count(row is not None)
+        if row is None:
+            return None
+        data = dict(zip(columns, row))
+        if table == 'systems':
+            data['position'] = {axis: data.pop(axis) for axis in ('x', 'y', 'z')}
+        return data
+
+    def id_of(self, table, name):
+        """Looks up the ID of a name
+
+        Args:
+            table (str): 'regions', 'constellations' or 'systems'
+            name (str): EVE name
+
+        Returns:
+            int: the ID or None if it isn't in the dataset
+        """
+        column = TABLES[table][0]
+        row = self._connection().execute('SELECT {} FROM {} WHERE name = ?'.format(column, table),
+                                         (name,)).fetchone()
+        self._count(row is not None)
+        return row[0] if row else None
+
+    def stats(self):
+        with self._lock:
+            return {'static_hits': self.hits, 'static_misses': self.misses}
+
+
+def _read_csv(sde, filename):
+    with open(os.path.join(sde, filename), newline='', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+
+def build(sde, path):
+    """Builds the dataset from the Fuzzwork CSV dump of the SDE
+
+    Needs mapRegions.csv, mapConstellations.csv and mapSolarSystems.csv
+    from https://www.fuzzwork.co.uk/dump/latest/csv/ in the sde directory.
+    The dataset is written to a temporary file and moved into place, so
+    running bots never see half of it.
+
+    Args:
+        sde (str): directory with the CSV files
+        path (str): dataset file to write
+
+    Returns:
+        dict: number of regions, constellations and systems written
+    """
+    regions = [(int(r['regionID']), r['regionName']) for r in _read_csv(sde, 'mapRegions.csv')]
+    constellations = [(int(c['constellationID']), int(c['regionID']), c['constellationName'])
+                      for c in _read_csv(sde, 'mapConstellations.csv')]
+    systems = [(int(s['solarSystemID']), int(s['constellationID']), s['solarSystemName'], float(s['security']),
+                float(s['x']), float(s['y']), float(s['z'])) for s in _read_csv(sde, 'mapSolarSystems.csv')]
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    temporary = path + '.tmp'
+    if os.path.exists(temporary):
+        os.remove(temporary)
+    connection = sqlite3.connect(temporary)
+    with connection:
+        for statement in SCHEMA:
+            connection.execute(statement)
+        connection.executemany('INSERT INTO regions VALUES (?, ?)', regions)
+        connection.executemany('INSERT INTO constellations VALUES (?, ?, ?)', constellations)
+        connection.executemany('INSERT INTO systems VALUES (?, ?, ?, ?, ?, ?, ?)', systems)
+    connection.execute('VACUUM')
+    connection.close()
+    os.replace(temporary, path)
+    return {'regions': len(regions), 'constellations': len(constellations), 'systems': len(systems)}
+
+
+_static = None
+_static_loaded = False
+_static_lock = threading.Lock()
+
+
+def get_static_universe(path):
+    """Opens the dataset on first use
+
+    Args:
+        path (str): dataset file, see STATIC_UNIVERSE
+
+    Returns:
+        StaticUniverse: the dataset or None if it is disabled or wasn't built
+    """
+    global _static, _static_loaded
+    with _static_lock:
+        if not _static_loaded:
+            _static_loaded = True
+            if path and path.lower() != 'none':
+                if os.path.exists(path):
+                    _static = StaticUniverse(path)
+                else:
+                    logger.info("Static universe dataset not found, using ESI", extra={"path": path})
+        return _static
+
+
+def set_static_universe(instance):
+    """Replaces the dataset, e.g. with one built for a test
+
+    Args:
+        instance (StaticUniverse): the dataset to use, None to open the configured one on next use
+    """
+    global _static, _static_loaded
+    with _static_lock:
+        _static, _static_loaded = instance, instance is not None
@@ -0,0 +1,159 @@
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from structurebot.logger import logger
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+
+class HTTPXSession(object):
+    """requests.Session look-alike on top of an HTTP/2 capable httpx.Client
+
+    Responses and errors are converted to their requests counterparts, so
+    NCR and its callers don't need to know which transport is in use. Many
+    small requests to the same host are multiplexed over one HTTP/2
+    connection. New connections are counted through httpcore's trace
+    extension, every other request reused an open one.
+
+    Args:
+        max_connections (int): connections over all hosts
+        max_keepalive (int): idle connections kept open for reuse
+        http2 (bool, optional): negotiate HTTP/2, needs the h2 package
+
+    Raises:
+        ImportError: http2 is True but h2 isn't installed
+    """
+
+    def __init__(self, max_connections, max_keepalive, http2=True):
+        limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive)
+        self.client = httpx.Client(http2=http2, limits=limits)
+        self.headers = self.client.headers
+        self.http_versions = {}
+        self.connections_opened = 0
+        self._lock = threading.Lock()
+
+    def request(self, method, url, params=None, data=None, headers=None, timeout=None, **kwargs):
+        if isinstance(timeout, tuple):
+            connect, read = timeout
+            timeout = httpx.Timeout(read, connect=connect)
+        try:
+            response = self.client.request(method, url, params=params, content=data, headers=headers,
+                                           timeout=timeout, extensions={'trace': self._trace})
+        except httpx.TimeoutException as e:
+            raise requests.exceptions.Timeout(str(e))
+        except httpx.TransportError as e:
+            raise requests.exceptions.ConnectionError(str(e))
+        version = response.http_version
+        with self._lock:
+            self.http_versions[version] = self.http_versions.get(version, 0) + 1
+        return self._to_requests(response)
+
+    def _trace(self, event, info):
+        # e.g. 'connection.connect_tcp.complete', sent once per new connection
+        if event.startswith('connection.connect_') and event.endswith('.complete'):
+            with self._lock:
+                self.connections_opened += 1
+
+    @staticmethod
+    def _to_requests(response):
+        converted = requests.Response()
+        converted.status_code = response.status_code
+        converted.headers = CaseInsensitiveDict(response.headers)
+        converted._content = response.content
+        converted.url = str(response.url)
+        converted.elapsed = response.elapsed
+        converted.encoding = response.encoding
+        converted.request = requests.Request(response.request.method, str(response.request.url)).prepare()
+        return converted
+
+    def stats(self):
+        with self._lock:
+            sent = sum(self.http_versions.values())
+            return {'transport': 'httpx', 'requests': sent, 'connections_opened': self.connections_opened,
+                    'connections_reused': max(0, sent - self.connections_opened),
+                    'http_versions': dict(self.http_versions)}
+
+    def close(self):
+        self.client.close()
+
+
+def create_session(transport='requests', pool_connections=10, pool_maxsize=10, pool_block=True):
+    """Creates the HTTP session NCR sends its requests with
+
+    Args:
+        transport (str, optional): 'requests' or 'httpx' for HTTP/2. Falls back to HTTP/1.1
+                                   if h2 isn't installed and to requests if httpx isn't.
+        pool_connections (int, optional): number of hosts a connection pool is kept for
+        pool_maxsize (int, optional): connections kept open per host
+        pool_block (bool, optional): wait for a free connection instead of opening more than pool_maxsize
+
+    Returns:
+        requests.Session or HTTPXSession: the session
+    """
+    if transport == 'httpx':
+        if httpx is not None:
+            limits = {'max_connections': pool_connections * pool_maxsize, 'max_keepalive': pool_maxsize}
+            try:
+                return HTTPXSession(**limits)
+            except ImportError as e:
+                logger.warning("h2 is not installed, falling back to HTTP/1.1", extra={"error": str(e)})
+                return HTTPXSession(http2=False, **limits)
+        logger.warning("httpx is not installed, falling back to requests")
+    session = requests.Session()
+    set_pool_size(session, pool_maxsize, pool_connections=pool_connections, pool_block=pool_block)
+    return session
+
+
+def set_pool_size(session, size, pool_connections=10, pool_block=True):
+    if isinstance(session, HTTPXSession):
+        # httpx limits are fixed when the client is created, HTTP/2 multiplexes over them anyway
+        return
+    """Sizes the connection pool of a requests session
+
+    requests keeps 10 connections per host by default, concurrent callers
+    beyond that either wait or open connections which are thrown away
+    after each request. httpx sessions multiplex over HTTP/2 instead.
+
+    Args:
+        session (requests.Session): session to configure
+        size (int): connections kept open per host
+        pool_connections (int, optional): number of hosts a connection pool is kept for
+        pool_block (bool, optional): wait for a free connection instead of opening more than size
+    """
+    if isinstance(session, HTTPXSession):
+        return
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=size, pool_block=pool_block)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+
+
+def connection_stats(session):
+    """Reports how well a session reuses its connections
+
+    Args:
+        session (requests.Session or HTTPXSession): session to report on
+
+    Returns:
+        dict: requests sent and connections opened
+    """
+    if isinstance(session, HTTPXSession):
+        return session.stats()
+    opened = 0
+    sent = 0
+    for adapter in set(getattr(session, 'adapters', {}).values()):
+        pools = getattr(getattr(adapter, 'poolmanager', None), 'pools', None)
+        if pools is None:
+            continue
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is not None:
+                opened += pool.num_connections
+                sent += pool.num_requests
+    return {'transport': 'requests', 'requests': sent, 'connections_opened': opened,
+            'connections_reused': max(0, sent - opened)}
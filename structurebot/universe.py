@@ -1,12 +1,49 @@
 from __future__ import absolute_import
+from .config import CONFIG
+from .registry import Registry
+from .scheduler import RequestDropped
+from .static_universe import DEFAULT_PATH, get_static_universe
 from .util import ncr, name_to_id, HTTPError
 from structurebot.logger import logger
 
 
+def static_universe():
+    return get_static_universe(CONFIG['STATIC_UNIVERSE'] or DEFAULT_PATH)
+
+
+def static_entry(table, id):
+    """Looks an ID up in the static universe dataset
+
+    Args:
+        table (str): 'regions', 'constellations' or 'systems'
+        id (int): EVE ID
+
+    Returns:
+        dict: the entry or None if there is no dataset or the ID isn't in it
+    """
+    static = static_universe()
+    return static.get(table, id) if static is not None else None
+
+
+def static_id(table, name):
+    """Looks a name up in the static universe dataset
+
+    Args:
+        table (str): 'regions', 'constellations' or 'systems'
+        name (str): EVE name
+
+    Returns:
+        int: the ID or None if there is no dataset or the name isn't in it
+    """
+    static = static_universe()
+    return static.id_of(table, name) if static is not None else None
+
+
 class Region(object):
     # id_op = 'get_universe_regions_region_id'
     # id_arg = 'region_id'
     # name_arg = 'region'
+    registry = Registry('regions', ttl=CONFIG['UNIVERSE_TTL'])
 
     def __init__(self, region_id, name, **kwargs):
         """EVE Region
@@ -24,6 +61,9 @@ class Region(object):
     def from_id(cls, id):
         """Base utility class to pull ESI universe info by id
 
+        Instances are shared, every ID is only requested once per UNIVERSE_TTL. IDs in the
+        static universe dataset aren't requested at all.
+
         Args:
             id (int): location ESI ID
 
@@ -38,6 +78,13 @@ class Region(object):
         # id_arg = {cls.id_arg: id}
         if not isinstance(id, int):
             raise ValueError('ID must be an integer')
+        return cls.registry.get(id, lambda: cls._fetch(id))
+
+    @classmethod
+    def _fetch(cls, id):
+        data = static_entry('regions', id)
+        if data is not None:
+            return cls(**data)
         type_response, type_response_data = ncr.get_universe_regions_region_id(
             region_id=id)  # esi_pub.op[id_op](**id_arg)
         if type_response.status_code == 200:
@@ -55,7 +102,7 @@ class Region(object):
         Returns:
             cls: child class populated from ESI
         """
-        id = name_to_id(name, 'region')
+        id = static_id('regions', name) or name_to_id(name, 'region')
         return cls.from_id(id)
 
 
@@ -63,6 +110,7 @@ class Constellation(object):
     # id_op = 'get_universe_constellations_constellation_id'
     # id_arg = 'constellation_id'
     # name_arg = 'constellation'
+    registry = Registry('constellations', ttl=CONFIG['UNIVERSE_TTL'])
 
     def __init__(self, constellation_id, region_id, name, **kwargs):
         """EVE Constellation
@@ -74,7 +122,11 @@ class Constellation(object):
         """
         self.constellation_id = constellation_id
         self.region_id = region_id
-        self.region = Region.from_id(self.region_id)
+        try:
+            self.region = Region.from_id(self.region_id)
+        except RequestDropped:
+            # region names are cosmetic, don't hold up alerts for them
+            self.region = None
         self.name = name
 
         logger.debug("Class init", extra={**self.__dict__})
@@ -83,6 +135,10 @@ class Constellation(object):
     def from_id(cls, id):
         """Base utility class to pull ESI universe info by id
 
+        Instances are shared, every ID is only requested once per UNIVERSE_TTL. IDs in the
+        static universe dataset aren't requested at all. Instances missing a parent because
+        its request was dropped aren't shared, the next caller looks it up again.
+
         Args:
             id (int): location ESI ID
 
@@ -95,6 +151,13 @@ class Constellation(object):
         """
         if not isinstance(id, int):
             raise ValueError('ID must be an integer')
+        return cls.registry.get(id, lambda: cls._fetch(id), keep=cls.complete)
+
+    @classmethod
+    def _fetch(cls, id):
+        data = static_entry('constellations', id)
+        if data is not None:
+            return cls(**data)
         type_response, type_response_data = ncr.get_universe_constellations_constellation_id(constellation_id=id)
         if type_response.status_code == 200:
             return cls(**type_response_data)
@@ -111,14 +174,23 @@ class Constellation(object):
         Returns:
             cls: child class populated from ESI
         """
-        id = name_to_id(name, 'constellation')
+        id = static_id('constellations', name) or name_to_id(name, 'constellation')
         return cls.from_id(id)
 
+    def complete(self):
+        """Whether the region was looked up, instances without it aren't shared
+
+        Returns:
+            bool: True if region is set
+        """
+        return self.region is not None
+
 
 class System(object):
     # id_op = 'get_universe_systems_system_id'
     # id_arg = 'system_id'
     # name_arg = 'solar_system'
+    registry = Registry('systems', ttl=CONFIG['UNIVERSE_TTL'])
 
     def __init__(self, system_id, constellation_id, name, **kwargs):
         """EVE System
@@ -130,7 +202,11 @@ class System(object):
         """
         self.system_id = system_id
         self.constellation_id = constellation_id
-        self.constellation = Constellation.from_id(self.constellation_id)
+        try:
+            self.constellation = Constellation.from_id(self.constellation_id)
+        except RequestDropped:
+            # constellation names are cosmetic, don't hold up alerts for them
+            self.constellation = None
         self.name = name
 
         logger.debug("Class init", extra={**self.__dict__})
@@ -139,6 +215,10 @@ class System(object):
     def from_id(cls, id):
         """Base utility class to pull ESI universe info by id
 
+        Instances are shared, every ID is only requested once per UNIVERSE_TTL. IDs in the
+        static universe dataset aren't requested at all. Instances missing a parent because
+        its request was dropped aren't shared, the next caller looks it up again.
+
         Args:
             id (int): location ESI ID
 
@@ -151,6 +231,13 @@ class System(object):
         """
         if not isinstance(id, int):
             raise ValueError('ID must be an integer')
+        return cls.registry.get(id, lambda: cls._fetch(id), keep=cls.complete)
+
+    @classmethod
+    def _fetch(cls, id):
+        data = static_entry('systems', id)
+        if data is not None:
+            return cls(**data)
         type_response, type_response_data = ncr.get_universe_systems_system_id(system_id=id)
         if type_response.status_code == 200:
             return cls(**type_response_data)
@@ -167,5 +254,25 @@ class System(object):
         Returns:
             cls: child class populated from ESI
         """
-        id = name_to_id(name, 'solar_system')
+        id = static_id('systems', name) or name_to_id(name, 'solar_system')
         return cls.from_id(id)
+
+    def complete(self):
+        """Whether the constellation and its region were looked up, instances without them aren't shared
+
+        Returns:
+            bool: True if constellation and its region are set
+        """
+        return self.constellation is not None and self.constellation.complete()
+
+
+def universe_stats():
+    """Reports how often systems, constellations and regions were shared instead of requested
+
+    Returns:
+        list: statistics of every registry
+    """
+    stats = [cls.registry.stats() for cls in (System, Constellation, Region)]
+    if static_universe() is not None:
+        stats.append(static_universe().stats())
+    return stats
@@ -1,34 +1,228 @@
 from __future__ import absolute_import
 from __future__ import print_function
 
-import requests
+import threading
+
 from requests.exceptions import HTTPError
 
+from .batch import BatchLoader
+from .breaker import CircuitBreaker
+from .chunks import ChunkDispatcher
+from .cache import open_cache, open_name_cache
 from .config import *
+from .datasources import DatasourcePool
+from .governor import ErrorLimitGovernor
+from .json_backend import set_backend
+from .name_index import NameIndex
 from .neucore_requester import NCR
+from .notify import DiscordSink, FileSink, Notifier, SlackSink, StdoutSink
+from .retry import RetryBudget, RetryPolicy
+from .scheduler import PriorityScheduler
 from structurebot.logger import logger
 
-datasource = CONFIG['NEUCORE_DATASOURCE'].split(':', 1)
-datasource_id = datasource[0]
-if len(datasource) > 1:
-    datasource_name = datasource[1]
-else:
-    datasource_name = None
-
-ncr = NCR(app_id=CONFIG['NEUCORE_APP_ID'],
-          app_secret=CONFIG['NEUCORE_APP_SECRET'],
-          neucore_prefix=CONFIG['NEUCORE_HOST'],
-          datasource_id=datasource_id,
-          datasource_name=datasource_name,
-          useragent=CONFIG['USER_AGENT'],
-          esi_prefix=CONFIG['ESI_HOST'],
-          cache_esi=False,
-          cache_nc=False)
+
+def circuit_breaker(name):
+    """Creates a circuit breaker for an upstream configured from CONFIG
+
+    Args:
+        name (string): upstream name
+
+    Returns:
+        CircuitBreaker: new breaker
+    """
+    return CircuitBreaker(name,
+                          failure_rate=CONFIG['BREAKER_FAILURE_RATE'],
+                          min_requests=CONFIG['BREAKER_MIN_REQUESTS'],
+                          window=CONFIG['BREAKER_WINDOW'],
+                          reset_timeout=CONFIG['BREAKER_RESET_TIMEOUT'])
+
+
+def error_limit_governor():
+    """Creates an ESI error limit governor for an upstream configured from CONFIG
+
+    Returns:
+        ErrorLimitGovernor: new governor
+    """
+    return ErrorLimitGovernor(slow_threshold=CONFIG['ESI_ERROR_LIMIT_SLOW'],
+                              pause_threshold=CONFIG['ESI_ERROR_LIMIT_PAUSE'])
+
+
+def create_ncr():
+    """Creates the NCR client configured from CONFIG
+
+    Returns:
+        NCR: new client
+    """
+    set_backend(CONFIG['JSON_BACKEND'])
+    datasources = DatasourcePool.from_config(CONFIG['NEUCORE_DATASOURCE'])
+    first = datasources.datasources[0] if datasources.datasources else None
+    return NCR(app_id=CONFIG['NEUCORE_APP_ID'],
+               app_secret=CONFIG['NEUCORE_APP_SECRET'],
+               neucore_prefix=CONFIG['NEUCORE_HOST'],
+               datasource_id=first.character_id if first else None,
+               datasource_name=first.login if first else None,
+               useragent=CONFIG['USER_AGENT'],
+               esi_prefix=CONFIG['ESI_HOST'],
+               cache_esi=CONFIG['CACHE_ESI'],
+               cache_nc=CONFIG['CACHE_NC'],
+               page_workers=CONFIG['NCR_PAGE_WORKERS'],
+               cache_backend=open_cache(CONFIG['CACHE_BACKEND'], CONFIG['CACHE_PATH']),
+               memory_cache_bytes=CONFIG['CACHE_MEMORY_BYTES'],
+               memory_cache_ttl=CONFIG['CACHE_MEMORY_TTL'],
+               governors={'neucore': error_limit_governor(), 'esi': error_limit_governor()},
+               retry=RetryPolicy(attempts=CONFIG['RETRY_ATTEMPTS'],
+                                 backoff=CONFIG['RETRY_BACKOFF'],
+                                 max_backoff=CONFIG['RETRY_MAX_BACKOFF'],
+                                 budget=RetryBudget(max_retries=CONFIG['RETRY_BUDGET'])),
+               timeout=(CONFIG['HTTP_CONNECT_TIMEOUT'], CONFIG['HTTP_READ_TIMEOUT']),
+               breakers={'neucore': circuit_breaker('neucore'), 'esi': circuit_breaker('esi')},
+               transport=CONFIG['HTTP_TRANSPORT'],
+               pool_connections=CONFIG['HTTP_POOL_CONNECTIONS'],
+               pool_maxsize=CONFIG['HTTP_POOL_MAXSIZE'],
+               datasources=datasources,
+               scheduler=PriorityScheduler(max_concurrent=CONFIG['SCHEDULER_MAX_CONCURRENT'],
+                                           low_cutoff=CONFIG['LOW_PRIORITY_CUTOFF']))
+
+
+_ncr = None
+_ncr_lock = threading.Lock()
+
+
+def get_ncr():
+    """Returns the shared NCR client, creating it on first use
+
+    Returns:
+        NCR: the client
+    """
+    global _ncr
+    with _ncr_lock:
+        if _ncr is None:
+            _ncr = create_ncr()
+            logger.info("NCR created")
+        return _ncr
+
+
+def set_ncr(instance):
+    """Replaces the shared NCR client, e.g. with one talking to a test server
+
+    Args:
+        instance (NCR): the client to use, None to create a new one on next use
+    """
+    global _ncr
+    with _ncr_lock:
+        _ncr = instance
+
+
+class LazyNCR(object):
+    """Stands in for the shared NCR client until it is used
+
+    Importing structurebot modules doesn't read the Neucore configuration,
+    open sessions or the cache. Attribute access is passed on to get_ncr().
+    """
+
+    def __getattr__(self, name):
+        return getattr(get_ncr(), name)
+
+    def __setattr__(self, name, value):
+        setattr(get_ncr(), name, value)
+
+    def __repr__(self):
+        return '<LazyNCR {}>'.format('created' if _ncr is not None else 'not created')
+
+
+ncr = LazyNCR()
 
 ############
 
-cat_name_id = {}  # stores name:id pairs by category to save on requests
-id_name_cat = {}  # stores (name,category) by ID to save on requests
+name_index = NameIndex()  # resolved names and IDs, saves on requests
+name_cache = None  # persistent name cache, opened on first use by get_name_cache()
+_name_cache_opened = False
+_name_cache_lock = threading.Lock()
+name_stats = {'resolved': 0, 'bisected': 0}
+name_stats_lock = threading.Lock()
+chunk_dispatcher = ChunkDispatcher(max_workers=CONFIG['CHUNK_WORKERS'])
+
+# name_to_id name types and their /universe/ids/ categories
+NAME_CATEGORIES = {
+    'character': 'characters',
+    'constellation': 'constellations',
+    'corporation': 'corporations',
+    'inventory_type': 'inventory_types',
+    'region': 'regions',
+    'solar_system': 'systems',
+}
+
+
+def get_name_cache():
+    """Returns the persistent name cache, opening it on first use
+
+    Returns:
+        SQLiteNameCache: the name cache or None if persistent caching is disabled
+    """
+    global name_cache, _name_cache_opened
+    with _name_cache_lock:
+        if name_cache is None and not _name_cache_opened:
+            name_cache = open_name_cache(CONFIG['CACHE_BACKEND'], CONFIG['CACHE_PATH'],
+                                         ttl=CONFIG['NAME_CACHE_TTL'], negative_ttl=CONFIG['NAME_NEGATIVE_TTL'])
+        _name_cache_opened = True
+        return name_cache
+
+
+def remember_names(entries, persist=True):
+    """Adds resolved names to the name index and the persistent name cache
+
+    Args:
+        entries (list): (id, name, category) tuples
+        persist (bool, optional): write them to the persistent name cache. Defaults to True.
+    """
+    name_index.add_many(entries)
+    cache = get_name_cache() if persist and entries else None
+    if cache is not None:
+        cache.set_many(entries)
+
+
+def remember_unresolved(names=(), ids=(), persist=True):
+    """Records names and IDs ESI can't resolve, so they aren't looked up again
+
+    Args:
+        names (list, optional): names /universe/ids/ didn't return
+        ids (list, optional): IDs /universe/names/ rejected
+        persist (bool, optional): write them to the persistent name cache. Defaults to True.
+    """
+    if not names and not ids:
+        return
+    logger.info("Names or IDs not resolvable", extra={"names": list(names), "ids": list(ids)})
+    name_index.add_unresolved(names=names, ids=ids)
+    cache = get_name_cache() if persist else None
+    if cache is not None:
+        cache.set_unresolved(names=names, ids=ids)
+
+
+def warm_name_cache():
+    """Loads the names resolved by previous runs that are still valid
+
+    Returns:
+        int: number of loaded names
+    """
+    cache = get_name_cache()
+    if cache is None:
+        return 0
+    entries = cache.load()
+    remember_names(entries, persist=False)
+    names, ids = cache.load_unresolved()
+    remember_unresolved(names=names, ids=ids, persist=False)
+    logger.info("Name cache warmed", extra={"names": len(entries), "unresolved": len(names) + len(ids)})
+    return len(entries)
+
+
+def name_cache_stats():
+    """Reports how many names and IDs were answered without asking ESI
+
+    Returns:
+        dict: hits, misses, hit rate and names resolved through ESI
+    """
+    with name_stats_lock:
+        return dict(name_index.stats(), **name_stats)
 
 
 def name_to_id(name, name_type):
@@ -50,41 +244,24 @@ def name_to_id(name, name_type):
 
     logger.info("Lookup for name", extra={"name": name, "name_type": name_type})
 
-    if name_type == 'corporation':
-        category = 'corporations'
-    elif name_type == 'inventory_type':
-        category = 'inventory_types'
-    elif name_type == 'solar_system':
-        category = 'systems'
-    elif name_type == 'character':
-        category = 'characters'
-    else:
+    category = NAME_CATEGORIES.get(name_type)
+    if category is None:
         logger.info("No proper type provided, returning None")
 
         return None
-    try:
-        logger.info("Looking up data in cache", extra={"category": category, "name": name})
-
-        return cat_name_id[category][name]
-    except KeyError:
-        # data not found in cache
-        logger.info("Data not found in cache", extra={"category": category, "name": name})
-        logger.debug("Category cache data", extra={"cache": cat_name_id})
-
-        pass
+    entry_id = name_index.id_for(name, category)
+    if entry_id is not None:
+        return entry_id
+    logger.info("Data not found in cache", extra={"category": category, "name": name})
     # try fetch ID
     try:
-        names_to_ids([name])
+        entry_id = names_to_ids([name]).get(category, {}).get(name)
     except HTTPError:
         return None
-    try:
-        return cat_name_id[category][name]
-    except KeyError:
+    if entry_id is None:
         # data not found after fetching
         logger.info("Data not found in cache on second run", extra={"category": category, "name": name})
-        logger.debug("Category cache data", extra={"cache": cat_name_id})
-
-        return None
+    return entry_id
 
 
 def names_to_ids(lookup_names: list):
@@ -92,7 +269,8 @@ def names_to_ids(lookup_names: list):
     Resolve a set of names to IDs in the following categories:
         agents, alliances, characters, constellations, corporations,
         factions, inventory_types, regions, stations, and systems.
-    Only exact matches will be returned. All names searched for are cached for 12 hours
+    Only exact matches will be returned. Resolved names are cached for NAME_CACHE_TTL seconds
+    (12 hours by default), names ESI doesn't know for NAME_NEGATIVE_TTL seconds, also between runs.
     
     Args:
         lookup_names (list): a list of the names to look up
@@ -102,45 +280,72 @@ def names_to_ids(lookup_names: list):
     """
     logger.info("Resolving names", extra={"names": lookup_names})
 
-    names = []
-    r_val_cat_name_id = {}  # {'category':{'name':id}}
-
-    for n in lookup_names:
-        found = False
-        for c in cat_name_id.keys():
-            if n in cat_name_id[c].keys():
-                found = True
-                if c in r_val_cat_name_id.keys():
-                    r_val_cat_name_id[c][n] = cat_name_id[c][n]
-                else:
-                    r_val_cat_name_id[c] = {n: cat_name_id[c][n]}
-        if not found:
-            names.append(n)
+    r_val_cat_name_id, names = name_index.lookup_names(lookup_names)  # {'category':{'name':id}}
 
     if len(names) > 0:
         chunk_size = 400  # Max Items is 500
-        for chunk in [names[i:i + chunk_size] for i in range(0, len(names), chunk_size)]:
-            resp, chunk_data = ncr.post_universe_ids(ids=chunk)
-            if resp.status_code == 200:
-                for c in chunk_data.keys():
-                    if c not in cat_name_id.keys():
-                        cat_name_id[c] = {}
-                    for entry in chunk_data[c]:
-                        n = entry['name']
-                        entry_id = entry['id']
-                        cat_name_id[c][n] = entry_id
-                        id_name_cat[entry_id] = (n, c)
-                        if c in r_val_cat_name_id.keys():
-                            r_val_cat_name_id[c][n] = cat_name_id[c][n]
-                        else:
-                            r_val_cat_name_id[c] = {n: cat_name_id[c][n]}
-                        r_val_cat_name_id[entry['name']] = entry['id']
+        # chunks are sent concurrently, their results merged in chunk order
+        for resolved, unresolved in chunk_dispatcher.map(_resolve_names, names, chunk_size, 'names_to_ids'):
+            remember_names(resolved)
+            remember_unresolved(names=unresolved)
+            with name_stats_lock:
+                name_stats['resolved'] += len(resolved)
+            for entry_id, n, c in resolved:
+                r_val_cat_name_id.setdefault(c, {})[n] = entry_id
 
     logger.info("Resolving completed", extra={"data": r_val_cat_name_id})
 
     return r_val_cat_name_id
 
 
+def _resolve_names(names):
+    """Resolves names with /universe/ids/
+
+    Args:
+        names (list): up to 500 names
+
+    Returns:
+        list: (id, name, category) tuples of the resolved names
+        list: names ESI doesn't know
+    """
+    resp, data = ncr.post_universe_ids(ids=names)
+    if resp.status_code != 200:
+        return [], []
+    resolved = [(entry['id'], entry['name'], c) for c in data.keys() for entry in data[c]]
+    found = set(n.lower() for entry_id, n, c in resolved)
+    return resolved, [n for n in names if n.lower() not in found]
+
+
+def _resolve_ids(ids):
+    """Resolves IDs with /universe/names/, isolating invalid IDs
+
+    ESI rejects the whole request if a single ID is invalid. A rejected
+    chunk is split in halves until the invalid IDs are found, so the valid
+    ones still resolve with about log(n) requests per invalid ID.
+
+    Args:
+        ids (list): up to 1000 IDs
+
+    Returns:
+        list: (id, name, category) tuples of the resolved IDs
+        list: invalid IDs
+    """
+    resp, data = ncr.post_universe_names(names=ids)
+    if resp.status_code == 200:
+        return [(d["id"], d["name"], d["category"]) for d in data], []
+    if resp.status_code != 404:
+        # not about the IDs, try again next time
+        return [], []
+    if len(ids) == 1:
+        return [], ids
+    with name_stats_lock:
+        name_stats['bisected'] += 1
+    middle = len(ids) // 2
+    resolved, invalid = _resolve_ids(ids[:middle])
+    more_resolved, more_invalid = _resolve_ids(ids[middle:])
+    return resolved + more_resolved, invalid + more_invalid
+
+
 def ids_to_names(lookup_ids):
     """Looks up names from a list of ids
 
@@ -148,51 +353,104 @@ def ids_to_names(lookup_ids):
         lookup_ids (list of integers): list of ids to resolve to names
 
     Returns:
-        dict: dict of id to name mappings
+        dict: dict of id to name mappings, IDs ESI doesn't know are left out
 
     >>> ids_to_names([1073945516, 30003801])
     {30003801: 'Aunsou', 1073945516: 'n0rman'}
     >>> ids_to_names([1])
-    Traceback (most recent call last):
-    ...
-    requests.exceptions.HTTPError: Ensure all IDs are valid before resolving.
+    {}
     """
     logger.info("Looking up ids", extra={"lookup": lookup_ids})
 
-    ids = []
-    id_name = {}
-    for i in lookup_ids:
-        try:
-            id_name[i] = id_name_cat[i][0]
-        except KeyError:
-            ids.append(i)
+    id_name, ids = name_index.lookup_ids(lookup_ids)
     if len(ids) > 0:
-        chunk_size = 400  # max is 500
-        for chunk in [ids[i:i + chunk_size] for i in range(0, len(ids), chunk_size)]:
-            resp, chunk_data = ncr.post_universe_names(names=chunk)
-            if resp.status_code == 200:
-                for d in chunk_data:
-                    d_id = d["id"]
-                    d_cat = d["category"]
-                    d_name = d["name"]
-                    id_name_cat[d_id] = (d_name, d_cat)
-                    if d_cat not in cat_name_id.keys():
-                        cat_name_id[d_cat] = {}
-                    cat_name_id[d_cat][d_name] = d_id
-                    id_name[d_id] = d_name
+        chunk_size = 400  # max is 1000
+        # chunks are sent concurrently, their results merged in chunk order
+        for resolved, invalid in chunk_dispatcher.map(_resolve_ids, ids, chunk_size, 'ids_to_names'):
+            remember_names(resolved)
+            remember_unresolved(ids=invalid)
+            with name_stats_lock:
+                name_stats['resolved'] += len(resolved)
+            for d_id, d_name, d_cat in resolved:
+                id_name[d_id] = d_name
 
     logger.info("Lookup finished", extra={"returned": dict(sorted(id_name.items()))})
 
     return dict(sorted(id_name.items()))
 
 
+
+def _type_ids(names):
+    return names_to_ids(names).get('inventory_types', {})
+
+
+# batch single lookups into one /universe/names/ or /universe/ids/ request:
+# register with load(), the first result() resolves them all
+id_name_loader = BatchLoader(ids_to_names, name='ids_to_names')
+type_id_loader = BatchLoader(_type_ids, name='type_ids')
+
 ############
 
 
-def notify_slack(messages):
-    params = {
-        'text': '\n\n'.join(messages)
-    }
-    results = requests.post(CONFIG['OUTBOUND_WEBHOOK'], json=params)
-    results.raise_for_status()
-    # print(params)
+def create_notifier():
+    """Creates the notifier for the sinks listed in NOTIFY_SINKS
+
+    Sinks without the setting they need are left out.
+
+    Returns:
+        Notifier: new notifier
+    """
+    timeout = (CONFIG['HTTP_CONNECT_TIMEOUT'], CONFIG['HTTP_READ_TIMEOUT'])
+    retry = RetryPolicy(attempts=CONFIG['RETRY_ATTEMPTS'],
+                        backoff=CONFIG['RETRY_BACKOFF'],
+                        max_backoff=CONFIG['RETRY_MAX_BACKOFF'],
+                        statuses=(429, 500, 502, 503, 504),
+                        budget=RetryBudget(max_retries=CONFIG['RETRY_BUDGET']))
+    webhooks = {'slack': (SlackSink, CONFIG['OUTBOUND_WEBHOOK']), 'discord': (DiscordSink, CONFIG['DISCORD_WEBHOOK'])}
+    sinks = []
+    for name in (CONFIG['NOTIFY_SINKS'] or '').split(','):
+        name = name.strip().lower()
+        if not name:
+            continue
+        if name in webhooks:
+            sink, url = webhooks[name]
+            if url:
+                sinks.append(sink(url, breaker=circuit_breaker(name), retry=retry, timeout=timeout))
+                continue
+        elif name == 'file':
+            if CONFIG['NOTIFY_FILE']:
+                sinks.append(FileSink(CONFIG['NOTIFY_FILE']))
+                continue
+        elif name == 'stdout':
+            sinks.append(StdoutSink())
+            continue
+        logger.error("Notification sink is unknown or not configured", extra={"sink": name})
+    return Notifier(sinks)
+
+
+_notifier = None
+_notifier_lock = threading.Lock()
+
+
+def get_notifier():
+    """Returns the shared notifier, creating it on first use
+
+    Returns:
+        Notifier: the notifier
+    """
+    global _notifier
+    with _notifier_lock:
+        if _notifier is None:
+            _notifier = create_notifier()
+        return _notifier
+
+
+def notify(messages):
+    """Sends messages to all configured sinks in the background
+
+    Call get_notifier().flush() before exiting to wait for the delivery.
+
+    Args:
+        messages (list): message strings
+    """
+    get_notifier().notify(messages)
@@ -0,0 +1,61 @@
+from __future__ import absolute_import
+import doctest
+import os
+import shutil
+import tempfile
+import unittest
+from structurebot import alerts
+from structurebot.alerts import CHANGED, NEW, REMINDER, AlertLedger, open_alert_ledger
+
+
+def load_tests(loader, tests, ignore):
+    tests.addTests(doctest.DocTestSuite(alerts))
+    return tests
+
+
+class TestAlertLedger(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'alerts.sqlite')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def run_alerts(self, alerts, now, clear=True):
+        ledger = AlertLedger(self.path, cooldown=3600)
+        reasons = [ledger.check(entity, kind, fingerprint, now=now) for entity, kind, fingerprint in alerts]
+        ledger.commit(clear=clear)
+        ledger.close()
+        return reasons
+
+    def test_persists_between_runs(self):
+        fuel = (1035466617946, 'fuel', '2024-01-05')
+        self.assertEqual([NEW], self.run_alerts([fuel], now=0))
+        self.assertEqual([None], self.run_alerts([fuel], now=600))
+        self.assertEqual([CHANGED], self.run_alerts([(1035466617946, 'fuel', '2024-01-08')], now=1200))
+        self.assertEqual([REMINDER], self.run_alerts([(1035466617946, 'fuel', '2024-01-08')], now=4800))
+
+    def test_kinds_are_separate(self):
+        self.run_alerts([(1, 'fuel', ''), (2, 'fuel', '')], now=0)
+        self.assertEqual([None, NEW, None], self.run_alerts([(1, 'fuel', ''), (1, 'core', ''), (2, 'fuel', '')],
+                                                            now=60))
+
+    def test_cleared_alerts_come_back_as_new(self):
+        self.run_alerts([(1, 'fuel', '')], now=0)
+        self.run_alerts([], now=60)
+        self.assertEqual([NEW], self.run_alerts([(1, 'fuel', '')], now=120))
+
+    def test_incomplete_run_keeps_alerts(self):
+        self.run_alerts([(1, 'fuel', '')], now=0)
+        self.run_alerts([], now=60, clear=False)
+        self.assertEqual([None], self.run_alerts([(1, 'fuel', '')], now=120))
+
+    def test_uncommitted_alerts_are_sent_again(self):
+        ledger = AlertLedger(self.path, cooldown=3600)
+        ledger.check(1, 'fuel', '', now=0)
+        ledger.close()
+        self.assertEqual([NEW], self.run_alerts([(1, 'fuel', '')], now=60))
+
+    def test_disabled(self):
+        self.assertIsNone(open_alert_ledger(self.path, 0))
+        self.assertIsInstance(open_alert_ledger(self.path, 3600), AlertLedger)
@@ -0,0 +1,40 @@
+from __future__ import absolute_import
+import asyncio
+import unittest
+from structurebot.async_requester import AsyncNCR
+from structurebot.neucore_requester import NCR
+from tests.test_neucore_requester import FakeSession, make_ncr
+
+
+class TestAsyncNCR(unittest.TestCase):
+    def test_mirrors_endpoints(self):
+        endpoints = [n for n in dir(NCR) if n.startswith(('get_', 'post_'))]
+        self.assertGreater(len(endpoints), 0)
+        for name in endpoints:
+            self.assertTrue(asyncio.iscoroutinefunction(getattr(AsyncNCR, name)), name)
+
+    def test_gather_bounded(self):
+        ncr = make_ncr()
+        ncr.esi_session = FakeSession({1: {'name': 'Jita'}}, delay=0.02)
+
+        async def run():
+            async with AsyncNCR(ncr, concurrency=4) as client:
+                return await asyncio.gather(*[client.get_universe_systems_system_id(system_id=i)
+                                              for i in range(12)])
+
+        results = asyncio.run(run())
+        self.assertEqual(12, len(results))
+        self.assertEqual([{'name': 'Jita'}] * 12, [data for response, data in results])
+        self.assertGreater(ncr.esi_session.max_active, 1)
+        self.assertLessEqual(ncr.esi_session.max_active, 4)
+
+    def test_shared_client_pools(self):
+        ncr = make_ncr(pool_maxsize=20)
+        adapter = ncr.esi_session.get_adapter('https://esi.test/')
+        client = AsyncNCR(ncr, concurrency=4)
+        self.assertIs(adapter, ncr.esi_session.get_adapter('https://esi.test/'))
+        self.assertIsNone(client._executor)
+        AsyncNCR(ncr, concurrency=32).close()
+        self.assertEqual(32, ncr.pool_maxsize)
+        self.assertEqual(32, ncr.scheduler.max_concurrent)
+        self.assertIsNot(adapter, ncr.esi_session.get_adapter('https://esi.test/'))
@@ -0,0 +1,56 @@
+from __future__ import absolute_import
+import doctest
+import unittest
+
+from structurebot import batch
+from structurebot.batch import BatchLoader
+
+
+def load_tests(loader, tests, ignore):
+    tests.addTests(doctest.DocTestSuite(batch))
+    return tests
+
+
+class TestBatchLoader(unittest.TestCase):
+    def setUp(self):
+        self.calls = []
+
+    def names(self, ids):
+        self.calls.append(list(ids))
+        return {i: 'name {}'.format(i) for i in ids if i > 0}
+
+    def test_one_request_for_registered_lookups(self):
+        loader = BatchLoader(self.names)
+        futures = loader.load_many([3, 1, 2])
+        self.assertEqual('name 1', futures[1].result())
+        self.assertEqual(['name 3', 'name 1', 'name 2'], [f.result() for f in futures])
+        self.assertEqual([[3, 1, 2]], self.calls)
+
+    def test_memoized(self):
+        loader = BatchLoader(self.names)
+        loader.load(1).result()
+        loader.load(1).result()
+        loader.load(2).result()
+        self.assertEqual([[1], [2]], self.calls)
+        self.assertEqual({'loader': 'batch', 'loads': 3, 'batches': 2, 'keys': 2}, loader.stats())
+
+    def test_missing_key(self):
+        loader = BatchLoader(self.names)
+        missing, found = loader.load(-1), loader.load(1)
+        with self.assertRaises(KeyError):
+            missing.result()
+        self.assertEqual('name 1', found.result())
+
+    def test_failed_batch_retried(self):
+        failures = [ValueError('ESI down')]
+
+        def flaky(ids):
+            if failures:
+                raise failures.pop()
+            return self.names(ids)
+
+        loader = BatchLoader(flaky)
+        future = loader.load(1)
+        with self.assertRaises(ValueError):
+            future.result()
+        self.assertEqual('name 1', loader.load(1).result())
@@ -0,0 +1,57 @@
+from __future__ import absolute_import
+import unittest
+import requests
+from structurebot.breaker import CircuitBreaker, CircuitOpenError
+from structurebot.retry import RetryPolicy
+from tests.test_neucore_requester import FakeSession, make_ncr, make_response
+
+
+def respond(status):
+    return lambda: make_response('https://esi.test/', {}, status_code=status)
+
+
+def fail():
+    raise requests.exceptions.ConnectionError('connection refused')
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def test_opens_on_failure_rate(self):
+        breaker = CircuitBreaker('esi', failure_rate=0.5, min_requests=4)
+        for send in [respond(200), respond(503), respond(200)]:
+            breaker.call(send)
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            breaker.call(fail)
+        self.assertEqual(CircuitBreaker.OPEN, breaker.state)
+        with self.assertRaises(CircuitOpenError):
+            breaker.call(respond(200))
+        self.assertEqual({'upstream': 'esi', 'state': 'open', 'trips': 1, 'rejected': 1}, breaker.stats())
+
+    def test_client_errors_are_healthy(self):
+        breaker = CircuitBreaker('neucore', min_requests=2)
+        for i in range(5):
+            breaker.call(respond(403))
+        self.assertEqual(CircuitBreaker.CLOSED, breaker.state)
+
+    def test_half_open_probe(self):
+        breaker = CircuitBreaker('esi', min_requests=1, reset_timeout=0)
+        breaker.call(respond(502))
+        self.assertEqual(CircuitBreaker.OPEN, breaker.state)
+        breaker.before_request()
+        self.assertEqual(CircuitBreaker.HALF_OPEN, breaker.state)
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_request()
+        breaker.record(failed=False)
+        self.assertEqual(CircuitBreaker.CLOSED, breaker.state)
+
+    def test_ncr_fails_fast(self):
+        ncr = make_ncr(retry=RetryPolicy(attempts=1),
+                       breakers={'neucore': CircuitBreaker('neucore', min_requests=1),
+                                 'esi': CircuitBreaker('esi')})
+        ncr.nc_session = FakeSession({})
+        with self.assertRaises(KeyError):
+            ncr.get_corporations_corporation_id_starbases(corporation_id=1)
+        ncr.breakers['neucore'].record(failed=True)
+        with self.assertRaises(CircuitOpenError):
+            ncr.get_corporations_corporation_id_starbases(corporation_id=1)
+        ncr.esi_session = FakeSession({1: {}})
+        ncr.get_corporations_corporation_id(corporation_id=1)
@@ -0,0 +1,114 @@
+from __future__ import absolute_import
+import doctest
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from structurebot import cache
+from structurebot.cache import CacheEntry, LRUCache, SQLiteCache, SQLiteNameCache
+
+
+def load_tests(loader, tests, ignore):
+    tests.addTests(doctest.DocTestSuite(cache))
+    return tests
+
+
+def make_entry(size, expires=60):
+    return CacheEntry('url', b'x' * size, {}, time.time() + expires)
+
+
+class TestLRUCache(unittest.TestCase):
+    def test_byte_budget(self):
+        lru = LRUCache(max_bytes=100)
+        lru.set('a', make_entry(40))
+        lru.set('b', make_entry(40))
+        lru.get('a')
+        lru.set('c', make_entry(40))
+        self.assertIsNone(lru.get('b'))
+        self.assertIsNotNone(lru.get('a'))
+        self.assertIsNotNone(lru.get('c'))
+        self.assertEqual(80, lru.size)
+        self.assertEqual(1, lru.stats()['evictions'])
+
+    def test_oversized_entry(self):
+        lru = LRUCache(max_bytes=10)
+        lru.set('a', make_entry(11))
+        self.assertEqual(0, len(lru))
+
+    def test_replace(self):
+        lru = LRUCache(max_bytes=100)
+        lru.set('a', make_entry(40))
+        lru.set('a', make_entry(10))
+        self.assertEqual(10, lru.size)
+
+    def test_ttl(self):
+        lru = LRUCache(max_bytes=100, ttl=0)
+        lru.set('a', make_entry(1))
+        time.sleep(0.01)
+        self.assertIsNone(lru.get('a'))
+        self.assertEqual(0, lru.size)
+
+
+class TestSQLiteCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'cache.sqlite')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_roundtrip(self):
+        backend = SQLiteCache(self.path)
+        entry = CacheEntry('https://esi.test/universe/types/34/', b'{"name": "Tritanium"}',
+                           {'ETag': '"abc"', 'X-Pages': '1'}, time.time() + 60)
+        backend.set('key', entry)
+        cached = backend.get('key')
+        self.assertEqual(entry.content, cached.content)
+        self.assertEqual('"abc"', cached.headers['etag'])
+        self.assertTrue(cached.fresh)
+        self.assertIsNone(backend.get('other'))
+        self.assertEqual({'backend': 'sqlite', 'hits': 1, 'misses': 1, 'evictions': 0}, backend.stats())
+
+    def test_shared_between_instances(self):
+        writer = SQLiteCache(self.path)
+        reader = SQLiteCache(self.path)
+        writer.set('key', CacheEntry('url', b'[]', {}, time.time() + 60))
+        self.assertEqual(b'[]', reader.get('key').content)
+
+    def test_purge(self):
+        backend = SQLiteCache(self.path, max_stale=10)
+        backend.set('old', CacheEntry('url', b'[]', {}, time.time() - 60))
+        backend.set('new', CacheEntry('url', b'[]', {}, time.time() - 5))
+        self.assertEqual(1, backend.purge())
+        self.assertIsNone(backend.get('old'))
+        self.assertIsNotNone(backend.get('new'))
+        self.assertEqual(1, backend.stats()['evictions'])
+
+
+class TestSQLiteNameCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'cache.sqlite')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_shared_between_runs(self):
+        SQLiteNameCache(self.path).set_many([(30003801, 'Aunsou', 'solar_system'),
+                                             (1073945516, 'n0rman', 'character')])
+        self.assertEqual([(30003801, 'Aunsou', 'solar_system'), (1073945516, 'n0rman', 'character')],
+                         sorted(SQLiteNameCache(self.path).load(), key=lambda e: e[1]))
+
+    def test_expired_not_loaded(self):
+        names = SQLiteNameCache(self.path, ttl=0.05)
+        names.set_many([(30003801, 'Aunsou', 'solar_system')])
+        time.sleep(0.1)
+        self.assertEqual([], names.load())
+        self.assertEqual(1, names.purge())
+
+    def test_shares_file_with_response_cache(self):
+        responses = SQLiteCache(self.path)
+        SQLiteNameCache(self.path).set_many([(34, 'Tritanium', 'inventory_type')])
+        responses.set('key', CacheEntry('url', b'[]', {}, time.time() + 60))
+        self.assertEqual(b'[]', responses.get('key').content)
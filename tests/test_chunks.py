@@ -0,0 +1,68 @@
+from __future__ import absolute_import
+import doctest
+import threading
+import time
+import unittest
+
+from structurebot import chunks
+from structurebot.chunks import ChunkDispatcher
+
+
+def load_tests(loader, tests, ignore):
+    tests.addTests(doctest.DocTestSuite(chunks))
+    return tests
+
+
+class TestChunkDispatcher(unittest.TestCase):
+    def setUp(self):
+        self.dispatcher = ChunkDispatcher(max_workers=3)
+        self.addCleanup(self.dispatcher.shutdown)
+
+    def test_concurrent_bounded_and_ordered(self):
+        lock = threading.Lock()
+        active = [0, 0]  # current, max
+
+        def slow(chunk):
+            with lock:
+                active[0] += 1
+                active[1] = max(active)
+            # later chunks finish first
+            time.sleep(0.05 / chunk[0])
+            with lock:
+                active[0] -= 1
+            return chunk
+
+        results = self.dispatcher.map(slow, list(range(1, 11)), 2, 'test')
+        self.assertEqual([[1, 2], [3, 4], [5, 6], [7, 8], [9, 10]], results)
+        self.assertGreater(active[1], 1)
+        self.assertLessEqual(active[1], 3)
+        self.assertEqual(5, self.dispatcher.stats()['chunks'])
+
+    def test_nested_dispatch_runs_inline(self):
+        def outer(chunk):
+            return sum(self.dispatcher.map(sum, list(range(10)), 1, 'inner'))
+
+        self.assertEqual([45] * 6, self.dispatcher.map(outer, list(range(6)), 1, 'outer'))
+
+    def test_error_raised(self):
+        def fail(chunk):
+            raise ValueError(chunk)
+
+        with self.assertRaises(ValueError):
+            self.dispatcher.map(fail, [1, 2, 3], 1, 'test')
+
+    def test_shutdown_with_chunk_in_flight(self):
+        started = threading.Event()
+
+        def slow(chunk):
+            started.set()
+            time.sleep(0.2)
+            return chunk
+
+        self.dispatcher.executor.submit(self.dispatcher._run, slow, [1], 0, 'test')
+        started.wait(5)
+        shutdown = threading.Thread(target=self.dispatcher.shutdown)
+        shutdown.start()
+        shutdown.join(5)
+        self.assertFalse(shutdown.is_alive())
+        self.assertEqual(1, self.dispatcher.stats()['chunks'])
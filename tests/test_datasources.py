@@ -0,0 +1,87 @@
+from __future__ import absolute_import
+import doctest
+import unittest
+
+from structurebot import datasources
+from structurebot.datasources import Datasource, DatasourcePool, NoDatasourceError, datasource_error
+from tests.test_neucore_requester import FakeSession, make_ncr, make_response
+
+URL = 'https://neucore.test/api/app/v2/esi'
+
+
+def load_tests(loader, tests, ignore):
+    tests.addTests(doctest.DocTestSuite(datasources))
+    return tests
+
+
+class RejectingSession(FakeSession):
+    """Answers like Neucore for characters listed in rejected"""
+
+    def __init__(self, pages, rejected):
+        super(RejectingSession, self).__init__(pages)
+        self.rejected = rejected
+
+    def request(self, method, url, params=None, headers=None, **kwargs):
+        character = (headers or {}).get('Neucore-EveCharacter')
+        if character in self.rejected:
+            with self.lock:
+                self.calls.append((method, url, params, headers))
+            return make_response(url, self.rejected[character], status_code=400, method=method)
+        return super(RejectingSession, self).request(method, url, params=params, headers=headers, **kwargs)
+
+
+class TestDatasourceError(unittest.TestCase):
+    def test_classification(self):
+        self.assertEqual('dead', datasource_error(make_response(URL, 'Character not found.', status_code=400)))
+        role = {'error': 'Character does not have required role(s)'}
+        self.assertEqual('role', datasource_error(make_response(URL, role, status_code=403)))
+        self.assertIsNone(datasource_error(make_response(URL, {'error': 'Not found'}, status_code=404)))
+        self.assertIsNone(datasource_error(make_response(URL, [])))
+
+
+class TestDatasourcePool(unittest.TestCase):
+    def test_exclude(self):
+        pool = DatasourcePool([Datasource(1), Datasource(2)])
+        self.assertEqual('2', pool.acquire(exclude=pool.datasources[:1]).character_id)
+        with self.assertRaises(NoDatasourceError):
+            pool.acquire(exclude=pool.datasources)
+
+    def test_dead_retired(self):
+        pool = DatasourcePool([Datasource(1), Datasource(2)])
+        dead = pool.acquire()
+        pool.report(dead, make_response(URL, 'Character not found.', status_code=400))
+        self.assertEqual(['2', '2'], [pool.acquire().character_id for i in range(2)])
+        self.assertEqual({'alive': False, 'requests': 1, 'failures': 1}, pool.stats()['1'])
+
+
+class TestNCRDatasources(unittest.TestCase):
+    def test_requests_spread(self):
+        ncr = make_ncr(datasources=DatasourcePool.from_config('1:a,2:b'))
+        ncr.nc_session = FakeSession({1: {}})
+        ncr.get_corporations_corporation_id_structures(1)
+        ncr.get_corporations_corporation_id_starbases(1)
+        self.assertEqual(['1', '2'], [c[3]['Neucore-EveCharacter'] for c in ncr.nc_session.calls])
+        self.assertEqual(['a', 'b'], [c[3]['Neucore-EveLogin'] for c in ncr.nc_session.calls])
+
+    def test_dead_datasource_failed_over(self):
+        ncr = make_ncr(datasources=DatasourcePool.from_config('1,2'))
+        ncr.nc_session = RejectingSession({1: {'ok': True}}, {'1': 'Character not found.'})
+        response, data = ncr.get_corporations_corporation_id_structures(1)
+        self.assertEqual({'ok': True}, data)
+        response, data = ncr.get_corporations_corporation_id_starbases(1)
+        self.assertEqual(['1', '2', '2'], [c[3]['Neucore-EveCharacter'] for c in ncr.nc_session.calls])
+        self.assertEqual([False, True], [d.alive for d in ncr.datasources.datasources])
+
+    def test_all_rejected(self):
+        ncr = make_ncr(datasources=DatasourcePool.from_config('1,2'))
+        ncr.nc_session = RejectingSession({1: {}}, {'1': 'Character not found.', '2': 'Character not found.'})
+        response, data = ncr.get_corporations_corporation_id_structures(1)
+        self.assertEqual(400, response.status_code)
+        with self.assertRaises(NoDatasourceError):
+            ncr.get_corporations_corporation_id_structures(2)
+
+    def test_esi_without_datasource(self):
+        ncr = make_ncr()
+        ncr.esi_session = FakeSession({1: {}})
+        ncr.get_universe_systems_system_id(30000142)
+        self.assertNotIn('Neucore-EveCharacter', ncr.esi_session.calls[0][3])
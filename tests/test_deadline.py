@@ -0,0 +1,60 @@
+from __future__ import absolute_import
+import doctest
+import unittest
+from structurebot import deadline
+from structurebot.deadline import Deadline, DeadlineExceeded
+from structurebot.retry import RetryPolicy
+from tests.test_neucore_requester import FakeSession, make_ncr, make_response
+
+
+def load_tests(loader, tests, ignore):
+    tests.addTests(doctest.DocTestSuite(deadline))
+    return tests
+
+
+class RecordingSession(FakeSession):
+    def request(self, method, url, params=None, headers=None, timeout=None, **kwargs):
+        self.timeouts = getattr(self, 'timeouts', []) + [timeout]
+        return super(RecordingSession, self).request(method, url, params=params, headers=headers, **kwargs)
+
+
+class TestDeadline(unittest.TestCase):
+    def test_timeout_on_every_request(self):
+        ncr = make_ncr(timeout=(2, 10))
+        ncr.esi_session = RecordingSession({1: {}})
+        ncr.esi_post('/universe/names/', data=[1])
+        self.assertEqual([(2, 10)], ncr.esi_session.timeouts)
+
+    def test_timeout_shrinks_to_deadline(self):
+        ncr = make_ncr(timeout=(5, 30), deadline=Deadline(3))
+        ncr.esi_session = RecordingSession({1: {}})
+        ncr.get_universe_systems_system_id(system_id=30003801)
+        connect, read = ncr.esi_session.timeouts[0]
+        self.assertLessEqual(connect, 3)
+        self.assertLessEqual(read, 3)
+
+    def test_no_requests_after_deadline(self):
+        ncr = make_ncr(deadline=Deadline(1e-9))
+        ncr.nc_session = RecordingSession({1: []})
+        with self.assertRaises(DeadlineExceeded):
+            ncr.get_corporations_corporation_id_structures(corporation_id=1)
+        self.assertEqual([], ncr.nc_session.calls)
+
+    def test_error_limit_pause_past_deadline(self):
+        ncr = make_ncr(deadline=Deadline(5))
+        ncr.governors['esi'].update({'X-ESI-Error-Limit-Remain': '5', 'X-ESI-Error-Limit-Reset': '60'})
+        ncr.esi_session = RecordingSession({1: {}})
+        with self.assertRaises(DeadlineExceeded):
+            ncr.get_universe_systems_system_id(system_id=30003801)
+        self.assertEqual([], ncr.esi_session.calls)
+
+    def test_retry_after_past_deadline(self):
+        responses = []
+
+        def send():
+            responses.append(make_response('https://esi.test/', {}, status_code=503, headers={'Retry-After': '30'}))
+            return responses[-1]
+
+        with self.assertRaises(DeadlineExceeded):
+            RetryPolicy(attempts=3).call(send, deadline=Deadline(5))
+        self.assertEqual(1, len(responses))
@@ -0,0 +1,41 @@
+from __future__ import absolute_import
+import doctest
+import unittest
+from structurebot import governor
+from structurebot.deadline import Deadline, DeadlineExceeded
+from structurebot.governor import ErrorLimitGovernor
+from tests.test_neucore_requester import FakeSession, make_ncr
+
+
+def load_tests(loader, tests, ignore):
+    tests.addTests(doctest.DocTestSuite(governor))
+    return tests
+
+
+class TestGovernor(unittest.TestCase):
+    def test_reads_every_response(self):
+        esi = ErrorLimitGovernor(slow_threshold=50, pause_threshold=10, max_delay=0.05)
+        ncr = make_ncr(governors={'neucore': ErrorLimitGovernor(), 'esi': esi})
+        ncr.esi_session = FakeSession({1: {}}, response_headers={'X-ESI-Error-Limit-Remain': '20',
+                                                                  'X-ESI-Error-Limit-Reset': '60'})
+        ncr.get_universe_regions_region_id(region_id=10000002)
+        self.assertEqual(20, esi.remain)
+        self.assertIsNone(ncr.governors['neucore'].remain)
+        ncr.get_universe_regions_region_id(region_id=10000002)
+        stats = esi.stats()
+        self.assertEqual(1, stats['held_requests'])
+        self.assertGreater(stats['held_seconds'], 0)
+
+    def test_upstreams_have_own_budget(self):
+        ncr = make_ncr(deadline=Deadline(120))
+        ncr.governors['neucore'].update({'X-ESI-Error-Limit-Remain': '5', 'X-ESI-Error-Limit-Reset': '600'})
+        ncr.esi_session = FakeSession({1: {'name': 'The Forge'}})
+        self.assertEqual({'name': 'The Forge'}, ncr.get_universe_regions_region_id(region_id=10000002)[1])
+        with self.assertRaises(DeadlineExceeded):
+            ncr.get_corporations_corporation_id_structures(corporation_id=1)
+
+    def test_pause_until_reset(self):
+        limiter = ErrorLimitGovernor(pause_threshold=10)
+        limiter.update({'X-ESI-Error-Limit-Remain': '5', 'X-ESI-Error-Limit-Reset': '0'})
+        self.assertEqual(0, limiter.wait())
+        self.assertIsNone(limiter.remain)
@@ -0,0 +1,38 @@
+from __future__ import absolute_import
+import doctest
+import importlib.util
+import unittest
+from unittest import mock
+
+from structurebot import json_backend
+from tests.test_neucore_requester import FakeSession, make_ncr
+
+
+def load_tests(loader, tests, ignore):
+    tests.addTests(doctest.DocTestSuite(json_backend))
+    return tests
+
+
+class TestJSONBackend(unittest.TestCase):
+    def tearDown(self):
+        json_backend.set_backend('json')
+
+    @unittest.skipIf(importlib.util.find_spec('orjson') is None, 'orjson is not installed')
+    def test_orjson(self):
+        self.assertEqual('orjson', json_backend.set_backend('orjson'))
+        self.assertEqual([{'type_id': 34, 'name': 'Tritanium'}],
+                         json_backend.loads(b'[{"type_id": 34, "name": "Tritanium"}]'))
+
+    def test_invalid_json(self):
+        for name in json_backend.BACKENDS:
+            json_backend.set_backend(name)
+            with self.assertRaises(ValueError):
+                json_backend.loads(b'<html>Bad Gateway</html>')
+
+    def test_decoded_once_per_page(self):
+        ncr = make_ncr()
+        ncr.nc_session = FakeSession({1: [1], 2: [2], 3: [3]})
+        with mock.patch.object(json_backend, 'loads', wraps=json_backend.loads) as loads:
+            response, data = ncr.get_corporations_corporation_id_assets(1)
+        self.assertEqual([1, 2, 3], data)
+        self.assertEqual(3, loads.call_count)
@@ -0,0 +1,34 @@
+from __future__ import absolute_import
+import doctest
+import unittest
+
+from structurebot import name_index
+from structurebot.name_index import NameIndex
+
+
+def load_tests(loader, tests, ignore):
+    tests.addTests(doctest.DocTestSuite(name_index))
+    return tests
+
+
+class TestNameIndex(unittest.TestCase):
+    def test_same_name_in_several_categories(self):
+        index = NameIndex()
+        index.add_many([(98000001, 'Brave', 'corporations'), (90000001, 'Brave', 'characters')])
+        found, missing = index.lookup_names(['Brave'])
+        self.assertEqual({'corporations': {'Brave': 98000001}, 'characters': {'Brave': 90000001}}, found)
+        self.assertEqual([], missing)
+
+    def test_renamed(self):
+        index = NameIndex()
+        index.add(90000001, 'Old Name', 'characters')
+        index.add(90000001, 'New Name', 'characters')
+        self.assertIsNone(index.id_for('Old Name', 'characters'))
+        self.assertEqual({90000001: 'New Name'}, index.lookup_ids([90000001])[0])
+
+    def test_stats(self):
+        index = NameIndex()
+        index.add(34, 'Tritanium', 'inventory_types')
+        index.lookup_names(['Tritanium', 'Pyerite', 'Pyerite'])
+        index.lookup_ids([34])
+        self.assertEqual({'names': 1, 'unresolved': 0, 'hits': 2, 'misses': 1, 'hit_rate': 0.667}, index.stats())
@@ -0,0 +1,191 @@
+from __future__ import absolute_import
+import datetime
+import email.utils
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+from structurebot.cache import SQLiteCache
+from structurebot.neucore_requester import NCR
+
+
+def make_response(url, data, status_code=200, headers=None, method='GET'):
+    """Builds a requests.Response as returned by a real session"""
+    response = requests.Response()
+    response.status_code = status_code
+    response.url = url
+    response._content = json.dumps(data).encode()
+    response.headers.update(headers or {})
+    response.elapsed = datetime.timedelta(milliseconds=1)
+    response.request = requests.Request(method, url).prepare()
+    return response
+
+
+class FakeSession(object):
+    """Stands in for requests.Session, answering from a dict of pages"""
+
+    def __init__(self, pages, delay=0.0, response_headers=None):
+        self.pages = pages
+        self.delay = delay
+        self.response_headers = response_headers or {}
+        self.headers = {}
+        self.adapters = {}
+        self.calls = []
+        self.lock = threading.Lock()
+        self.active = 0
+        self.max_active = 0
+
+    def _page(self, url, params):
+        if params and 'esi-path-query' in params:
+            query = parse_qs(urlparse(params['esi-path-query']).query)
+        else:
+            query = {k: [str(v)] for k, v in (params or {}).items()}
+        return int(query.get('page', ['1'])[0])
+
+    def request(self, method, url, params=None, headers=None, **kwargs):
+        with self.lock:
+            self.calls.append((method, url, params, headers))
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(self.delay)
+            page = self._page(url, params)
+            response_headers = {'X-Pages': str(len(self.pages))}
+            response_headers.update(self.response_headers)
+            etag = response_headers.get('ETag')
+            if etag and (headers or {}).get('If-None-Match') == etag:
+                return make_response(url, None, status_code=304, headers=response_headers, method=method)
+            return make_response(url, self.pages[page], headers=response_headers, method=method)
+        finally:
+            with self.lock:
+                self.active -= 1
+
+    def mount(self, prefix, adapter):
+        self.adapters[prefix] = adapter
+
+    def get(self, url, params=None, **kwargs):
+        return self.request('GET', url, params=params, **kwargs)
+
+    def post(self, url, data=None, params=None, **kwargs):
+        return self.request('POST', url, params=params, **kwargs)
+
+
+def make_ncr(**kwargs):
+    kwargs.setdefault('cache_nc', False)
+    kwargs.setdefault('cache_esi', False)
+    return NCR(app_id='1', app_secret='secret', datasource_id='1', datasource_name='test',
+               neucore_prefix='https://neucore.test/api/app/v2/esi', esi_prefix='https://esi.test', **kwargs)
+
+
+def http_date(offset):
+    return email.utils.formatdate(time.time() + offset, usegmt=True)
+
+
+class TestPagination(unittest.TestCase):
+    def test_pages_merged_in_order(self):
+        ncr = make_ncr(page_workers=4)
+        pages = {p: [p * 10 + i for i in range(3)] for p in range(1, 7)}
+        ncr.nc_session = FakeSession(pages, delay=0.02)
+        response, data = ncr.nc_get('/corporations/1/assets/')
+        self.assertEqual(200, response.status_code)
+        self.assertEqual([item for p in sorted(pages) for item in pages[p]], data)
+        self.assertEqual(6, len(ncr.nc_session.calls))
+
+    def test_pages_fetched_concurrently(self):
+        ncr = make_ncr(page_workers=3)
+        ncr.esi_session = FakeSession({p: [p] for p in range(1, 8)}, delay=0.05)
+        ncr.esi_get('/sovereignty/map/')
+        self.assertGreater(ncr.esi_session.max_active, 1)
+        self.assertLessEqual(ncr.esi_session.max_active, 3)
+
+    def test_single_page(self):
+        ncr = make_ncr()
+        ncr.esi_session = FakeSession({1: {'a': 1}})
+        response, data = ncr.esi_post('/universe/ids/', data=['Jita'])
+        self.assertEqual({'a': 1}, data)
+        self.assertEqual(1, len(ncr.esi_session.calls))
+
+
+class TestCache(unittest.TestCase):
+    def test_fresh_served_from_cache(self):
+        ncr = make_ncr(cache_esi=True)
+        ncr.esi_session = FakeSession({1: {'name': 'Jita'}}, response_headers={
+            'Date': http_date(0), 'Expires': http_date(300)})
+        ncr.get_universe_systems_system_id(30000142)
+        response, data = ncr.get_universe_systems_system_id(30000142)
+        self.assertEqual({'name': 'Jita'}, data)
+        self.assertTrue(response.from_cache)
+        self.assertEqual(1, len(ncr.esi_session.calls))
+
+    def test_query_order_shares_cache(self):
+        ncr = make_ncr(cache_nc=True)
+        ncr.nc_session = FakeSession({1: {'name': 'Jita'}}, response_headers={
+            'Date': http_date(0), 'Expires': http_date(300)})
+        ncr.nc_get('/universe/systems/30000142/', query={'language': 'en', 'datasource': 'tranquility'}, page=1)
+        ncr.nc_get('/universe/systems/30000142/', query={'datasource': 'tranquility', 'language': 'en'}, page=1)
+        self.assertEqual(1, len(ncr.nc_session.calls))
+
+    def test_stale_revalidated(self):
+        ncr = make_ncr(cache_nc=True)
+        ncr.nc_session = FakeSession({1: [1], 2: [2]}, response_headers={
+            'Date': http_date(0), 'Expires': http_date(-1), 'ETag': '"abc"'})
+        ncr.nc_get('/corporations/1/assets/')
+        response, data = ncr.nc_get('/corporations/1/assets/')
+        self.assertEqual([1, 2], data)
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(4, len(ncr.nc_session.calls))
+        # each page is revalidated on its own
+        self.assertEqual(['"abc"', '"abc"'], [c[3].get('If-None-Match') for c in ncr.nc_session.calls[2:]])
+
+    def test_cached_data_not_shared(self):
+        ncr = make_ncr(cache_esi=True)
+        ncr.esi_session = FakeSession({1: [{'type_id': 1}]}, response_headers={
+            'Date': http_date(0), 'Expires': http_date(300)})
+        response, data = ncr.esi_get('/universe/types/')
+        data[0]['name'] = 'mutated'
+        response, data = ncr.esi_get('/universe/types/')
+        self.assertEqual([{'type_id': 1}], data)
+
+    def test_persistent_backend_shared_between_runs(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'cache.sqlite')
+        headers = {'Date': http_date(0), 'Expires': http_date(300)}
+        first = make_ncr(cache_esi=True, cache_backend=SQLiteCache(path))
+        first.esi_session = FakeSession({1: {'name': 'Jita'}}, response_headers=headers)
+        first.get_universe_systems_system_id(30000142)
+
+        second = make_ncr(cache_esi=True, cache_backend=SQLiteCache(path))
+        second.esi_session = FakeSession({1: {'name': 'Jita'}}, response_headers=headers)
+        response, data = second.get_universe_systems_system_id(30000142)
+        self.assertEqual({'name': 'Jita'}, data)
+        self.assertEqual(0, len(second.esi_session.calls))
+        self.assertEqual(1, second.cache_backend.stats()['hits'])
+
+
+class TestStreaming(unittest.TestCase):
+    def test_iter_pages_in_order(self):
+        ncr = make_ncr(page_workers=2)
+        pages = {p: [p] for p in range(1, 6)}
+        ncr.nc_session = FakeSession(pages, delay=0.01)
+        self.assertEqual([[1], [2], [3], [4], [5]], [data for response, data in ncr.iter_pages('/assets/')])
+        self.assertLessEqual(ncr.nc_session.max_active, 2)
+
+    def test_iter_items(self):
+        ncr = make_ncr()
+        ncr.esi_session = FakeSession({1: [1, 2], 2: [3]})
+        self.assertEqual([1, 2, 3], list(ncr.iter_items('/sovereignty/map/', neucore=False)))
+
+    def test_stop_early(self):
+        ncr = make_ncr(page_workers=2)
+        ncr.nc_session = FakeSession({p: [p] for p in range(1, 21)})
+        for response, data in ncr.iter_pages('/assets/'):
+            break
+        self.assertLess(len(ncr.nc_session.calls), 20)
@@ -0,0 +1,131 @@
+from __future__ import absolute_import
+import doctest
+import io
+import json
+import os
+import tempfile
+import threading
+import unittest
+
+from structurebot import notify
+from structurebot.breaker import CircuitBreaker
+from structurebot.notify import DiscordSink, FileSink, Notifier, SlackSink, Sink, StdoutSink, split_messages
+from structurebot.retry import RetryPolicy
+from tests.test_neucore_requester import make_response
+
+WEBHOOK = 'https://hooks.test/webhook'
+
+
+def load_tests(loader, tests, ignore):
+    tests.addTests(doctest.DocTestSuite(notify))
+    return tests
+
+
+class FakePost(object):
+    def __init__(self, statuses=()):
+        self.statuses = list(statuses)
+        self.posts = []
+
+    def __call__(self, url, json=None, timeout=None):
+        self.posts.append(json)
+        status = self.statuses.pop(0) if self.statuses else 200
+        return make_response(url, {}, status_code=status)
+
+
+class Failing(Sink):
+    name = 'failing'
+
+    def send(self, text):
+        raise IOError('disk full')
+
+
+class TestSplitMessages(unittest.TestCase):
+    def test_parts_fit_limit(self):
+        messages = ['Structure {}\nFuel runs out in 2 days'.format(i) for i in range(200)]
+        parts = split_messages(messages, DiscordSink.limit)
+        self.assertGreater(len(parts), 1)
+        self.assertTrue(all(len(part) <= DiscordSink.limit for part in parts))
+        self.assertEqual('\n\n'.join(messages), '\n\n'.join(parts))
+
+    def test_overlong_line(self):
+        self.assertEqual(['aaaa', 'aa\nb'], split_messages(['aaaaaa\nb'], limit=4))
+
+
+class TestSinks(unittest.TestCase):
+    def test_webhook_fields(self):
+        for sink, field in [(SlackSink, 'text'), (DiscordSink, 'content')]:
+            post = FakePost()
+            sink(WEBHOOK, post=post).send('Low fuel')
+            self.assertEqual([{field: 'Low fuel'}], post.posts)
+
+    def test_webhook_retries_rate_limit(self):
+        post = FakePost([429, 429])
+        retry = RetryPolicy(attempts=3, backoff=0, statuses=(429, 503))
+        DiscordSink(WEBHOOK, retry=retry, breaker=CircuitBreaker('discord'), post=post).send('Low fuel')
+        self.assertEqual(3, len(post.posts))
+
+    def test_webhook_server_error_not_reposted(self):
+        post = FakePost([503])
+        retry = RetryPolicy(attempts=3, backoff=0, statuses=(429, 503))
+        with self.assertRaises(Exception):
+            SlackSink(WEBHOOK, retry=retry, post=post).send('Low fuel')
+        self.assertEqual(1, len(post.posts))
+
+    def test_webhook_error(self):
+        with self.assertRaises(Exception):
+            SlackSink(WEBHOOK, post=FakePost([400])).send('Low fuel')
+
+    def test_file_sink(self):
+        fd, path = tempfile.mkstemp(suffix='.ndjson')
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+        sink = FileSink(path)
+        sink.send('Low fuel')
+        sink.send('Low stront')
+        with open(path) as f:
+            lines = [json.loads(line) for line in f]
+        self.assertEqual(['Low fuel', 'Low stront'], [line['text'] for line in lines])
+
+    def test_stdout_sink(self):
+        stream = io.StringIO()
+        StdoutSink(stream).send('Low fuel')
+        self.assertEqual('Low fuel\n', stream.getvalue())
+
+
+class TestNotifier(unittest.TestCase):
+    def test_fan_out(self):
+        slack_post, discord_post = FakePost(), FakePost()
+        notifier = Notifier([SlackSink(WEBHOOK, post=slack_post), DiscordSink(WEBHOOK, post=discord_post)])
+        notifier.notify(['x' * 1500, 'y' * 1500])
+        self.assertTrue(notifier.flush(timeout=10))
+        self.assertEqual(1, len(slack_post.posts))
+        self.assertEqual(2, len(discord_post.posts))
+        self.assertEqual({'parts': 2, 'sent': 2, 'failed': 0}, notifier.stats()['discord'])
+
+    def test_failing_sink(self):
+        stream = io.StringIO()
+        notifier = Notifier([Failing(), StdoutSink(stream)])
+        notifier.notify(['Low fuel'])
+        self.assertFalse(notifier.flush(timeout=10))
+        self.assertEqual('Low fuel\n', stream.getvalue())
+        self.assertEqual({'parts': 1, 'sent': 0, 'failed': 1}, notifier.stats()['failing'])
+
+    def test_notify_returns_before_delivery(self):
+        release = threading.Event()
+
+        class Slow(Sink):
+            def send(self, text):
+                release.wait(10)
+
+        notifier = Notifier([Slow()])
+        notifier.notify(['Low fuel'])
+        self.assertFalse(notifier.flush(timeout=0.01))
+        release.set()
+        notifier.shutdown()
+        self.assertEqual(1, notifier.stats()['sink']['sent'])
+
+    def test_no_sinks(self):
+        notifier = Notifier([])
+        self.assertTrue(notifier.flush(timeout=10))
+        notifier.notify(['Low fuel'])
+        self.assertFalse(notifier.flush(timeout=10))
@@ -1,8 +1,13 @@
 from __future__ import absolute_import
 import unittest
 import doctest
+import datetime
+from types import SimpleNamespace
+from unittest import mock
 from structurebot import pos
+from structurebot.alerts import AlertLedger
 from structurebot.config import CONFIG
+from structurebot.deadline import DeadlineExceeded
 from structurebot.util import name_to_id, ncr
 
 
@@ -27,4 +32,50 @@ class TestPOS(unittest.TestCase):
         [self.assertIsInstance(s, pos.Pos) for s in pos.Pos.from_corp_name(CONFIG['CORPORATION_NAME'])]
 
     def test_check_pos(self):
-        [self.assertIsInstance(s, str) for s in pos.check_pos(CONFIG['CORPORATION_NAME'])]
\ No newline at end of file
+        [self.assertIsInstance(s, str) for s in pos.check_pos(CONFIG['CORPORATION_NAME'])]
+
+
+class FakePos(SimpleNamespace):
+    @property
+    def moon_name(self):
+        if self.moon_id is None:
+            raise DeadlineExceeded('Run deadline of 300 seconds exceeded')
+        return 'Moon {}'.format(self.moon_id)
+
+
+def fake_pos(item_id, moon_id, fuel_quantity):
+    return FakePos(item_id=item_id, moon_id=moon_id, system_id=30003801, type_id=4361, state='online',
+                   reinforced_until=None, mods=[], fuels=[SimpleNamespace(type_id=4051, quantity=fuel_quantity)])
+
+
+class TestCheckPosLedger(unittest.TestCase):
+    def check(self, pos_list, ledger):
+        response = SimpleNamespace(status_code=200)
+        with mock.patch.object(pos, 'name_to_id', return_value=1), \
+                mock.patch.object(pos.Pos, 'from_corp_name', return_value=pos_list), \
+                mock.patch.object(pos, 'ncr') as ncr, \
+                mock.patch.object(pos, 'sov_systems', return_value=set()), \
+                mock.patch.dict(CONFIG, {'TOO_SOON': datetime.timedelta(days=3)}):
+            ncr.get_corporations_corporation_id.return_value = (response, {})
+            messages = []
+            try:
+                for message in pos.check_pos('Corp', [], ledger=ledger):
+                    messages.append(message)
+            except DeadlineExceeded:
+                pass
+            return messages
+
+    def test_alerts_found_before_deadline_are_kept(self):
+        ledger = AlertLedger(':memory:', cooldown=3600)
+        # a block per hour, 1 and 2 days of fuel, the second moon name fails
+        messages = self.check([fake_pos(1, 40000001, 24), fake_pos(2, None, 48)], ledger)
+        self.assertEqual(1, len(messages))
+        self.assertEqual({'alerts': 1, 'new': 1, 'changed': 0, 'reminder': 0, 'suppressed': 0, 'cleared': 0},
+                         ledger.stats())
+
+    def test_fuel_running_lower_alerts_again(self):
+        ledger = AlertLedger(':memory:', cooldown=3600)
+        self.assertEqual(1, len(self.check([fake_pos(1, 40000001, 60)], ledger)))
+        self.assertEqual([], self.check([fake_pos(1, 40000001, 50)], ledger))
+        self.assertEqual(1, len(self.check([fake_pos(1, 40000001, 40)], ledger)))
+
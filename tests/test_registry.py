@@ -0,0 +1,49 @@
+from __future__ import absolute_import
+import doctest
+import threading
+import time
+import unittest
+from structurebot import registry
+from structurebot.registry import Registry
+
+
+def load_tests(loader, tests, ignore):
+    tests.addTests(doctest.DocTestSuite(registry))
+    return tests
+
+
+class TestRegistry(unittest.TestCase):
+    def test_concurrent_build_once(self):
+        shared = Registry('systems')
+        builds = []
+
+        def build():
+            builds.append(1)
+            time.sleep(0.05)
+            return object()
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(shared.get(30003801, build))) for i in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(1, len(builds))
+        self.assertEqual(1, len(set(map(id, results))))
+        self.assertEqual({'registry': 'systems', 'hits': 19, 'misses': 1, 'size': 1}, shared.stats())
+
+    def test_failure_not_kept(self):
+        shared = Registry('systems')
+
+        def fail():
+            raise ValueError('ESI failure')
+
+        with self.assertRaises(ValueError):
+            shared.get(1, fail)
+        self.assertEqual('Jita', shared.get(1, lambda: 'Jita'))
+
+    def test_ttl(self):
+        shared = Registry('systems', ttl=0.01)
+        first = shared.get(1, object)
+        time.sleep(0.02)
+        self.assertIsNot(first, shared.get(1, object))
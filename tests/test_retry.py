@@ -0,0 +1,85 @@
+from __future__ import absolute_import
+import doctest
+import unittest
+import requests
+from structurebot import retry
+from structurebot.retry import RetryBudget, RetryPolicy
+from tests.test_neucore_requester import make_response
+
+
+def load_tests(loader, tests, ignore):
+    tests.addTests(doctest.DocTestSuite(retry))
+    return tests
+
+
+class FlakySend(object):
+    def __init__(self, statuses, headers=None):
+        self.statuses = list(statuses)
+        self.headers = headers or {}
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        status = self.statuses.pop(0)
+        if status is None:
+            raise requests.exceptions.ConnectionError('connection reset')
+        return make_response('https://esi.test/', {}, status_code=status, headers=self.headers)
+
+
+def make_policy(**kwargs):
+    kwargs.setdefault('backoff', 0.001)
+    return RetryPolicy(**kwargs)
+
+
+class TestRetry(unittest.TestCase):
+    def test_retries_transient(self):
+        send = FlakySend([503, None, 200])
+        response = make_policy(attempts=3).call(send)
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(3, send.calls)
+
+    def test_attempts_exhausted(self):
+        send = FlakySend([502, 502, 502])
+        self.assertEqual(502, make_policy(attempts=2).call(send).status_code)
+        self.assertEqual(2, send.calls)
+
+    def test_not_idempotent(self):
+        send = FlakySend([503, 200])
+        self.assertEqual(503, make_policy().call(send, idempotent=False).status_code)
+        self.assertEqual(1, send.calls)
+
+    def test_not_idempotent_retried_if_unprocessed(self):
+        send = FlakySend([429, 200])
+        self.assertEqual(200, make_policy(statuses=(429, 503)).call(send, idempotent=False).status_code)
+
+        attempts = []
+
+        def unreachable():
+            attempts.append(1)
+            raise requests.exceptions.ConnectTimeout('connect timeout')
+
+        with self.assertRaises(requests.exceptions.ConnectTimeout):
+            make_policy(attempts=2).call(unreachable, idempotent=False)
+        self.assertEqual(2, len(attempts))
+        # a reset connection may have delivered the request
+        send = FlakySend([None, 200])
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            make_policy(attempts=2).call(send, idempotent=False)
+        self.assertEqual(1, send.calls)
+
+    def test_client_errors_not_retried(self):
+        send = FlakySend([404, 200])
+        self.assertEqual(404, make_policy().call(send).status_code)
+
+    def test_budget(self):
+        policy = make_policy(attempts=5, budget=RetryBudget(max_retries=1))
+        self.assertEqual(503, policy.call(FlakySend([503, 503, 200])).status_code)
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            policy.call(FlakySend([None, 200]))
+        self.assertEqual(2, policy.budget.stats()['retries_denied'])
+
+    def test_retry_after(self):
+        policy = make_policy(max_retry_after=5)
+        response = make_response('https://esi.test/', {}, status_code=503, headers={'Retry-After': '120'})
+        self.assertEqual(5, policy.delay(0, response))
+        self.assertLessEqual(policy.delay(3), 0.008)
@@ -0,0 +1,83 @@
+from __future__ import absolute_import
+import doctest
+import threading
+import time
+import unittest
+
+from structurebot import scheduler
+from structurebot.deadline import Deadline
+from structurebot.scheduler import CRITICAL, LOW, NORMAL, PriorityScheduler, RequestDropped
+from tests.test_neucore_requester import FakeSession, make_ncr
+
+
+def load_tests(loader, tests, ignore):
+    tests.addTests(doctest.DocTestSuite(scheduler))
+    return tests
+
+
+class TestPriorityScheduler(unittest.TestCase):
+    def test_critical_drains_first(self):
+        gate = PriorityScheduler(max_concurrent=1)
+        order = []
+        gate.acquire(NORMAL)
+        threads = []
+        for priority in (LOW, NORMAL, CRITICAL):
+            def send(priority=priority):
+                with gate.slot(priority):
+                    order.append(priority)
+            thread = threading.Thread(target=send)
+            thread.start()
+            threads.append(thread)
+            # queue them up in this order
+            while gate.stats()['waiting'] < len(threads):
+                time.sleep(0.001)
+        gate.release()
+        for thread in threads:
+            thread.join()
+        self.assertEqual([CRITICAL, NORMAL, LOW], order)
+
+    def test_low_dropped_near_deadline(self):
+        gate = PriorityScheduler(low_cutoff=60)
+        deadline = Deadline(30)
+        with self.assertRaises(RequestDropped):
+            gate.acquire(LOW, deadline)
+        with gate.slot(CRITICAL, deadline):
+            pass
+        stats = gate.stats()
+        self.assertEqual(1, stats['low_dropped'])
+        self.assertEqual(1, stats['critical_sent'])
+        self.assertEqual(0, stats['waiting'])
+
+    def test_waiting_low_dropped(self):
+        gate = PriorityScheduler(max_concurrent=1, low_cutoff=0.5)
+        gate.acquire(CRITICAL)
+        with self.assertRaises(RequestDropped):
+            gate.acquire(LOW, Deadline(1.0))
+        gate.release()
+        self.assertEqual(0, gate.stats()['in_flight'])
+
+    def test_raised_limit_admits_waiting(self):
+        gate = PriorityScheduler(max_concurrent=1)
+        gate.acquire(NORMAL)
+        thread = threading.Thread(target=gate.acquire, args=(NORMAL,))
+        thread.start()
+        while gate.stats()['waiting'] < 1:
+            time.sleep(0.001)
+        gate.set_max_concurrent(2)
+        thread.join(0.5)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(2, gate.stats()['in_flight'])
+        gate.set_max_concurrent(1)
+        self.assertEqual(2, gate.max_concurrent)
+
+
+class TestNCRPriorities(unittest.TestCase):
+    def test_low_priority_endpoint_dropped(self):
+        ncr = make_ncr(deadline=Deadline(10))
+        ncr.esi_session = FakeSession({1: {'name': 'Aunsou I - Moon 1'}})
+        ncr.nc_session = FakeSession({1: []})
+        with self.assertRaises(RequestDropped):
+            ncr.get_universe_moons_moon_id(40000001)
+        response, data = ncr.get_corporations_corporation_id_starbases(1)
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(0, len(ncr.esi_session.calls))
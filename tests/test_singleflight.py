@@ -0,0 +1,49 @@
+from __future__ import absolute_import
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from structurebot.singleflight import SingleFlight
+from tests.test_neucore_requester import FakeSession, make_ncr
+
+
+class TestSingleFlight(unittest.TestCase):
+    def test_coalesces_concurrent_calls(self):
+        flight = SingleFlight()
+        calls = []
+        started = threading.Event()
+
+        def slow():
+            calls.append(1)
+            started.set()
+            time.sleep(0.05)
+            return 42
+
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            leader = executor.submit(flight.do, 'key', slow)
+            started.wait()
+            followers = [executor.submit(flight.do, 'key', slow) for i in range(4)]
+            results = [leader.result()] + [f.result() for f in followers]
+        self.assertEqual([42] * 5, results)
+        self.assertEqual(1, len(calls))
+        self.assertEqual({'requests_sent': 1, 'requests_coalesced': 4}, flight.stats())
+
+    def test_exception_shared_and_released(self):
+        flight = SingleFlight()
+
+        def fail():
+            raise ValueError('boom')
+
+        with self.assertRaises(ValueError):
+            flight.do('key', fail)
+        self.assertEqual(1, flight.do('key', lambda: 1))
+
+    def test_ncr_coalesces_gets(self):
+        ncr = make_ncr()
+        ncr.esi_session = FakeSession({1: {'name': 'Catch'}}, delay=0.05)
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(lambda i: ncr.get_universe_regions_region_id(region_id=10000014),
+                                        range(4)))
+        self.assertEqual([{'name': 'Catch'}] * 4, [data for response, data in results])
+        self.assertEqual(1, len(ncr.esi_session.calls))
+        self.assertEqual(3, ncr.singleflight.stats()['requests_coalesced'])
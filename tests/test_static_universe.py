@@ -0,0 +1,57 @@
+from __future__ import absolute_import
+import os
+import shutil
+import tempfile
+import unittest
+from structurebot import static_universe, universe, util
+from structurebot.static_universe import StaticUniverse, build, set_static_universe
+from tests.test_neucore_requester import FakeSession, make_ncr
+
+CSV = {
+    'mapRegions.csv': 'regionID,regionName,x,y,z\n10000014,Catch,0,0,0\n',
+    'mapConstellations.csv': 'regionID,constellationID,constellationName,x,y,z\n10000014,20000556,9HXQ-G,0,0,0\n',
+    'mapSolarSystems.csv': 'regionID,constellationID,solarSystemID,solarSystemName,x,y,z,security\n'
+                           '10000014,20000556,30003801,GE-8JV,-1.2e17,3.4e16,-5.6e16,-0.31\n',
+}
+
+
+class TestStaticUniverse(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        for filename, content in CSV.items():
+            with open(os.path.join(self.directory, filename), 'w') as f:
+                f.write(content)
+        self.path = os.path.join(self.directory, 'data', 'universe.sqlite')
+        self.assertEqual({'regions': 1, 'constellations': 1, 'systems': 1}, build(self.directory, self.path))
+
+    def test_lookups(self):
+        static = StaticUniverse(self.path)
+        self.assertEqual({'system_id': 30003801, 'constellation_id': 20000556, 'name': 'GE-8JV',
+                          'security_status': -0.31, 'position': {'x': -1.2e17, 'y': 3.4e16, 'z': -5.6e16}},
+                         static.get('systems', 30003801))
+        self.assertEqual(20000556, static.id_of('constellations', '9HXQ-G'))
+        self.assertIsNone(static.get('regions', 10000002))
+        self.assertEqual({'static_hits': 2, 'static_misses': 1}, static.stats())
+
+    def test_universe_answers_without_esi(self):
+        self.addCleanup(util.set_ncr, util._ncr)
+        ncr = make_ncr()
+        ncr.esi_session = FakeSession({1: {}})
+        util.set_ncr(ncr)
+        set_static_universe(StaticUniverse(self.path))
+        self.addCleanup(set_static_universe, None)
+        for cls in (universe.System, universe.Constellation, universe.Region):
+            cls.registry.clear()
+            self.addCleanup(cls.registry.clear)
+
+        system = universe.System.from_name('GE-8JV')
+        self.assertEqual('GE-8JV', system.name)
+        self.assertEqual('9HXQ-G', system.constellation.name)
+        self.assertEqual('Catch', system.constellation.region.name)
+        self.assertEqual([], ncr.esi_session.calls)
+
+    def test_missing_dataset(self):
+        self.addCleanup(set_static_universe, None)
+        set_static_universe(None)
+        self.assertIsNone(static_universe.get_static_universe(os.path.join(self.directory, 'missing.sqlite')))
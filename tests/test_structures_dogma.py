@@ -4,11 +4,15 @@ import datetime as dt
 import pytz
 from structurebot import citadels
 from structurebot import assets
+from structurebot.util import type_id_loader
 
 
 class TestStructureDogma(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
+        # resolve all type names below with one request
+        type_id_loader.load_many(['Raitaru', 'Ansiblex Jump Gate', 'Athanor', 'Standup Manufacturing Plant I',
+                                  'Standup Moon Drill I', 'Standup Research Lab I', 'Raitaru Upwell Quantum Core'])
         raitaru_type = assets.Type.from_name('Raitaru')
         ansiblex_type = assets.Type.from_name('Ansiblex Jump Gate')
         athanor_type = assets.Type.from_name('Athanor')
@@ -0,0 +1,72 @@
+from __future__ import absolute_import
+import json
+import threading
+import unittest
+from unittest import mock
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from structurebot import transport
+from structurebot.transport import connection_stats, create_session
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        body = json.dumps({'path': self.path}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestTransport(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), KeepAliveHandler)
+        cls.url = 'http://127.0.0.1:{}/'.format(cls.server.server_address[1])
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def test_connections_reused(self):
+        session = create_session(pool_maxsize=2)
+        for i in range(5):
+            self.assertEqual(200, session.request('GET', self.url, timeout=(1, 1)).status_code)
+        self.assertEqual({'transport': 'requests', 'requests': 5, 'connections_opened': 1,
+                          'connections_reused': 4}, connection_stats(session))
+
+    def test_httpx_fallback(self):
+        if transport.httpx is not None:
+            self.skipTest('httpx is installed')
+        self.assertEqual('requests', connection_stats(create_session('httpx'))['transport'])
+
+    def test_httpx_connections_reused(self):
+        if transport.httpx is None:
+            self.skipTest('httpx is not installed')
+        session = create_session('httpx', pool_maxsize=2)
+        self.addCleanup(session.close)
+        for i in range(5):
+            self.assertEqual(200, session.request('GET', self.url, timeout=(1, 1)).status_code)
+        stats = connection_stats(session)
+        self.assertEqual((5, 1, 4), (stats['requests'], stats['connections_opened'], stats['connections_reused']))
+
+    def test_h2_fallback(self):
+        sessions = []
+
+        def session(max_connections, max_keepalive, http2=True):
+            if http2:
+                raise ImportError('h2 is not installed')
+            sessions.append((max_connections, max_keepalive))
+            return 'http/1.1 session'
+
+        with mock.patch.object(transport, 'httpx', object()), mock.patch.object(transport, 'HTTPXSession', session):
+            self.assertEqual('http/1.1 session', create_session('httpx', pool_connections=2, pool_maxsize=5))
+        self.assertEqual([(10, 5)], sessions)
@@ -1,6 +1,10 @@
 from __future__ import absolute_import
+import threading
 import unittest
-from structurebot import universe
+from unittest import mock
+from structurebot import universe, util
+from structurebot.scheduler import RequestDropped
+from tests.test_neucore_requester import FakeSession, make_ncr
 
 
 class TestUniverse(unittest.TestCase):
@@ -8,4 +12,41 @@ class TestUniverse(unittest.TestCase):
         system = universe.System.from_name('GE-8JV')
         self.assertEqual('GE-8JV', system.name)
         self.assertEqual('9HXQ-G', system.constellation.name)
-        self.assertEqual('Catch', system.constellation.region.name)
\ No newline at end of file
+        self.assertEqual('Catch', system.constellation.region.name)
+
+
+class TestUniverseRegistry(unittest.TestCase):
+    def setUp(self):
+        self.addCleanup(util.set_ncr, util._ncr)
+        self.ncr = make_ncr()
+        # one answer fits all three endpoints
+        self.ncr.esi_session = FakeSession({1: {'system_id': 30003801, 'constellation_id': 20000556,
+                                                'region_id': 10000014, 'name': 'GE-8JV'}})
+        util.set_ncr(self.ncr)
+        for cls in (universe.System, universe.Constellation, universe.Region):
+            cls.registry.clear()
+            self.addCleanup(cls.registry.clear)
+
+    def test_shared_instances(self):
+        systems = []
+        threads = [threading.Thread(target=lambda: systems.append(universe.System.from_id(30003801)))
+                   for i in range(40)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(1, len(set(map(id, systems))))
+        self.assertIs(systems[0].constellation, universe.Constellation.from_id(20000556))
+        self.assertEqual(3, len(self.ncr.esi_session.calls))
+        self.assertEqual({'registry': 'systems', 'hits': 39, 'misses': 1, 'size': 1},
+                         universe.universe_stats()[0])
+
+    def test_degraded_instances_not_shared(self):
+        fetch = universe.Region._fetch
+        with mock.patch.object(universe.Region, '_fetch', side_effect=[RequestDropped('dropped'), fetch(10000014)]):
+            degraded = universe.System.from_id(30003801)
+            self.assertIsNone(degraded.constellation.region)
+            system = universe.System.from_id(30003801)
+        self.assertIsNot(degraded, system)
+        self.assertEqual('GE-8JV', system.constellation.region.name)
+        self.assertIs(system, universe.System.from_id(30003801))
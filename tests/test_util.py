@@ -1,8 +1,105 @@
 from __future__ import absolute_import
 import doctest
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
 from structurebot import util
+from structurebot.cache import SQLiteNameCache
+from structurebot.name_index import NameIndex
+from tests.test_neucore_requester import FakeSession, make_ncr, make_response
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 
 def load_tests(loader, tests, ignore):
     tests.addTests(doctest.DocTestSuite(util))
     return tests
+
+
+class UniverseSession(FakeSession):
+    """Answers /universe/names/ and /universe/ids/ like ESI from a dict of id: (name, category)"""
+
+    def __init__(self, universe):
+        super(UniverseSession, self).__init__({})
+        self.universe = universe
+
+    def request(self, method, url, params=None, data=None, headers=None, **kwargs):
+        with self.lock:
+            self.calls.append((method, url, params, headers))
+        body = json.loads(data)
+        if url.endswith('/universe/names/'):
+            if any(i not in self.universe for i in body):
+                return make_response(url, {'error': 'Ensure all IDs are valid before resolving.'},
+                                     status_code=404, method=method)
+            return make_response(url, [{'id': i, 'name': self.universe[i][0], 'category': self.universe[i][1]}
+                                       for i in body], method=method)
+        found = {}
+        for i, (name, category) in self.universe.items():
+            if name in body:
+                found.setdefault(category, []).append({'id': i, 'name': name})
+        return make_response(url, found, method=method)
+
+
+class TestNameResolution(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.addCleanup(util.set_ncr, util._ncr)
+        for name in ('name_index', 'name_cache', '_name_cache_opened'):
+            self.addCleanup(setattr, util, name, getattr(util, name))
+        client = make_ncr()
+        client.esi_session = UniverseSession({i: ('name {}'.format(i), 'inventory_type') for i in range(1, 65)})
+        util.set_ncr(client)
+        util.name_index = NameIndex()
+        util.name_cache = SQLiteNameCache(os.path.join(self.directory, 'cache.sqlite'))
+
+    def test_invalid_ids_isolated(self):
+        ids = list(range(1, 65)) + [1000, 2000]
+        names = util.ids_to_names(ids)
+        self.assertEqual(list(range(1, 65)), sorted(names))
+        # 2 invalid IDs in 66 take far less than one request per ID
+        self.assertLess(len(util.ncr.esi_session.calls), 20)
+
+    def test_invalid_ids_not_requested_again(self):
+        util.ids_to_names([1, 1000])
+        calls = len(util.ncr.esi_session.calls)
+        self.assertEqual({1: 'name 1'}, util.ids_to_names([1, 1000]))
+        self.assertEqual(calls, len(util.ncr.esi_session.calls))
+
+        # next run
+        util.name_index = NameIndex()
+        util.warm_name_cache()
+        self.assertEqual({1: 'name 1'}, util.ids_to_names([1, 1000]))
+        self.assertEqual(calls, len(util.ncr.esi_session.calls))
+
+    def test_unknown_names_not_requested_again(self):
+        self.assertEqual({'inventory_type': {'name 1': 1}}, util.names_to_ids(['name 1', 'Nonexistent']))
+        self.assertEqual({}, util.names_to_ids(['Nonexistent']))
+        self.assertEqual(1, len(util.ncr.esi_session.calls))
+
+
+class TestLazyNCR(unittest.TestCase):
+    def test_import_has_no_side_effects(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        env = {k: v for k, v in os.environ.items() if not k.startswith('NEUCORE_')}
+        env['PYTHONPATH'] = ROOT
+        statement = ('import structurebot.citadels, structurebot.pos, structurebot.universe\n'
+                     'from structurebot import util\n'
+                     'assert util._ncr is None and util.name_cache is None')
+        subprocess.run([sys.executable, '-c', statement], cwd=directory, env=env, check=True)
+        self.assertEqual([], os.listdir(directory))
+
+    def test_set_ncr(self):
+        original = util._ncr
+        self.addCleanup(util.set_ncr, original)
+        client = make_ncr()
+        util.set_ncr(client)
+        self.assertIs(client.esi_session, util.ncr.esi_session)
+        util.ncr.page_workers = 3
+        self.assertEqual(3, client.page_workers)